@@ -1,7 +1,12 @@
-from src.presentation.app import StudentManagerApp
-from src.infrastructure import UniversityDB, UserRepository, CourseRepository, EnrollmentRepository, is_admin_string_hard
+# Only what the plain CLI needs is imported here; the Textual app and the
+# import/export modules load inside the commands that use them.
+from src.infrastructure import UniversityDB, CachedUserRepository, CachedCourseRepository, cached_enrollment_repository, SHARED_CACHE_TTL, UserDirectory, is_admin_string_hard
+from src.infrastructure.database import DB_NAME
+from src.infrastructure.instrumentation import DEFAULT_SLOW_QUERY_MS, configure_slow_query_log
 from src.presentation.interface import student_portal, admin_portal
+import argparse
 import sys
+import time
 
 
 def main() -> None:
@@ -10,24 +15,52 @@ def main() -> None:
     Initializes infrastructure and routes to student or admin portal.
     """
     
-    if "--tui" in sys.argv:
+    db_options, query_stats_path = instrumentation_options()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        import_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "export":
+        export_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "storage":
+        storage_main(sys.argv[2:])
+    elif "--tui" in sys.argv:
         try:
             from src.presentation.app import StudentManagerApp
-            app = StudentManagerApp()
+            app = StudentManagerApp(db_options, query_stats_path)
             app.run()
         except ImportError:
             print("[!] TUI mode not available. Using CLI mode instead.")
-            cli_main()
+            cli_main(db_options, query_stats_path)
     else:
-        cli_main()
+        cli_main(db_options, query_stats_path)
+
+
+def instrumentation_options() -> tuple[dict, str | None]:
+    """Strip the query-instrumentation flags from sys.argv and turn them into UniversityDB options.
+
+    --query-stats PATH      time every statement; dump the stats to PATH on exit (F2 in the TUI)
+    --slow-query-ms MS      log statements slower than MS (default 50) as JSON lines
+    --slow-query-log PATH   where slow statements are logged (default slow_queries.log)
+    """
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("--query-stats")
+    parser.add_argument("--slow-query-ms", type=float)
+    parser.add_argument("--slow-query-log")
+    opts, rest = parser.parse_known_args(sys.argv[1:])
+    sys.argv[1:] = rest
+    if opts.query_stats is None and opts.slow_query_ms is None and opts.slow_query_log is None:
+        return {}, None
+    configure_slow_query_log(opts.slow_query_log or "slow_queries.log")
+    slow_query_ms = opts.slow_query_ms if opts.slow_query_ms is not None else DEFAULT_SLOW_QUERY_MS
+    return {"instrument": True, "slow_query_ms": slow_query_ms}, opts.query_stats
 
 
-def cli_main() -> None:
+def cli_main(db_options: dict | None = None, query_stats_path: str | None = None) -> None:
     """CLI mode for the application."""
-    db = UniversityDB()
-    user_repo = UserRepository(db)
-    course_repo = CourseRepository(db)
-    enrollment_repo = EnrollmentRepository(db)
+    db = UniversityDB(**(db_options or {}))
+    user_repo = CachedUserRepository(db, ttl=SHARED_CACHE_TTL, directory=UserDirectory(db))
+    course_repo = CachedCourseRepository(db, ttl=SHARED_CACHE_TTL)
+    enrollment_repo = cached_enrollment_repository(db, ttl=SHARED_CACHE_TTL)
     
     if len(sys.argv) == 2:
         admin_str = sys.argv[1]
@@ -38,9 +71,85 @@ def cli_main() -> None:
             print("[!] Requirements: At least 12 characters with uppercase, lowercase, digit, and symbol")
     else:
         student_portal(user_repo, course_repo, enrollment_repo)
-    
+
+    if query_stats_path and db.query_stats() is not None:
+        import json
+        with open(query_stats_path, "w", encoding="utf-8") as f:
+            json.dump(db.query_stats(), f, indent=2)
+        print(f"[+] Query stats written to {query_stats_path}")
     db.close()
 
 
+def import_main(args: list[str]) -> None:
+    """Bulk-import users, courses or enrollments from CSV/JSONL files."""
+    from src.infrastructure.bulk_import import BulkImporter, IMPORT_CHUNK_SIZE, IMPORT_KINDS
+    parser = argparse.ArgumentParser(prog="main.py import", description=import_main.__doc__)
+    parser.add_argument("files", nargs="+", help="CSV or JSONL files (optionally .gz)")
+    parser.add_argument("--kind", choices=IMPORT_KINDS, help="record type (default: detected from the columns)")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="rows per transaction")
+    opts = parser.parse_args(args)
+
+    def progress(report):
+        print(f"\r[+] {report.kind}: {report.read:,} read, {report.imported:,} imported, "
+              f"{report.rejected:,} rejected", end="", flush=True)
+
+    with UniversityDB(opts.db) as db:
+        importer = BulkImporter(db, opts.chunk_size)
+        for path in opts.files:
+            print(f"Importing {path}...")
+            start_time = time.perf_counter()
+            report = importer.import_file(path, opts.kind, progress)
+            elapsed = time.perf_counter() - start_time
+            print(f"\n[+] Done in {elapsed:.2f}s ({report.read / elapsed if elapsed else 0:,.0f} rows/s)")
+            for line_no, reason, record in report.samples:
+                print(f"    line {line_no}: {reason} -> {record}")
+            if report.rejected > len(report.samples):
+                print(f"    ... and {report.rejected - len(report.samples):,} more rejected rows")
+
+
+def export_main(args: list[str]) -> None:
+    """Stream users, courses, enrollments or the pivoted roster to CSV/JSONL."""
+    from src.infrastructure.bulk_export import BulkExporter, EXPORT_KINDS
+    parser = argparse.ArgumentParser(prog="main.py export", description=export_main.__doc__)
+    parser.add_argument("kind", choices=EXPORT_KINDS, help="what to export (roster = one row per student)")
+    parser.add_argument("path", help="output file; .jsonl for JSON lines, .gz to compress")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output regardless of extension")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    opts = parser.parse_args(args)
+
+    def progress(count):
+        print(f"\r[+] {opts.kind}: {count:,} rows written", end="", flush=True)
+
+    with UniversityDB(opts.db) as db:
+        start_time = time.perf_counter()
+        count = BulkExporter(db).export(opts.kind, opts.path, opts.gzip, progress)
+        elapsed = time.perf_counter() - start_time
+        print(f"\n[+] Exported {count:,} rows to {opts.path} in {elapsed:.2f}s")
+
+
+def storage_main(args: list[str]) -> None:
+    """Show or switch how enrollments are stored: one row each, or one course bitmask per student."""
+    from src.infrastructure.bitmask_enrollments import STORAGE_MODES, enrollment_storage, set_enrollment_storage
+    parser = argparse.ArgumentParser(prog="main.py storage", description=storage_main.__doc__)
+    parser.add_argument("mode", nargs="?", choices=STORAGE_MODES, help="layout to convert to (omit to show the current one)")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    opts = parser.parse_args(args)
+
+    with UniversityDB(opts.db) as db:
+        current = enrollment_storage(db)
+        if opts.mode is None or opts.mode == current:
+            print(f"[+] Enrollments are stored as {current}.")
+            return
+        start_time = time.perf_counter()
+        try:
+            moved = set_enrollment_storage(db, opts.mode)
+        except ValueError as e:
+            print(f"[!] {e}")
+            return
+        print(f"[+] Converted {moved:,} enrollments from {current} to {opts.mode} "
+              f"in {time.perf_counter() - start_time:.2f}s")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
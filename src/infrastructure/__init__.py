@@ -1,12 +1,74 @@
-from .database import UniversityDB
+from .database import UniversityDB, Rollback
+from .pool import ReaderPool
+from .instrumentation import QueryInstrumentation, configure_slow_query_log
+from .migrations import SCHEMA_VERSION, migrate, schema_version, search_index_rebuild
 from .repositories import UserRepository, CourseRepository, EnrollmentRepository
+from .bitmask_enrollments import BitmaskEnrollmentRepository, enrollment_storage, set_enrollment_storage
+from .prefix_index import UserDirectory
+from .cache import (
+    LRUCache, CachedUserRepository, CachedCourseRepository, CachedEnrollmentRepository,
+    CachedBitmaskEnrollmentRepository, cached_enrollment_repository, SHARED_CACHE_TTL,
+)
 from .utils import is_admin_string_hard, clear_screen
+import importlib
+
+# Loaded on first use so the plain CLI does not pay for csv/gzip or asyncio at startup.
+_LAZY = {
+    'BulkImporter': '.bulk_import',
+    'ImportReport': '.bulk_import',
+    'BulkExporter': '.bulk_export',
+    'AsyncRepository': '.async_repositories',
+    'AsyncRepositories': '.async_repositories',
+    'EnrollmentAnalytics': '.analytics',
+    'AnalyticsReport': '.analytics',
+    'CoEnrollmentEngine': '.coenrollment',
+    'CourseDemand': '.coenrollment',
+    'SqliteUserRepository': '.domain_repository',
+    'UnitOfWork': '.domain_repository',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 all = [
     'UniversityDB',
+    'Rollback',
+    'ReaderPool',
+    'QueryInstrumentation',
+    'configure_slow_query_log',
+    'SCHEMA_VERSION',
+    'migrate',
+    'schema_version',
+    'search_index_rebuild',
     'UserRepository',
     'CourseRepository',
     'EnrollmentRepository',
+    'BitmaskEnrollmentRepository',
+    'enrollment_storage',
+    'set_enrollment_storage',
+    'UserDirectory',
+    'LRUCache',
+    'CachedUserRepository',
+    'CachedCourseRepository',
+    'CachedEnrollmentRepository',
+    'CachedBitmaskEnrollmentRepository',
+    'cached_enrollment_repository',
+    'SHARED_CACHE_TTL',
+    'BulkImporter',
+    'ImportReport',
+    'BulkExporter',
+    'AsyncRepository',
+    'AsyncRepositories',
+    'EnrollmentAnalytics',
+    'AnalyticsReport',
+    'CoEnrollmentEngine',
+    'CourseDemand',
+    'SqliteUserRepository',
+    'UnitOfWork',
     'is_admin_string_hard',
     'clear_screen',
 ]
\ No newline at end of file
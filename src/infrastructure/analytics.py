@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from .bitmask_enrollments import BITMASK, enrollment_storage
+from .database import UniversityDB
+
+SHARDS_PER_WORKER = 4
+ANALYTICS_FETCH_SIZE = 10000
+UUID_SPACE = 1 << 128
+
+
+def fill_rate(enrolled: int, capacity: int | None) -> float | None:
+    """Share of a course's seats taken; None when unlimited. A zero-seat course counts as full."""
+    if capacity is None:
+        return None
+    return enrolled / capacity if capacity else 1.0
+
+
+@dataclass
+class ShardResult:
+    """Partial aggregates for one user_uuid range; merged by EnrollmentAnalytics."""
+    students: int = 0
+    enrollments: int = 0
+    course_counts: Counter = field(default_factory=Counter)
+    load_counts: Counter = field(default_factory=Counter)
+    pair_counts: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "ShardResult"):
+        self.students += other.students
+        self.enrollments += other.enrollments
+        self.course_counts.update(other.course_counts)
+        self.load_counts.update(other.load_counts)
+        self.pair_counts.update(other.pair_counts)
+
+
+@dataclass
+class AnalyticsReport:
+    students: int
+    enrollments: int
+    # (code, name, enrolled, capacity, fill rate or None for unlimited courses)
+    course_fill: list[tuple[str, str, int, int | None, float | None]]
+    # courses per student -> number of students, including students with none
+    load_distribution: dict[int, int]
+    # ((code_a, code_b), students taking both), most common first
+    co_enrollment: list[tuple[tuple[str, str], int]]
+    shards: int
+    workers: int
+    elapsed: float
+
+
+def shard_bounds(shards: int) -> list[tuple[bytes, bytes | None]]:
+    """Split the 16-byte user_uuid key space into `shards` equal ranges.
+
+    user_uuid is a random UUID4, so equal key ranges hold about equal numbers
+    of students; the last range is open-ended.
+    """
+    edges = [(UUID_SPACE * i // shards).to_bytes(16, "big") for i in range(shards)]
+    return [(low, edges[i + 1] if i + 1 < shards else None) for i, low in enumerate(edges)]
+
+
+def aggregate_shard(db_path: str, low: bytes, high: bytes | None,
+                    slots: tuple[tuple[int, str], ...] | None = None) -> ShardResult:
+    """Aggregate the enrollments of every student with low <= user_uuid < high.
+
+    Runs in a worker process on its own read-only connection; enrollments is
+    clustered on (user_uuid, course_code), so the range is one primary-key
+    seek followed by a sequential read. For a database in the bitmask layout
+    `slots` holds (bit, code) pairs in code order and the students' course
+    masks are read from users instead.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    result = ShardResult()
+    try:
+        if slots is not None:
+            upper = "" if high is None else " AND u_uuid < ?"
+            cursor = conn.execute(
+                f"SELECT course_mask FROM users WHERE u_uuid >= ?{upper} AND course_mask != 0",
+                (low,) if high is None else (low, high)
+            )
+            while batch := cursor.fetchmany(ANALYTICS_FETCH_SIZE):
+                for mask, in batch:
+                    codes = [code for bit, code in slots if mask & bit]
+                    result.students += 1
+                    result.enrollments += len(codes)
+                    result.course_counts.update(codes)
+                    result.load_counts[len(codes)] += 1
+                    result.pair_counts.update(combinations(codes, 2))
+            return result
+        if high is None:
+            cursor = conn.execute(
+                "SELECT user_uuid, course_code FROM enrollments WHERE user_uuid >= ? ORDER BY user_uuid", (low,)
+            )
+        else:
+            cursor = conn.execute(
+                "SELECT user_uuid, course_code FROM enrollments WHERE user_uuid >= ? AND user_uuid < ? "
+                "ORDER BY user_uuid", (low, high)
+            )
+
+        def rows():
+            while batch := cursor.fetchmany(ANALYTICS_FETCH_SIZE):
+                yield from batch
+
+        for _, group in groupby(rows(), key=itemgetter(0)):
+            codes = sorted(code for _, code in group)
+            result.students += 1
+            result.enrollments += len(codes)
+            result.course_counts.update(codes)
+            result.load_counts[len(codes)] += 1
+            result.pair_counts.update(combinations(codes, 2))
+    finally:
+        conn.close()
+    return result
+
+
+class EnrollmentAnalytics:
+    """Course fill rates, per-student load and co-enrollment counts, sharded across processes.
+
+    The enrollments table is split into user_uuid ranges that are aggregated
+    in parallel by a ProcessPoolExecutor, each worker on its own read-only
+    connection, and the partial counts are summed afterwards. Each shard reads
+    its own snapshot, so a report taken during heavy writes may mix moments a
+    few milliseconds apart.
+    """
+
+    def __init__(self, db: UniversityDB, max_workers: int | None = None, shards: int | None = None):
+        if db.db_path == ":memory:":
+            raise ValueError("Sharded analytics requires a file-backed database.")
+        self.db = db
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards = shards or self.max_workers * SHARDS_PER_WORKER
+
+    def run(self) -> AnalyticsReport:
+        start_time = time.perf_counter()
+        # Make sure everything committed on the writer connection is visible to the workers.
+        # Inside db.transaction() the commit is the caller's, so the shards see only what
+        # was committed before the block began.
+        if not self.db.in_transaction:
+            self.db.commit()
+        bounds = shard_bounds(self.shards)
+        slots = None
+        if enrollment_storage(self.db) == BITMASK:
+            slots = tuple((1 << slot, code) for code, slot in
+                          self.db.execute_query("SELECT code, slot FROM course_slots ORDER BY code"))
+        total = ShardResult()
+        if self.max_workers == 1:
+            for low, high in bounds:
+                total.merge(aggregate_shard(self.db.db_path, low, high, slots))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(aggregate_shard, self.db.db_path, low, high, slots) for low, high in bounds]
+                for future in futures:
+                    total.merge(future.result())
+
+        courses = self.db.execute_query("SELECT code, name, capacity FROM courses ORDER BY code")
+        course_fill = [
+            (code, name, total.course_counts[code], capacity,
+             fill_rate(total.course_counts[code], capacity))
+            for code, name, capacity in courses
+        ]
+        students = self.db.execute_single("SELECT COUNT(*) FROM users WHERE role = 'student'")[0]
+        load_distribution = dict(sorted(total.load_counts.items()))
+        if students > total.students:
+            load_distribution = {0: students - total.students, **load_distribution}
+
+        return AnalyticsReport(
+            students=students,
+            enrollments=total.enrollments,
+            course_fill=course_fill,
+            load_distribution=load_distribution,
+            co_enrollment=total.pair_counts.most_common(),
+            shards=self.shards,
+            workers=self.max_workers,
+            elapsed=time.perf_counter() - start_time,
+        )
@@ -0,0 +1,42 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncRepository:
+    """Awaitable proxy that runs a repository's methods on the database executor.
+
+    Cancelling the awaiting task cancels the call if it has not started yet;
+    a statement already running on the DB thread is allowed to finish.
+    """
+
+    def __init__(self, repo, executor: ThreadPoolExecutor):
+        self._repo = repo
+        self._executor = executor
+
+    def __getattr__(self, name: str):
+        method = getattr(self._repo, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(method, *args, **kwargs)
+            )
+
+        call.__name__ = name
+        return call
+
+
+class AsyncRepositories:
+    """Async facade over the user, course and enrollment repositories."""
+
+    def __init__(self, user_repo, course_repo, enrollment_repo, max_workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self.users = AsyncRepository(user_repo, self._executor)
+        self.courses = AsyncRepository(course_repo, self._executor)
+        self.enrollments = AsyncRepository(enrollment_repo, self._executor)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
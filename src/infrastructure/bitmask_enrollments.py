@@ -0,0 +1,278 @@
+import sqlite3
+from typing import Iterable
+
+from .database import UniversityDB
+from .migrations import MAX_COURSE_SLOTS, MAX_STUDENT_COURSES
+from .repositories import (
+    ALREADY_ENROLLED, COURSE_FULL, ENROLLED, FAILED, LIMIT_REACHED, UNKNOWN_COURSE, EnrollmentRepository,
+)
+
+ROWS = "rows"
+BITMASK = "bitmask"
+STORAGE_MODES = (ROWS, BITMASK)
+STORAGE_SETTING = "enrollment_storage"
+# Distinct masks remembered by CourseSlots.codes; past this the memo starts over.
+DECODE_CACHE_SIZE = 4096
+
+
+def enrollment_storage(db: UniversityDB) -> str:
+    """The enrollment layout this database uses: ROWS (the default) or BITMASK."""
+    row = db.execute_single("SELECT value FROM settings WHERE key = ?", (STORAGE_SETTING,))
+    return row[0] if row else ROWS
+
+
+def set_enrollment_storage(db: UniversityDB, mode: str) -> int:
+    """Convert every enrollment to `mode` in one transaction, returning how many were moved.
+
+    Rows become bits (or bits rows) and the old layout is emptied, so only one
+    of them ever holds data. Counters end up where they started: the row
+    triggers zero them as rows are deleted and rebuild them as rows are inserted.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown enrollment storage '{mode}'. Expected one of: {', '.join(STORAGE_MODES)}.")
+    with db.lock:
+        db.conn.create_function("bit_count", 1, int.bit_count, deterministic=True)
+        try:
+            with db.transaction() as cursor:
+                moved = 0 if enrollment_storage(db) == mode else _convert(cursor, mode)
+        finally:
+            db.conn.create_function("bit_count", 1, None)
+    return moved
+
+
+def _convert(cursor: sqlite3.Cursor, mode: str) -> int:
+    # Runs inside set_enrollment_storage's transaction, with bit_count registered.
+    logged = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    if mode == BITMASK:
+        unslotted = cursor.execute("""
+            SELECT COUNT(DISTINCT course_code) FROM enrollments
+            WHERE course_code NOT IN (SELECT code FROM course_slots)
+        """).fetchone()[0]
+        if unslotted:
+            raise ValueError(f"{unslotted} enrolled courses have no bitmask slot (the limit is {MAX_COURSE_SLOTS} courses).")
+        moved = cursor.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0]
+        cursor.execute("""
+            UPDATE users SET course_mask = (
+                SELECT SUM(1 << s.slot) FROM enrollments e JOIN course_slots s ON s.code = e.course_code
+                WHERE e.user_uuid = users.u_uuid
+            )
+            WHERE enrollment_count > 0
+        """)
+        cursor.execute("DELETE FROM enrollments")
+        cursor.execute("UPDATE users SET enrollment_count = bit_count(course_mask) WHERE course_mask != 0")
+        cursor.execute("""
+            UPDATE courses SET enrollment_count = (
+                SELECT COUNT(*) FROM users u, course_slots s
+                WHERE s.code = courses.code AND u.course_mask & (1 << s.slot)
+            )
+        """)
+    else:
+        cursor.execute("UPDATE users SET enrollment_count = 0 WHERE course_mask != 0")
+        cursor.execute("UPDATE courses SET enrollment_count = 0")
+        cursor.execute("""
+            INSERT INTO enrollments (user_uuid, course_code)
+            SELECT u.u_uuid, s.code FROM users u JOIN course_slots s ON u.course_mask & (1 << s.slot)
+            WHERE u.course_mask != 0
+        """)
+        moved = cursor.rowcount
+        cursor.execute("UPDATE users SET course_mask = 0 WHERE course_mask != 0")
+    cursor.execute("""
+        INSERT INTO settings (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    """, (STORAGE_SETTING, mode))
+    # Every student's roster row reads the same in either layout, so the conversion's own log entries are dropped.
+    cursor.execute("DELETE FROM change_log WHERE seq > ?", (logged,))
+    return moved
+
+
+class CourseSlots:
+    """The course_slots map with memoized mask decoding.
+
+    Decoding lists codes in code order, as the row layout's roster does. A
+    course created after the map was read has a bit the map does not know, so
+    decoding such a mask reads the map again.
+    """
+
+    def __init__(self, db: UniversityDB):
+        self.db = db
+        self._bits: dict[str, int] = {}
+        self._known = 0
+        self._decoded: dict[int, tuple[str, ...]] = {}
+
+    def reload(self):
+        rows = self.db.execute_query("SELECT code, slot FROM course_slots ORDER BY code")
+        self._bits = {code: 1 << slot for code, slot in rows}
+        self._known = sum(self._bits.values())
+        self._decoded = {}
+
+    def bit(self, code: str) -> int | None:
+        """The bit for `code`, or None for an unknown course."""
+        if code not in self._bits:
+            self.reload()
+        return self._bits.get(code)
+
+    def codes(self, mask: int) -> tuple[str, ...]:
+        decoded = self._decoded.get(mask)
+        if decoded is None:
+            if mask & ~self._known:
+                self.reload()
+            if len(self._decoded) >= DECODE_CACHE_SIZE:
+                self._decoded = {}
+            decoded = self._decoded[mask] = tuple(code for code, bit in self._bits.items() if mask & bit)
+        return decoded
+
+
+class BitmaskEnrollmentRepository(EnrollmentRepository):
+    """EnrollmentRepository over per-student course bitmasks instead of enrollment rows.
+
+    A student's courses are one integer, users.course_mask, with a bit per
+    course slot. Enrolling, dropping and swapping update that integer and
+    the course's seat counter in one transaction. The materialized roster is
+    refreshed from masks decoded against course_slots. users.enrollment_count
+    and courses.enrollment_count are kept as in the row layout, so counts,
+    limits and capacities read the same. Only valid on a database switched to
+    BITMASK with set_enrollment_storage.
+    """
+
+    def __init__(self, db: UniversityDB):
+        super().__init__(db)
+        self.slots = CourseSlots(db)
+
+    def _enroll(self, cursor: sqlite3.Cursor, user_uuid: bytes, bit: int, course_code: str) -> bool:
+        cursor.execute(
+            "UPDATE courses SET enrollment_count = enrollment_count + 1 "
+            "WHERE code = ? AND (capacity IS NULL OR enrollment_count < capacity)", (course_code,)
+        )
+        if cursor.rowcount != 1:
+            return False
+        cursor.execute(
+            "UPDATE users SET course_mask = course_mask | ?, enrollment_count = enrollment_count + 1 "
+            f"WHERE u_uuid = ? AND course_mask & ? = 0 AND enrollment_count < {MAX_STUDENT_COURSES}",
+            (bit, user_uuid, bit)
+        )
+        if cursor.rowcount != 1:
+            cursor.execute("UPDATE courses SET enrollment_count = enrollment_count - 1 WHERE code = ?", (course_code,))
+            return False
+        return True
+
+    def _drop(self, cursor: sqlite3.Cursor, user_uuid: bytes, bit: int, course_code: str):
+        cursor.execute(
+            "UPDATE users SET course_mask = course_mask & ~?, enrollment_count = enrollment_count - 1 "
+            "WHERE u_uuid = ? AND course_mask & ?", (bit, user_uuid, bit)
+        )
+        if cursor.rowcount == 1:
+            cursor.execute("UPDATE courses SET enrollment_count = enrollment_count - 1 WHERE code = ?", (course_code,))
+
+    def enroll_student(self, user_uuid: bytes, course_code: str) -> bool:
+        bit = self.slots.bit(course_code)
+        if bit is None:
+            return False
+        return self.db.execute_transaction(lambda cursor: self._enroll(cursor, user_uuid, bit, course_code))
+
+    def reserve_seat(self, user_uuid: bytes, course_code: str) -> str:
+        if self.enroll_student(user_uuid, course_code):
+            return ENROLLED
+        bit = self.slots.bit(course_code)
+        row = self.db.execute_single("""
+            SELECT c.enrollment_count, c.capacity, u.enrollment_count, u.course_mask & ? != 0
+            FROM courses c, users u
+            WHERE c.code = ? AND u.u_uuid = ?
+        """, (bit or 0, course_code, user_uuid))
+        if row is None or bit is None:
+            return UNKNOWN_COURSE
+        course_count, capacity, student_count, already = row
+        if already:
+            return ALREADY_ENROLLED
+        if student_count >= MAX_STUDENT_COURSES:
+            return LIMIT_REACHED
+        if capacity is not None and course_count >= capacity:
+            return COURSE_FULL
+        return FAILED
+
+    def enroll_many(self, enrollments: Iterable[tuple[bytes, str]]) -> list[bool]:
+        """Apply (user_uuid, course_code) enrollments in one transaction, returning per-row success.
+
+        As with execute_many, a failed transaction reads the rest of the input
+        and marks every row False.
+        """
+        results = []
+        enrollments = iter(enrollments)
+        pulled = 0
+
+        def work(cursor):
+            nonlocal pulled
+            for user_uuid, course_code in enrollments:
+                pulled += 1
+                bit = self.slots.bit(course_code)
+                results.append(bit is not None and self._enroll(cursor, user_uuid, bit, course_code))
+            return True
+
+        if not self.db.execute_transaction(work):
+            return [False] * (pulled + sum(1 for _ in enrollments))
+        return results
+
+    def _mask(self, user_uuid: bytes) -> int:
+        row = self.db.execute_single("SELECT course_mask FROM users WHERE u_uuid = ?", (user_uuid,))
+        return row[0] if row else 0
+
+    def get_student_enrollments(self, user_uuid: bytes):
+        return [(code,) for code in self.slots.codes(self._mask(user_uuid))]
+
+    def get_student_courses_detailed(self, user_uuid: bytes):
+        return self.db.execute_query("""
+            SELECT c.name, c.code
+            FROM course_slots s JOIN courses c ON c.code = s.code
+            WHERE (SELECT course_mask FROM users WHERE u_uuid = ?) & (1 << s.slot)
+        """, (user_uuid,))
+
+    def remove_enrollment(self, user_uuid: bytes, course_code: str) -> bool:
+        bit = self.slots.bit(course_code)
+        if bit is None:
+            return True  # like deleting a row that is not there
+
+        def work(cursor):
+            self._drop(cursor, user_uuid, bit, course_code)
+            return True
+
+        return self.db.execute_transaction(work)
+
+    def swap_enrollment(self, user_uuid: bytes, old_code: str, new_code: str) -> bool:
+        """Atomically replace one enrollment with another: one mask update plus the two seat counters."""
+        old_bit, new_bit = self.slots.bit(old_code), self.slots.bit(new_code)
+        if new_bit is None:
+            return False
+        old_bit = old_bit or 0
+
+        def work(cursor):
+            row = cursor.execute("SELECT course_mask FROM users WHERE u_uuid = ?", (user_uuid,)).fetchone()
+            if row is None or row[0] & new_bit:
+                return False
+            mask = row[0] & ~old_bit | new_bit
+            if mask.bit_count() > MAX_STUDENT_COURSES:
+                return False
+            cursor.execute(
+                "UPDATE courses SET enrollment_count = enrollment_count + 1 "
+                "WHERE code = ? AND (capacity IS NULL OR enrollment_count < capacity)", (new_code,)
+            )
+            if cursor.rowcount != 1:
+                return False
+            if row[0] & old_bit:
+                cursor.execute("UPDATE courses SET enrollment_count = enrollment_count - 1 WHERE code = ?", (old_code,))
+            cursor.execute(
+                "UPDATE users SET course_mask = ?, enrollment_count = ? WHERE u_uuid = ?",
+                (mask, mask.bit_count(), user_uuid)
+            )
+            return True
+
+        return self.db.execute_transaction(work)
+
+    # Decodes each mask against course_slots in code order, as the row layout lists them.
+    ROSTER_SOURCE = """
+        SELECT u.custom_id, u.u_uuid, u.name, (
+            SELECT GROUP_CONCAT(code, ', ') FROM (
+                SELECT code FROM course_slots WHERE u.course_mask & (1 << slot) ORDER BY code
+            )
+        )
+        FROM users u
+        WHERE u.role = 'student' AND u.course_mask != 0 {where}
+    """
@@ -0,0 +1,128 @@
+import csv
+import gzip
+import json
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Iterator, TextIO
+
+from .bitmask_enrollments import BITMASK, CourseSlots, enrollment_storage
+from .database import UniversityDB
+from .migrations import MAX_STUDENT_COURSES
+
+EXPORT_BUFFER_SIZE = 1 << 20
+EXPORT_FETCH_SIZE = 5000
+EXPORT_KINDS = ("users", "courses", "enrollments", "roster")
+
+# Normalized exports use the same columns the importer reads, so files round-trip.
+EXPORT_QUERIES = {
+    "users": (("name", "role", "custom_id"), "SELECT name, role, custom_id FROM users"),
+    "courses": (("code", "name", "capacity"), "SELECT code, name, capacity FROM courses"),
+    "enrollments": (("custom_id", "course_code"), """
+        SELECT u.custom_id, e.course_code
+        FROM users u
+        JOIN enrollments e ON e.user_uuid = u.u_uuid
+        ORDER BY u.rowid
+    """),
+}
+
+# Walks users in rowid order and seeks each student's enrollments, so the
+# rows arrive grouped by student without a temp B-tree or GROUP_CONCAT.
+ROSTER_EXPORT_QUERY = """
+    SELECT u.custom_id, u.name, e.course_code
+    FROM users u
+    LEFT JOIN enrollments e ON e.user_uuid = u.u_uuid
+    WHERE u.role = 'student'
+    ORDER BY u.rowid
+"""
+
+# The bitmask layout keeps each student's courses on the users row itself.
+MASK_EXPORT_QUERIES = {
+    "enrollments": "SELECT custom_id, course_mask FROM users WHERE course_mask != 0 ORDER BY rowid",
+    "roster": "SELECT custom_id, name, course_mask FROM users WHERE role = 'student' ORDER BY rowid",
+}
+
+
+def open_output(path: str, compress: bool = False) -> TextIO:
+    """Open `path` for buffered text writing, gzip-compressed for `.gz` paths or when asked."""
+    if compress or path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(path, "w", encoding="utf-8", newline="", buffering=EXPORT_BUFFER_SIZE)
+
+
+class BulkExporter:
+    """Streams tables or the pivoted roster from a cursor straight to CSV/JSONL.
+
+    Only one fetch batch is held in memory at a time, so memory stays flat no
+    matter how many rows are written.
+    """
+
+    def __init__(self, db: UniversityDB, fetch_size: int = EXPORT_FETCH_SIZE):
+        self.db = db
+        self.fetch_size = fetch_size
+
+    def iter_rows(self, kind: str) -> tuple[tuple[str, ...], Iterator[tuple]]:
+        """Column names and a lazy row iterator for one export kind."""
+        if kind not in EXPORT_KINDS:
+            raise ValueError(f"Unknown export kind '{kind}'. Expected one of: {', '.join(EXPORT_KINDS)}.")
+        masks = kind in MASK_EXPORT_QUERIES and enrollment_storage(self.db) == BITMASK
+        if kind == "roster":
+            columns = ("custom_id", "name") + tuple(f"course_{i}" for i in range(1, MAX_STUDENT_COURSES + 1))
+            return columns, self._iter_mask_roster() if masks else self._iter_roster()
+        columns, query = EXPORT_QUERIES[kind]
+        if masks:
+            return columns, self._iter_mask_enrollments()
+        return columns, self.db.iter_query(query, batch_size=self.fetch_size)
+
+    def _iter_roster(self) -> Iterator[tuple]:
+        rows = self.db.iter_query(ROSTER_EXPORT_QUERY, batch_size=self.fetch_size)
+        for (custom_id, name), group in groupby(rows, key=itemgetter(0, 1)):
+            codes = [code for _, _, code in group if code is not None]
+            yield (custom_id, name, *codes, *([None] * (MAX_STUDENT_COURSES - len(codes))))
+
+    def _iter_mask_enrollments(self) -> Iterator[tuple]:
+        slots = CourseSlots(self.db)
+        for custom_id, mask in self.db.iter_query(MASK_EXPORT_QUERIES["enrollments"], batch_size=self.fetch_size):
+            for code in slots.codes(mask):
+                yield custom_id, code
+
+    def _iter_mask_roster(self) -> Iterator[tuple]:
+        slots = CourseSlots(self.db)
+        for custom_id, name, mask in self.db.iter_query(MASK_EXPORT_QUERIES["roster"], batch_size=self.fetch_size):
+            codes = slots.codes(mask)
+            yield (custom_id, name, *codes, *([None] * (MAX_STUDENT_COURSES - len(codes))))
+
+    def export(self, kind: str, path: str, compress: bool = False,
+               progress: Callable[[int], None] | None = None) -> int:
+        """Write one export to `path` (CSV unless it ends in .jsonl[.gz]), returning the row count."""
+        columns, rows = self.iter_rows(kind)
+        jsonl = path.removesuffix(".gz").endswith(".jsonl")
+        count = 0
+        with open_output(path, compress) as f:
+            if jsonl:
+                write = self._jsonl_writer(f, kind, columns)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                write = writer.writerow
+            for row in rows:
+                write(row)
+                count += 1
+                if progress is not None and count % self.fetch_size == 0:
+                    progress(count)
+        if progress is not None:
+            progress(count)
+        return count
+
+    @staticmethod
+    def _jsonl_writer(f: TextIO, kind: str, columns: tuple[str, ...]):
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        if kind == "roster":
+            def write(row):
+                courses = [code for code in row[2:] if code is not None]
+                f.write(encode({"custom_id": row[0], "name": row[1], "courses": courses}))
+                f.write("\n")
+        else:
+            def write(row):
+                f.write(encode(dict(zip(columns, row))))
+                f.write("\n")
+        return write
@@ -0,0 +1,220 @@
+import csv
+import gzip
+import json
+import uuid
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterator, TextIO
+
+from .bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, enrollment_storage
+from .database import UniversityDB
+from .repositories import UserRepository, CourseRepository, EnrollmentRepository
+from .utils import is_admin_string_hard
+
+IMPORT_CHUNK_SIZE = 50000
+LOOKUP_BATCH_SIZE = 5000
+MAX_REJECT_SAMPLES = 100
+# New IDs for rows without a custom_id; retried when one is already taken.
+GENERATED_ID_ATTEMPTS = 5
+IMPORT_KINDS = ("users", "courses", "enrollments")
+
+
+@dataclass
+class ImportReport:
+    """Running totals for one import; only the first few rejects are kept in memory."""
+    kind: str
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    samples: list[tuple[int, str, dict]] = field(default_factory=list)
+
+    def reject(self, line: int, reason: str, row: dict):
+        self.rejected += 1
+        if len(self.samples) < MAX_REJECT_SAMPLES:
+            self.samples.append((line, reason, row))
+
+
+def open_text(path: str) -> TextIO:
+    """Open a text file for reading, transparently un-gzipping `.gz` files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def iter_records(path: str) -> Iterator[tuple[int, dict]]:
+    """Yield (line_number, record) pairs from a CSV or JSONL file, one at a time."""
+    with open_text(path) as f:
+        if path.removesuffix(".gz").endswith(".jsonl"):
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                yield line_no, record if isinstance(record, dict) else {"_raw": line.rstrip("\n")}
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+
+
+def detect_kind(fields) -> str:
+    """Guess what a file holds from its column names."""
+    if "course_code" in fields:
+        return "enrollments"
+    if "code" in fields:
+        return "courses"
+    return "users"
+
+
+def _text(record: dict, key: str) -> str:
+    value = record.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+def validate_user(record: dict) -> tuple[str, str, str]:
+    name = _text(record, "name")
+    role = _text(record, "role").lower() or "student"
+    custom_id = _text(record, "custom_id")
+    if not name:
+        raise ValueError("missing name")
+    if role not in ("student", "admin"):
+        raise ValueError(f"unknown role '{role}'")
+    if role == "admin" and not is_admin_string_hard(custom_id):
+        raise ValueError("admin custom_id is not a hard admin string")
+    return name, role, custom_id
+
+
+def generate_custom_id(taken: set[str]) -> str:
+    """A new 8-character custom ID that is not in `taken` (which it is added to)."""
+    while (custom_id := str(uuid.uuid4())[:8].upper()) in taken:
+        pass
+    taken.add(custom_id)
+    return custom_id
+
+
+def validate_course(record: dict) -> tuple[str, str, int | None]:
+    code = _text(record, "code")
+    name = _text(record, "name")
+    capacity = _text(record, "capacity")
+    if not code or not name:
+        raise ValueError("missing code or name")
+    if capacity and not capacity.isdigit():
+        raise ValueError(f"invalid capacity '{capacity}'")
+    return code, name, int(capacity) if capacity else None
+
+
+def validate_enrollment(record: dict) -> tuple[str, str]:
+    custom_id = _text(record, "custom_id")
+    course_code = _text(record, "course_code")
+    if not custom_id or not course_code:
+        raise ValueError("missing custom_id or course_code")
+    return custom_id, course_code
+
+
+VALIDATORS = {
+    "users": validate_user,
+    "courses": validate_course,
+    "enrollments": validate_enrollment,
+}
+
+
+class BulkImporter:
+    """Streams a CSV/JSONL file into the database in bounded, separately committed chunks.
+
+    Memory use is one chunk of parsed rows plus the reject samples, whatever
+    the file size.
+    """
+
+    def __init__(self, db: UniversityDB, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.user_repo = UserRepository(db)
+        self.course_repo = CourseRepository(db)
+        self.enrollment_repo = (
+            BitmaskEnrollmentRepository(db) if enrollment_storage(db) == BITMASK else EnrollmentRepository(db)
+        )
+
+    def import_file(self, path: str, kind: str | None = None,
+                    progress: Callable[[ImportReport], None] | None = None) -> ImportReport:
+        records = iter_records(path)
+        first = next(records, None)
+        if first is None:
+            return ImportReport(kind or "users")
+        kind = kind or detect_kind(first[1])
+        if kind not in VALIDATORS:
+            raise ValueError(f"Unknown import kind '{kind}'. Expected one of: {', '.join(IMPORT_KINDS)}.")
+
+        report = ImportReport(kind)
+        validate = VALIDATORS[kind]
+        records = self._chain(first, records)
+        while batch := list(islice(records, self.chunk_size)):
+            chunk = []
+            for line_no, record in batch:
+                report.read += 1
+                try:
+                    chunk.append((line_no, record, validate(record)))
+                except ValueError as e:
+                    report.reject(line_no, str(e), record)
+            if chunk:
+                self._write_chunk(kind, chunk, report)
+            if progress is not None:
+                progress(report)
+        return report
+
+    @staticmethod
+    def _chain(first, rest):
+        yield first
+        yield from rest
+
+    def _write_chunk(self, kind: str, chunk: list, report: ImportReport):
+        if kind == "users":
+            results = self._write_users(chunk)
+            reason = "duplicate custom_id"
+        elif kind == "courses":
+            results = self.course_repo.add_courses_bulk(row for _, _, row in chunk)
+            reason = "duplicate course code"
+        else:
+            chunk, results = self._write_enrollments(chunk, report)
+            reason = "refused (unknown course, duplicate, course full or limit reached)"
+
+        for (line_no, record, _), ok in zip(chunk, results):
+            if ok:
+                report.imported += 1
+            else:
+                report.reject(line_no, reason, record)
+
+    def _write_users(self, chunk: list) -> list[bool]:
+        # Generated IDs avoid the chunk's own IDs up front and are regenerated if already stored.
+        taken = {custom_id for _, _, (_, _, custom_id) in chunk if custom_id}
+        rows = [(name, role, custom_id or generate_custom_id(taken)) for _, _, (name, role, custom_id) in chunk]
+        results = [u is not None for u in self.user_repo.register_users_bulk(rows)]
+        for _ in range(GENERATED_ID_ATTEMPTS):
+            retry = [i for i, ok in enumerate(results) if not ok and not chunk[i][2][2]]
+            if not retry:
+                break
+            rows = [(*chunk[i][2][:2], generate_custom_id(taken)) for i in retry]
+            for i, u_uuid in zip(retry, self.user_repo.register_users_bulk(rows)):
+                results[i] = u_uuid is not None
+        return results
+
+    def _write_enrollments(self, chunk: list, report: ImportReport):
+        # Resolve custom IDs a few thousand at a time instead of one lookup per row.
+        custom_ids = list({custom_id for _, _, (custom_id, _) in chunk})
+        uuids = {}
+        for start in range(0, len(custom_ids), LOOKUP_BATCH_SIZE):
+            batch = custom_ids[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            uuids.update(self.db.execute_query(
+                f"SELECT custom_id, u_uuid FROM users WHERE custom_id IN ({placeholders})", tuple(batch)
+            ))
+
+        resolved = []
+        for line_no, record, (custom_id, course_code) in chunk:
+            if custom_id in uuids:
+                resolved.append((line_no, record, (uuids[custom_id], course_code)))
+            else:
+                report.reject(line_no, f"unknown custom_id '{custom_id}'", record)
+        results = self.enrollment_repo.enroll_many(row for _, _, row in resolved)
+        return resolved, results
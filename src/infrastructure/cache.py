@@ -0,0 +1,227 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable
+
+from .bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, enrollment_storage
+from .repositories import UserRepository, CourseRepository, EnrollmentRepository
+
+DEFAULT_CACHE_SIZE = 1024
+# Lifetime the CLI and TUI give entries, bounding how long writes from other processes go unseen.
+SHARED_CACHE_TTL = 5.0
+
+
+class LRUCache:
+    """Thread-safe bounded LRU map with an optional per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        # Bumped by every invalidate/clear; a load that started before a bump is not stored.
+        self._generation = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], object], cache_none: bool = True):
+        """Return the cached value for `key`, calling `loader` on a miss or expiry.
+
+        With `cache_none` off, a loader returning None is not stored, so a row
+        that appears later (written by another connection) is found at once.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+            generation = self._generation
+        value = loader()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation != self._generation or (value is None and not cache_none):
+                return value
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+class CachedUserRepository(UserRepository):
+    """UserRepository with read-through caching of single-user lookups."""
+
+    def __init__(self, db, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None, directory=None):
+        super().__init__(db, directory)
+        self.cache = LRUCache(maxsize, ttl)
+
+    def get_user_by_custom_id(self, custom_id: str):
+        return self.cache.get_or_load(
+            ("custom_id", custom_id), lambda: super(CachedUserRepository, self).get_user_by_custom_id(custom_id),
+            cache_none=False,
+        )
+
+    def get_user_by_uuid(self, u_uuid: bytes):
+        return self.cache.get_or_load(
+            ("uuid", u_uuid), lambda: super(CachedUserRepository, self).get_user_by_uuid(u_uuid),
+            cache_none=False,
+        )
+
+    def register_user(self, name: str, role: str, custom_id: str):
+        u_uuid = super().register_user(name, role, custom_id)
+        self.db.on_rollback(self.cache.clear)
+        return u_uuid
+
+    def register_users_bulk(self, users: Iterable[tuple[str, str, str]]) -> list[bytes | None]:
+        try:
+            return super().register_users_bulk(users)
+        finally:
+            self.cache.clear()
+            self.db.on_rollback(self.cache.clear)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+class CachedCourseRepository(CourseRepository):
+    """CourseRepository with a read-through cache over the course catalog."""
+
+    def __init__(self, db, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None):
+        super().__init__(db)
+        self.cache = LRUCache(maxsize, ttl)
+
+    def get_all_courses(self):
+        return self.cache.get_or_load("all", super().get_all_courses)
+
+    def get_course_by_code(self, code: str):
+        return self.cache.get_or_load(
+            ("code", code), lambda: super(CachedCourseRepository, self).get_course_by_code(code),
+            cache_none=False,
+        )
+
+    def get_course_count(self) -> int:
+        return self.cache.get_or_load("count", super().get_course_count)
+
+    def add_course(self, code: str, name: str, capacity: int | None = None, max_courses: int | None = None) -> bool:
+        success = super().add_course(code, name, capacity, max_courses)
+        if success:
+            self.cache.invalidate("all", "count", ("code", code))
+            self.db.on_rollback(self.cache.clear)
+        return success
+
+    def add_courses_bulk(self, courses: Iterable[tuple]) -> list[bool]:
+        try:
+            return super().add_courses_bulk(courses)
+        finally:
+            self.cache.clear()
+            self.db.on_rollback(self.cache.clear)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+class CachedEnrollmentRepository(EnrollmentRepository):
+    """EnrollmentRepository with per-student read-through caching.
+
+    Every write drops the affected student's entries; the roster is not cached.
+    Inside a db.transaction() that is later rolled back, the whole cache is
+    dropped, since entries read after a write may hold the undone rows.
+    """
+
+    STUDENT_KEYS = ("codes", "detailed", "count")
+
+    def __init__(self, db, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None):
+        super().__init__(db)
+        self.cache = LRUCache(maxsize, ttl)
+
+    def _invalidate_student(self, user_uuid: bytes):
+        self.cache.invalidate(*((kind, user_uuid) for kind in self.STUDENT_KEYS))
+        self.db.on_rollback(self.cache.clear)
+
+    def get_student_enrollments(self, user_uuid: bytes):
+        return self.cache.get_or_load(
+            ("codes", user_uuid),
+            lambda: super(CachedEnrollmentRepository, self).get_student_enrollments(user_uuid),
+        )
+
+    def get_student_courses_detailed(self, user_uuid: bytes):
+        return self.cache.get_or_load(
+            ("detailed", user_uuid),
+            lambda: super(CachedEnrollmentRepository, self).get_student_courses_detailed(user_uuid),
+        )
+
+    def get_enrollment_count(self, user_uuid: bytes) -> int:
+        return self.cache.get_or_load(
+            ("count", user_uuid),
+            lambda: super(CachedEnrollmentRepository, self).get_enrollment_count(user_uuid),
+        )
+
+    def enroll_student(self, user_uuid: bytes, course_code: str) -> bool:
+        success = super().enroll_student(user_uuid, course_code)
+        self._invalidate_student(user_uuid)
+        return success
+
+    def enroll_many(self, enrollments: Iterable[tuple[bytes, str]]) -> list[bool]:
+        try:
+            return super().enroll_many(enrollments)
+        finally:
+            self.cache.clear()
+            self.db.on_rollback(self.cache.clear)
+
+    def remove_enrollment(self, user_uuid: bytes, course_code: str) -> bool:
+        success = super().remove_enrollment(user_uuid, course_code)
+        self._invalidate_student(user_uuid)
+        return success
+
+    def swap_enrollment(self, user_uuid: bytes, old_code: str, new_code: str) -> bool:
+        success = super().swap_enrollment(user_uuid, old_code, new_code)
+        self._invalidate_student(user_uuid)
+        return success
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+class CachedBitmaskEnrollmentRepository(CachedEnrollmentRepository, BitmaskEnrollmentRepository):
+    """The same per-student caching over the bitmask layout."""
+
+
+def cached_enrollment_repository(db, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = None):
+    """A cached enrollment repository for whichever layout `db` stores enrollments in."""
+    if enrollment_storage(db) == BITMASK:
+        return CachedBitmaskEnrollmentRepository(db, maxsize, ttl)
+    return CachedEnrollmentRepository(db, maxsize, ttl)
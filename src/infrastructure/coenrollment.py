@@ -0,0 +1,140 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from .analytics import fill_rate
+from .bitmask_enrollments import BITMASK, CourseSlots, enrollment_storage
+from .database import UniversityDB
+
+try:
+    import numpy as np
+except ImportError:  # optional: the pure-Python engine gives the same results, more slowly
+    np = None
+
+COENROLLMENT_FETCH_SIZE = 10000
+# Joins a student's course codes inside SQLite; the ASCII unit separator cannot be typed into a code.
+CODE_SEPARATOR = "\x1f"
+
+
+@dataclass
+class CourseDemand:
+    """Batch course statistics; every per-course list follows the order of `codes`."""
+    codes: list[str]
+    names: list[str]
+    capacities: list[int | None]
+    students: int
+    # popularity[i]: students enrolled in course i
+    popularity: list[int]
+    # co_enrollment[i][j]: students taking both i and j (the diagonal is popularity)
+    co_enrollment: list[list[int]]
+    # conflicts[i]: other courses sharing at least one student with i, i.e. the
+    # courses that cannot be timetabled in the same slot as i
+    conflicts: list[int]
+    # conflict_students[i]: students of i who also take another course
+    conflict_students: list[int]
+    backend: str
+    elapsed: float
+
+    def fill_rate(self, i: int) -> float | None:
+        return fill_rate(self.popularity[i], self.capacities[i])
+
+    def top_partner(self, i: int) -> tuple[str, int] | None:
+        """The course most often taken together with course i, and how many students take both."""
+        best = max((j for j in range(len(self.codes)) if j != i), key=lambda j: self.co_enrollment[i][j],
+                   default=None)
+        if best is None or self.co_enrollment[i][best] == 0:
+            return None
+        return self.codes[best], self.co_enrollment[i][best]
+
+
+class CoEnrollmentEngine:
+    """Course popularity, co-enrollment and timetable-conflict counts computed in batch.
+
+    SQLite groups the enrollments by student and then by course set (or, in
+    the bitmask layout, the users by course mask), so only the distinct course
+    combinations come back, each with the number of students taking it. That
+    is the students x courses matrix with identical rows collapsed into one
+    weighted row. With NumPy installed it becomes a dense uint8 array and the
+    course x course co-enrollment matrix is a single weighted AᵀA product;
+    without it each combination is a bitmask of course indices, accumulated
+    in pure Python.
+    """
+
+    def __init__(self, db: UniversityDB, use_numpy: bool | None = None):
+        if use_numpy and np is None:
+            raise RuntimeError("NumPy is not installed.")
+        self.db = db
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+
+    def _combinations(self, index: dict[str, int]) -> list[tuple[list[int], int]]:
+        """([course indices], students taking exactly that set) for every distinct set."""
+        if enrollment_storage(self.db) == BITMASK:
+            # A course mask already is the student's course set.
+            slots = CourseSlots(self.db)
+            rows = self.db.execute_query(
+                "SELECT course_mask, COUNT(*) FROM users WHERE course_mask != 0 GROUP BY course_mask"
+            )
+            return [([index[code] for code in slots.codes(mask)], count) for mask, count in rows]
+        # enrollments is clustered on (user_uuid, course_code): the inner GROUP BY is one ordered scan.
+        rows = self.db.iter_query(
+            "SELECT courses, COUNT(*) FROM ("
+            "SELECT group_concat(course_code, ?) AS courses FROM enrollments GROUP BY user_uuid"
+            ") GROUP BY courses",
+            (CODE_SEPARATOR,),
+            batch_size=COENROLLMENT_FETCH_SIZE,
+        )
+        return [([index[code] for code in courses.split(CODE_SEPARATOR)], count) for courses, count in rows]
+
+    def compute(self) -> CourseDemand:
+        start_time = time.perf_counter()
+        courses = self.db.execute_query("SELECT code, name, capacity FROM courses ORDER BY code")
+        codes = [code for code, _, _ in courses]
+        combinations = self._combinations({code: i for i, code in enumerate(codes)})
+        if self.use_numpy:
+            matrix, conflict_students = self._co_enrollment_numpy(combinations, len(codes))
+        else:
+            matrix, conflict_students = self._co_enrollment_python(combinations, len(codes))
+
+        n = len(codes)
+        return CourseDemand(
+            codes=codes,
+            names=[name for _, name, _ in courses],
+            capacities=[capacity for _, _, capacity in courses],
+            students=sum(count for _, count in combinations),
+            popularity=[matrix[i][i] for i in range(n)],
+            co_enrollment=matrix,
+            conflicts=[sum(1 for j in range(n) if j != i and matrix[i][j]) for i in range(n)],
+            conflict_students=conflict_students,
+            backend="numpy" if self.use_numpy else "python",
+            elapsed=time.perf_counter() - start_time,
+        )
+
+    @staticmethod
+    def _co_enrollment_numpy(combinations, n: int):
+        a = np.zeros((len(combinations), n), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(combinations)), [len(taken) for taken, _ in combinations])
+        a[rows, [i for taken, _ in combinations for i in taken]] = 1
+        weighted = a * np.array([count for _, count in combinations], dtype=np.int64)[:, None]
+        matrix = a.T.astype(np.int64) @ weighted
+        # Students of course i who take anything else: the weighted rows with more than one course.
+        conflict_students = weighted[a.sum(axis=1) > 1].sum(axis=0)
+        return matrix.tolist(), conflict_students.tolist()
+
+    @staticmethod
+    def _co_enrollment_python(combinations, n: int):
+        masks = Counter()
+        for taken, count in combinations:
+            # Bitmasks merge sets that group_concat happened to list in a different order.
+            masks[sum(1 << i for i in set(taken))] += count
+
+        matrix = [[0] * n for _ in range(n)]
+        conflict_students = [0] * n
+        for mask, count in masks.items():
+            bits = [i for i in range(n) if mask >> i & 1]
+            for i in bits:
+                row = matrix[i]
+                for j in bits:
+                    row[j] += count
+                if len(bits) > 1:
+                    conflict_students[i] += count
+        return matrix, conflict_students
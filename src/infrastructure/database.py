@@ -1,77 +1,431 @@
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+from .group_commit import DEFAULT_GROUP_MAX, DEFAULT_GROUP_WINDOW, GroupCommitter
+from .instrumentation import DEFAULT_SLOW_QUERY_MS, QueryInstrumentation
+from .migrations import SCHEMA_VERSION, migrate, schema_version
+from .pool import DEFAULT_POOL_SIZE, ReaderPool
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 DB_NAME = "student_manager.db"
+FETCH_BATCH_SIZE = 500
+# How long a connection waits on another writer's lock before SQLite gives up (sqlite3's default).
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+
+def is_lock_error(error: sqlite3.Error) -> bool:
+    """True when `error` means another connection held the lock past the busy timeout."""
+    return isinstance(error, sqlite3.OperationalError) and (
+        "locked" in str(error) or "busy" in str(error)
+    )
+
+
+def is_read_only_error(error: sqlite3.Error) -> bool:
+    """True when `error` means the database cannot be written (read-only file, mount or query_only)."""
+    return isinstance(error, sqlite3.OperationalError) and "readonly" in str(error)
+
+
+class Rollback(Exception):
+    """Raise inside UniversityDB.transaction() to undo that block without an error escaping it."""
+
 
 class UniversityDB:
-    """Manages SQLite database connections with optimized settings for concurrency and performance."""
+    """Manages SQLite database connections with optimized settings for concurrency and performance.
+
+    In pooled mode reads run on per-thread reader connections while every write
+    is serialized through the single writer connection (``self.conn``). With
+    ``group_commit`` enabled, execute_update calls from concurrent callers share
+    transactions instead of committing one statement at a time. With
+    ``instrument`` enabled every statement and commit is timed into
+    ``self.instrumentation`` (see snapshot()). Writes made inside
+    ``transaction()`` share one commit (see there).
+    """
 
-    def __init__(self, db_path: str = DB_NAME):
+    def __init__(self, db_path: str = DB_NAME, pooled: bool = False, pool_size: int = DEFAULT_POOL_SIZE,
+                 group_commit: bool = False, group_window: float = DEFAULT_GROUP_WINDOW,
+                 group_max: int = DEFAULT_GROUP_MAX, busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+                 instrument: bool = False, slow_query_ms: float | None = DEFAULT_SLOW_QUERY_MS):
+        if pooled and db_path == ":memory:":
+            raise ValueError("Pooled mode requires a file-backed database.")
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=busy_timeout)
         self.cursor = self.conn.cursor()
+        self.lock = threading.RLock()
+        # Writes report failure as False; these keep the cause for callers that need it.
+        self.last_error: sqlite3.Error | None = None
+        self.lock_errors = 0
+        self.instrumentation = QueryInstrumentation(slow_query_ms) if instrument else None
+        # The thread inside transaction() and how many blocks (transaction plus savepoints) it has open.
+        self._tx_owner: int | None = None
+        self._tx_depth = 0
+        self._rollback_hooks: list[Callable[[], None]] = []
         self._init_db()
+        self.pool = ReaderPool(db_path, pool_size) if pooled else None
+        self.group = GroupCommitter(
+            self.conn, self.lock, group_window, group_max, self.instrumentation, self.write_failed
+        ) if group_commit else None
 
     def _init_db(self):
-        """Initialize schema with foreign keys and essential indexes."""
+        """Apply connection PRAGMAs and bring the schema up to the current version.
+
+        WAL mode and the schema are stored in the file, so on an up-to-date
+        database startup costs a single `user_version` read.
+        """
         self.cursor.execute("PRAGMA foreign_keys = ON")
-        self.cursor.execute("PRAGMA journal_mode = WAL")
         self.cursor.execute("PRAGMA synchronous = NORMAL")
         self.cursor.execute("PRAGMA cache_size = -2000")  
         self.cursor.execute("PRAGMA temp_store = MEMORY")
 
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                u_uuid BLOB PRIMARY KEY,
-                custom_id TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                role TEXT NOT NULL
-            )
-        ''')
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS courses (
-                code TEXT PRIMARY KEY,
-                name TEXT NOT NULL
-            )
-        ''')
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS enrollments (
-                user_uuid BLOB,
-                course_code TEXT,
-                PRIMARY KEY(user_uuid, course_code),
-                FOREIGN KEY(user_uuid) REFERENCES users(u_uuid) ON DELETE CASCADE,
-                FOREIGN KEY(course_code) REFERENCES courses(code) ON DELETE CASCADE
-            )
-        ''')
-
-        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_users_custom_id ON users(custom_id)")
-        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_enrollments_user ON enrollments(user_uuid)")
-
-        self.conn.commit()
+        if schema_version(self.conn) != SCHEMA_VERSION:
+            self.cursor.execute("PRAGMA journal_mode = WAL").fetchone()
+            migrate(self.conn)
 
     def execute_query(self, query: str, params: tuple = ()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        start = time.perf_counter_ns() if self.instrumentation is not None else 0
+        if self.pool is not None and not self.in_transaction:
+            with self.pool.reader() as conn:
+                rows = conn.execute(query, params).fetchall()
+        else:
+            with self.lock:
+                self.cursor.execute(query, params)
+                rows = self.cursor.fetchall()
+        if start:
+            self.instrumentation.record(query, time.perf_counter_ns() - start, len(rows))
+        return rows
 
     def execute_single(self, query: str, params: tuple = ()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchone()
+        start = time.perf_counter_ns() if self.instrumentation is not None else 0
+        if self.pool is not None and not self.in_transaction:
+            with self.pool.reader() as conn:
+                row = conn.execute(query, params).fetchone()
+        else:
+            with self.lock:
+                self.cursor.execute(query, params)
+                row = self.cursor.fetchone()
+        if start:
+            self.instrumentation.record(query, time.perf_counter_ns() - start, row is not None)
+        return row
+
+    def iter_query(self, query: str, params: tuple = (), batch_size: int = FETCH_BATCH_SIZE) -> Iterator[tuple]:
+        """Yield rows lazily, pulling `batch_size` rows at a time with fetchmany.
+
+        Uses its own cursor so other statements can run while the iterator is
+        alive; in pooled mode a reader stays checked out until it is exhausted
+        or closed.
+        """
+        if self.instrumentation is not None:
+            yield from self._iter_instrumented(query, params, batch_size)
+        elif self.pool is not None and not self.in_transaction:
+            with self.pool.reader() as conn:
+                yield from self._iter_cursor(conn.cursor(), query, params, batch_size)
+        else:
+            yield from self._iter_cursor(self.conn.cursor(), query, params, batch_size)
+
+    def _iter_instrumented(self, query: str, params: tuple, batch_size: int) -> Iterator[tuple]:
+        # Timed from execute until the iterator is exhausted or closed, consumer time included.
+        start = time.perf_counter_ns()
+        count = 0
+        try:
+            if self.pool is not None and not self.in_transaction:
+                with self.pool.reader() as conn:
+                    for row in self._iter_cursor(conn.cursor(), query, params, batch_size):
+                        count += 1
+                        yield row
+            else:
+                for row in self._iter_cursor(self.conn.cursor(), query, params, batch_size):
+                    count += 1
+                    yield row
+        finally:
+            self.instrumentation.record(query, time.perf_counter_ns() - start, count)
+
+    @staticmethod
+    def _iter_cursor(cursor: sqlite3.Cursor, query: str, params: tuple, batch_size: int) -> Iterator[tuple]:
+        try:
+            cursor.execute(query, params)
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+        finally:
+            cursor.close()
 
     def execute_update(self, query: str, params: tuple = ()) -> bool:
+        if self.in_transaction:
+            return self._execute_in_transaction(query, params)
+        if self.group is not None:
+            return self.group.submit(query, params).result()
+        if self.instrumentation is not None:
+            return self._execute_update_instrumented(query, params)
+        with self.lock:
+            try:
+                self.cursor.execute(query, params)
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                self.write_failed(e)
+                return False
+
+    def _execute_update_instrumented(self, query: str, params: tuple) -> bool:
+        with self.lock:
+            start = time.perf_counter_ns()
+            try:
+                self.cursor.execute(query, params)
+            except sqlite3.Error as e:
+                self.instrumentation.record(query, time.perf_counter_ns() - start)
+                self.conn.rollback()
+                self.write_failed(e)
+                return False
+            executed = time.perf_counter_ns()
+            self.instrumentation.record(query, executed - start, max(self.cursor.rowcount, 0))
+            try:
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                self.write_failed(e)
+                return False
+            finally:
+                self.instrumentation.record_commit(time.perf_counter_ns() - executed)
+
+    def _execute_in_transaction(self, query: str, params: tuple) -> bool:
+        # SQLite undoes just the failed statement, so the transaction carries on; the caller decides its fate.
+        with self.lock:
+            start = time.perf_counter_ns() if self.instrumentation is not None else 0
+            try:
+                self.cursor.execute(query, params)
+            except sqlite3.Error as e:
+                if start:
+                    self.instrumentation.record(query, time.perf_counter_ns() - start)
+                self.write_failed(e)
+                if not self.conn.in_transaction:
+                    raise
+                return False
+            if start:
+                self.instrumentation.record(query, time.perf_counter_ns() - start, max(self.cursor.rowcount, 0))
+            return True
+
+    @property
+    def in_transaction(self) -> bool:
+        """True when the calling thread is inside transaction()."""
+        return self._tx_owner == threading.get_ident()
+
+    @contextmanager
+    def transaction(self, nowait: bool = False) -> Iterator[sqlite3.Cursor]:
+        """Run a block of writes as one transaction on the writer connection.
+
+            with db.transaction():
+                enrollments.remove_enrollment(u_uuid, "C1")
+                if not enrollments.enroll_student(u_uuid, "C2"):
+                    raise Rollback
+
+        The outermost block starts with BEGIN IMMEDIATE and commits once on a
+        clean exit, so a multi-step flow costs one fsync and is atomic. Nested
+        blocks become savepoints and undo only their own writes. Inside the
+        block execute_update, execute_many and the repositories built on them
+        skip their own commits (and the group committer); a failed statement
+        still returns False and leaves the rest of the transaction alone.
+        Reads run on the writer connection, so they see the block's writes.
+        The writer lock is held throughout, so other threads' writes wait.
+
+        An exception undoes the block and propagates, except Rollback, which
+        stops there. The yielded cursor is the writer's, for statements that
+        need rowcount or fetches within the transaction.
+
+        With `nowait`, an outermost block that finds another connection
+        holding the write lock fails at once with the lock error instead of
+        waiting out the busy timeout.
+        """
+        with self.lock:
+            depth = self._tx_depth
+            savepoint = f"tx_{depth}"
+            if depth == 0:
+                if nowait:
+                    busy_timeout = self.cursor.execute("PRAGMA busy_timeout").fetchone()[0]
+                    self.cursor.execute("PRAGMA busy_timeout = 0")
+                try:
+                    self.cursor.execute("BEGIN IMMEDIATE")
+                except sqlite3.Error as e:
+                    self.write_failed(e)
+                    raise
+                finally:
+                    if nowait:
+                        self.cursor.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+                self._tx_owner = threading.get_ident()
+            else:
+                self.cursor.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self.cursor
+            except BaseException as e:
+                self._tx_depth -= 1
+                if depth == 0:
+                    self.conn.rollback()
+                elif self.conn.in_transaction:
+                    self.cursor.execute(f"ROLLBACK TO {savepoint}")
+                    self.cursor.execute(f"RELEASE {savepoint}")
+                for hook in self._rollback_hooks:
+                    hook()
+                if isinstance(e, sqlite3.Error) and e is not self.last_error:
+                    self.write_failed(e)
+                if not isinstance(e, Rollback):
+                    raise
+            else:
+                self._tx_depth -= 1
+                if depth == 0:
+                    self._commit_transaction()
+                else:
+                    self.cursor.execute(f"RELEASE {savepoint}")
+            finally:
+                if depth == 0:
+                    self._tx_owner = None
+                    self._tx_depth = 0
+                    self._rollback_hooks.clear()
+
+    def _commit_transaction(self):
+        start = time.perf_counter_ns() if self.instrumentation is not None else 0
         try:
-            self.cursor.execute(query, params)
             self.conn.commit()
-            return True
-        except sqlite3.Error:
+        except sqlite3.Error as e:
             self.conn.rollback()
-            return False
+            for hook in self._rollback_hooks:
+                hook()
+            self.write_failed(e)
+            raise
+        finally:
+            if start:
+                self.instrumentation.record_commit(time.perf_counter_ns() - start)
+
+    def execute_transaction(self, work: Callable[[sqlite3.Cursor], bool]) -> bool:
+        """Run `work(cursor)` in a transaction(), keeping its writes only when it returns True.
+
+        Like execute_update, a failure is reported as False (the cause is in
+        last_error) rather than raised.
+        """
+        try:
+            with self.transaction() as cursor:
+                if work(cursor):
+                    return True
+                raise Rollback
+        except sqlite3.Error:
+            pass
+        return False
+
+    def on_rollback(self, hook: Callable[[], None]):
+        """Call `hook` if the current transaction, or any savepoint in it, is rolled back.
+
+        Lets in-memory state derived from the block's writes (caches, maps) be
+        dropped along with them. Outside a transaction it does nothing.
+        """
+        if self.in_transaction:
+            self._rollback_hooks.append(hook)
+
+    def submit_update(self, query: str, params: tuple = ()) -> "Future":
+        """Queue a write without waiting; the future resolves to its success once durable.
+
+        Outside group-commit mode, or inside transaction(), the statement runs
+        immediately and the returned future is already resolved.
+        """
+        if self.group is not None and not self.in_transaction:
+            return self.group.submit(query, params)
+        from concurrent.futures import Future  # pulls in logging; only callers of this path pay for it
+        future = Future()
+        future.set_result(self.execute_update(query, params))
+        return future
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Durability barrier: wait until every queued group-commit write is committed.
+
+        Returns False if `timeout` seconds pass first.
+        """
+        if self.group is not None:
+            return self.group.flush(timeout)
+        return True
+
+    def execute_many(self, query: str, rows: Iterable[tuple]) -> list[bool]:
+        """Run `query` for every row in one transaction, returning per-row success.
+
+        Rows stream through executemany. When a row fails, SQLite rolls back
+        only that statement; the rows pulled before it have been applied, so
+        executemany resumes right after it. No savepoint is held open, which
+        keeps trigger-bearing tables off the statement-journal slow path;
+        inside an open transaction() the batch gets a savepoint of its own.
+
+        If the whole batch fails (the BEGIN or COMMIT hits a locked database,
+        or an error aborts the transaction), the rest of `rows` is still read
+        and every row is reported as False, so the result always lines up
+        with the input. Inside transaction(), an error that aborts the
+        caller's transaction propagates instead, as it does from
+        execute_update.
+        """
+        outer = self.in_transaction
+        results = []
+        rows = iter(rows)
+        pulled = 0
+        consumed = 0
+
+        def feed():
+            nonlocal pulled, consumed
+            for row in rows:
+                pulled += 1
+                consumed += 1
+                yield row
+
+        with self.lock:
+            start = time.perf_counter_ns() if self.instrumentation is not None else 0
+            try:
+                with self.transaction():
+                    while True:
+                        pulled = 0
+                        try:
+                            self.cursor.executemany(query, feed())
+                            results.extend([True] * pulled)
+                            break
+                        except sqlite3.Error:
+                            if pulled == 0 or not self.conn.in_transaction:
+                                raise
+                            results.extend([True] * (pulled - 1))
+                            results.append(False)
+                    if start:
+                        self.instrumentation.record(query, time.perf_counter_ns() - start, results.count(True))
+            except sqlite3.Error:
+                if outer and not self.conn.in_transaction:
+                    raise
+                return [False] * (consumed + sum(1 for _ in rows))
+        return results
+
+    def write_failed(self, error: sqlite3.Error):
+        """Record why a write on the writer connection was rolled back."""
+        self.last_error = error
+        if is_lock_error(error):
+            self.lock_errors += 1
+
+    def query_stats(self) -> dict | None:
+        """Snapshot of the query instrumentation, or None when it is off."""
+        return self.instrumentation.snapshot() if self.instrumentation is not None else None
+
+    def pool_stats(self) -> dict | None:
+        return self.pool.stats() if self.pool is not None else None
+
+    def group_stats(self) -> dict | None:
+        return self.group.stats() if self.group is not None else None
 
     def commit(self):
-        self.conn.commit()
+        with self.lock:
+            self.conn.commit()
 
     def rollback(self):
-        self.conn.rollback()
+        with self.lock:
+            self.conn.rollback()
 
     def close(self):
+        if self.group is not None:
+            self.group.close()
+        if self.pool is not None:
+            self.pool.close()
         self.conn.close()
 
     def __enter__(self):
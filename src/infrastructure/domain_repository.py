@@ -0,0 +1,202 @@
+import sqlite3
+import uuid
+from typing import Optional
+
+from src.domain.interfaces import IUserRepository
+from src.domain.models import Role, Student, Subject, User
+
+from .bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, enrollment_storage
+from .database import UniversityDB
+
+
+class SqliteUserRepository(IUserRepository):
+    """IUserRepository over the users/courses/enrollments tables.
+
+    A domain username is the user's custom_id and a Subject's name is a course
+    code, so enrolling in a subject needs the course to exist. Loaded users are
+    kept in an identity map: every lookup of the same username in this
+    repository returns the same object without another query. Alongside each
+    entity the map keeps the subject codes last read from or written to the
+    database, and a save writes only the difference.
+
+    With `deferred` set, save only marks the user for the next flush (see
+    UnitOfWork); otherwise every save flushes straight away. Subjects are read
+    and written in the database's enrollment layout, rows or bitmask.
+    """
+
+    def __init__(self, db: UniversityDB, deferred: bool = False, directory=None):
+        self.db = db
+        self.deferred = deferred
+        # Optional UserDirectory kept in step with newly saved students.
+        self.directory = directory
+        # username -> entity, or None for a username known not to exist
+        self._identity: dict[str, User | None] = {}
+        self._uuids: dict[str, bytes] = {}
+        self._persisted: dict[str, frozenset[str]] = {}
+        self._dirty: dict[str, User] = {}
+        self.bitmask = BitmaskEnrollmentRepository(db) if enrollment_storage(db) == BITMASK else None
+
+    def _load(self, username: str) -> tuple[bytes, str, list[str]] | None:
+        if self.bitmask is not None:
+            row = self.db.execute_single(
+                "SELECT u_uuid, role, course_mask FROM users WHERE custom_id = ?", (username,)
+            )
+            return (row[0], row[1], list(self.bitmask.slots.codes(row[2]))) if row else None
+        rows = self.db.execute_query("""
+            SELECT u.u_uuid, u.role, e.course_code
+            FROM users u LEFT JOIN enrollments e ON e.user_uuid = u.u_uuid
+            WHERE u.custom_id = ?
+        """, (username,))
+        if not rows:
+            return None
+        return rows[0][0], rows[0][1], [code for _, _, code in rows if code is not None]
+
+    def get_by_username(self, username: str) -> Optional[User]:
+        if username in self._identity:
+            return self._identity[username]
+        loaded = self._load(username)
+        user = None
+        if loaded is not None:
+            u_uuid, role, codes = loaded
+            if role == Role.STUDENT.value:
+                user = Student(username=username, role=Role.STUDENT, subjects=[Subject(code) for code in codes])
+            else:
+                user = User(username=username, role=Role(role))
+            self._uuids[username] = u_uuid
+            self._persisted[username] = frozenset(codes)
+        self._identity[username] = user
+        return user
+
+    def exists(self, username: str) -> bool:
+        # Loading the whole aggregate costs the same single lookup and warms the map for what usually follows.
+        return self.get_by_username(username) is not None
+
+    def save(self, user: User) -> None:
+        self._identity[user.username] = user
+        self._dirty[user.username] = user
+        if not self.deferred:
+            self.flush()
+
+    @property
+    def dirty(self) -> list[User]:
+        """Users saved since the last flush."""
+        return list(self._dirty.values())
+
+    def flush(self) -> None:
+        """Write every saved user's changes in one transaction.
+
+        New users are inserted, and for students only the subjects added or
+        dropped since the last load or flush are written, each kind as one
+        executemany. Drops go first, so replacing a subject at the limit
+        passes the enrollment-limit trigger. On failure nothing is written,
+        the saved users are evicted from the identity map so the next lookup
+        reads what the database holds, and the sqlite3 error (a full course,
+        an unknown course code or a taken username) is raised.
+
+        Inside an open db.transaction() the flush is a savepoint that commits
+        with the enclosing transaction; if that is rolled back, the map is
+        cleared.
+        """
+        if not self._dirty:
+            return
+        new_users = []
+        dropped = []
+        added = []
+        for username, user in self._dirty.items():
+            u_uuid = self._uuids.get(username)
+            if u_uuid is None:
+                u_uuid = uuid.uuid4().bytes
+                new_users.append((u_uuid, username, username, user.role.value))
+            current = frozenset(s.name for s in user.subjects) if isinstance(user, Student) else frozenset()
+            persisted = self._persisted.get(username, frozenset())
+            dropped.extend((u_uuid, code) for code in persisted - current)
+            added.extend((u_uuid, code) for code in current - persisted)
+
+        try:
+            with self.db.transaction() as cursor:
+                if new_users:
+                    cursor.executemany(
+                        "INSERT INTO users (u_uuid, custom_id, name, role) VALUES (?, ?, ?, ?)", new_users
+                    )
+                if self.bitmask is not None:
+                    self._write_bits(cursor, dropped, added)
+                else:
+                    if dropped:
+                        cursor.executemany(
+                            "DELETE FROM enrollments WHERE user_uuid = ? AND course_code = ?", dropped
+                        )
+                    if added:
+                        cursor.executemany(
+                            "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)", added
+                        )
+        except sqlite3.Error:
+            for username in self._dirty:
+                del self._identity[username]
+                self._persisted.pop(username, None)
+            self._dirty.clear()
+            raise
+        self.db.on_rollback(self.clear)
+
+        for u_uuid, username, name, role in new_users:
+            self._uuids[username] = u_uuid
+            if role == Role.STUDENT.value and self.directory is not None:
+                self.directory.add(username, name)
+        for username, user in self._dirty.items():
+            self._persisted[username] = (
+                frozenset(s.name for s in user.subjects) if isinstance(user, Student) else frozenset()
+            )
+        self._dirty.clear()
+
+    def _write_bits(self, cursor: sqlite3.Cursor, dropped: list, added: list):
+        # The bitmask layout has no triggers to refuse an enrollment, so a refusal is raised here like theirs.
+        for u_uuid, code in dropped:
+            bit = self.bitmask.slots.bit(code)
+            if bit is not None:
+                self.bitmask._drop(cursor, u_uuid, bit, code)
+        for u_uuid, code in added:
+            bit = self.bitmask.slots.bit(code)
+            if bit is None:
+                raise sqlite3.IntegrityError(f"unknown course '{code}'")
+            if not self.bitmask._enroll(cursor, u_uuid, bit, code):
+                raise sqlite3.IntegrityError(f"cannot enroll in '{code}': course full or enrollment limit reached")
+
+    def clear(self) -> None:
+        """Forget every loaded and pending user; the next lookups read the database again."""
+        self._identity.clear()
+        self._uuids.clear()
+        self._persisted.clear()
+        self._dirty.clear()
+
+
+class UnitOfWork:
+    """One business transaction over a deferred SqliteUserRepository.
+
+        with UnitOfWork(db) as uow:
+            manager = EnrollmentManager(uow.users)
+            manager.enroll_in_subject("ID_1", "C1")
+            manager.enroll_in_subject("ID_1", "C2")
+
+    Saves inside the block only mark users dirty. A clean exit flushes them
+    together and an exception discards them. The identity map lives as long as
+    the unit of work, so each student is read at most once.
+    """
+
+    def __init__(self, db: UniversityDB, directory=None):
+        self.db = db
+        self.users = SqliteUserRepository(db, deferred=True, directory=directory)
+
+    def commit(self) -> None:
+        self.users.flush()
+
+    def rollback(self) -> None:
+        # Entities may hold unsaved changes, so they are dropped rather than kept.
+        self.users.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
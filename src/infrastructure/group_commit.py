@@ -0,0 +1,160 @@
+import queue
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+DEFAULT_GROUP_WINDOW = 0.0005
+DEFAULT_GROUP_MAX = 128
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """Background writer that folds concurrent updates into shared transactions.
+
+    Statements queued within `window` seconds of the first one (or up to
+    `max_batch` of them) run in a single transaction. Each statement gets its own
+    savepoint, so a failing one is rolled back alone; its future resolves to
+    False while the rest of the batch commits. Futures only resolve after the
+    COMMIT, which makes them a durability barrier.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.RLock,
+                 window: float = DEFAULT_GROUP_WINDOW, max_batch: int = DEFAULT_GROUP_MAX,
+                 instrumentation=None, on_error=None):
+        if max_batch < 1:
+            raise ValueError("Group size must be at least 1.")
+        self.conn = conn
+        self.lock = lock
+        self.window = window
+        self.max_batch = max_batch
+        self.instrumentation = instrumentation
+        # Called with every sqlite3.Error the flusher swallows (UniversityDB.write_failed).
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._statements = 0
+        self._failures = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, params: tuple = ()) -> "Future":
+        """Queue a statement; the returned future resolves to its success once committed."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot submit to a closed group committer.")
+        # concurrent.futures pulls in logging, so it is imported only once writes are grouped.
+        from concurrent.futures import Future
+        future = Future()
+        self._queue.put((query, params, future))
+        return future
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every statement queued so far is committed (or failed).
+
+        Returns False if that takes longer than `timeout` seconds.
+        """
+        from concurrent.futures import Future, TimeoutError as FutureTimeout
+        barrier = Future()
+        self._queue.put((None, None, barrier))
+        try:
+            barrier.result(timeout)
+        except FutureTimeout:
+            return False
+        return True
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._collect(first)
+            if batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list):
+        results = []
+        with self.lock:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                for query, params, _ in batch:
+                    if query is None:
+                        results.append(True)
+                        continue
+                    cursor.execute("SAVEPOINT group_stmt")
+                    start = time.perf_counter_ns()
+                    try:
+                        cursor.execute(query, params)
+                        results.append(True)
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO group_stmt")
+                        results.append(False)
+                        self._failed(e)
+                    if self.instrumentation is not None:
+                        self.instrumentation.record(query, time.perf_counter_ns() - start,
+                                                    max(cursor.rowcount, 0) if results[-1] else 0)
+                    cursor.execute("RELEASE group_stmt")
+                start = time.perf_counter_ns()
+                self.conn.commit()
+                if self.instrumentation is not None:
+                    self.instrumentation.record_commit(time.perf_counter_ns() - start)
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                self._failed(e)
+                results = [query is None for query, _, _ in batch]
+            finally:
+                cursor.close()
+
+        statements = [ok for (query, _, _), ok in zip(batch, results) if query is not None]
+        with self._stats_lock:
+            self._batches += 1
+            self._statements += len(statements)
+            self._failures += statements.count(False)
+        for (_, _, future), ok in zip(batch, results):
+            future.set_result(ok)
+
+    def _failed(self, error: sqlite3.Error):
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "statements": self._statements,
+                "failures": self._failures,
+                "avg_batch": self._statements / self._batches if self._batches else 0.0,
+                "pending": self._queue.qsize(),
+            }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
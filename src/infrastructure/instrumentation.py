@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+from typing import Callable
+
+DEFAULT_SLOW_QUERY_MS = 50.0
+SLOW_QUERY_LOGGER = "student_manager.slow_query"
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, ?\?)+\)", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and literals so equivalent statements share one key.
+
+    `IN (?, ?, ?)` lists of any length fold to `IN (?, ...)`.
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("IN (?, ...)", sql)
+
+
+def configure_slow_query_log(path: str | None = None, level: str = "WARNING"):
+    """Send slow-query records to `path` (or stderr) as one JSON object per line."""
+    # logging and python-json-logger are imported here, not at module level, so that
+    # every UniversityDB (which imports this module) does not pay for them at startup.
+    import logging
+    from pythonjsonlogger.json import JsonFormatter
+
+    logger = logging.getLogger(SLOW_QUERY_LOGGER)
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter("{asctime}{levelname}{message}", style="{", timestamp=False))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+class _Histogram:
+    __slots__ = ("count", "total_ns", "max_ns", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ns: int, rows: int):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.rows += rows
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        ms = elapsed_ns / 1e6
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile_ms(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th sample (max for the open bucket)."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ns / 1e6
+        return self.max_ns / 1e6
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "max_ms": self.max_ns / 1e6,
+            "p50_ms": self.quantile_ms(0.50),
+            "p95_ms": self.quantile_ms(0.95),
+            "p99_ms": self.quantile_ms(0.99),
+            "rows": self.rows,
+            "histogram": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class QueryInstrumentation:
+    """Per-statement latency histograms, row counts and commit timings for one UniversityDB.
+
+    Statements are keyed by normalize_sql(). Any statement slower than
+    `slow_query_ms` is logged to the `student_manager.slow_query` logger with
+    its key, duration and row count as structured fields. Listeners added with
+    add_listener() see every (sql_key, elapsed_ns, rows) after it is recorded.
+    """
+
+    def __init__(self, slow_query_ms: float | None = DEFAULT_SLOW_QUERY_MS):
+        import logging
+
+        self.slow_query_ms = slow_query_ms
+        self.logger = logging.getLogger(SLOW_QUERY_LOGGER)
+        self._lock = threading.Lock()
+        self._queries: dict[str, _Histogram] = {}
+        self._commits = _Histogram()
+        self._slow = 0
+        self._listeners: list[Callable[[str, int, int], None]] = []
+        self._since = time.time()
+        # Normalizing is regex work; statements repeat, so remember their keys.
+        self._keys: dict[str, str] = {}
+
+    def add_listener(self, listener: Callable[[str, int, int], None]):
+        self._listeners.append(listener)
+
+    def _key(self, sql: str) -> str:
+        key = self._keys.get(sql)
+        if key is None:
+            key = normalize_sql(sql)
+            if len(self._keys) < 4096:
+                self._keys[sql] = key
+        return key
+
+    def record(self, sql: str, elapsed_ns: int, rows: int = 0):
+        key = self._key(sql)
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                stats = self._queries[key] = _Histogram()
+            stats.add(elapsed_ns, rows)
+            slow = self.slow_query_ms is not None and elapsed_ns / 1e6 >= self.slow_query_ms
+            if slow:
+                self._slow += 1
+        if slow:
+            self.logger.warning("slow query", extra={
+                "sql": key, "duration_ms": round(elapsed_ns / 1e6, 3), "rows": rows,
+                "threshold_ms": self.slow_query_ms,
+            })
+        for listener in self._listeners:
+            listener(key, elapsed_ns, rows)
+
+    def record_commit(self, elapsed_ns: int):
+        with self._lock:
+            self._commits.add(elapsed_ns, 0)
+
+    def snapshot(self) -> dict:
+        """Current statistics as plain data, statements ordered by total time spent."""
+        with self._lock:
+            queries = [{"sql": key, **stats.to_dict()} for key, stats in self._queries.items()]
+            commits = self._commits.to_dict()
+            slow = self._slow
+        queries.sort(key=lambda q: q["total_ms"], reverse=True)
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._since)),
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": slow,
+            "statements": sum(q["count"] for q in queries),
+            "commits": commits,
+            "queries": queries,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._commits = _Histogram()
+            self._slow = 0
+            self._since = time.time()
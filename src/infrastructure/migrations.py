@@ -0,0 +1,333 @@
+import sqlite3
+from typing import NamedTuple
+
+MAX_STUDENT_COURSES = 8
+# Course bits in users.course_mask; bit 63 would make SQLite's signed 64-bit integers negative.
+MAX_COURSE_SLOTS = 63
+# users_fts cannot use FTS5's 'rebuild' once it skips admins, whose custom_id is their password.
+USERS_FTS_REINDEX = (
+    "INSERT INTO users_fts (users_fts) VALUES ('delete-all')",
+    "INSERT INTO users_fts (rowid, name, custom_id) SELECT rowid, name, custom_id FROM users WHERE role = 'student'",
+)
+
+
+class Migration(NamedTuple):
+    """One schema step; `statements` run in a single transaction that also bumps user_version."""
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS = (
+    Migration(1, "Initial schema", (
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            u_uuid BLOB PRIMARY KEY,
+            custom_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS courses (
+            code TEXT PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS enrollments (
+            user_uuid BLOB,
+            course_code TEXT,
+            PRIMARY KEY(user_uuid, course_code),
+            FOREIGN KEY(user_uuid) REFERENCES users(u_uuid) ON DELETE CASCADE,
+            FOREIGN KEY(course_code) REFERENCES courses(code) ON DELETE CASCADE
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_users_custom_id ON users(custom_id)",
+        "CREATE INDEX IF NOT EXISTS idx_enrollments_user ON enrollments(user_uuid)",
+    )),
+    # The UNIQUE constraint already indexes custom_id, and a WITHOUT ROWID
+    # enrollments table is clustered on (user_uuid, course_code), which covers
+    # per-student lookups; the course-side index serves per-course lookups and
+    # the partial index serves the student roster.
+    Migration(2, "WITHOUT ROWID enrollments, course-side and partial student indexes", (
+        "DROP INDEX IF EXISTS idx_users_custom_id",
+        '''
+        CREATE TABLE enrollments_v2 (
+            user_uuid BLOB NOT NULL,
+            course_code TEXT NOT NULL,
+            PRIMARY KEY(user_uuid, course_code),
+            FOREIGN KEY(user_uuid) REFERENCES users(u_uuid) ON DELETE CASCADE,
+            FOREIGN KEY(course_code) REFERENCES courses(code) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        ''',
+        "INSERT INTO enrollments_v2 (user_uuid, course_code) SELECT user_uuid, course_code FROM enrollments",
+        "DROP TABLE enrollments",
+        "ALTER TABLE enrollments_v2 RENAME TO enrollments",
+        "CREATE INDEX idx_enrollments_course ON enrollments(course_code)",
+        "CREATE INDEX idx_users_students ON users(custom_id) WHERE role = 'student'",
+    )),
+    # Per-student and per-course counters maintained by triggers; the limit
+    # trigger rejects the insert itself, so checking and enrolling is one statement.
+    Migration(3, "Trigger-maintained enrollment counters and the per-student course limit", (
+        "ALTER TABLE users ADD COLUMN enrollment_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE courses ADD COLUMN enrollment_count INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE users SET enrollment_count = (
+            SELECT COUNT(*) FROM enrollments e WHERE e.user_uuid = users.u_uuid
+        )
+        """,
+        """
+        UPDATE courses SET enrollment_count = (
+            SELECT COUNT(*) FROM enrollments e WHERE e.course_code = courses.code
+        )
+        """,
+        f"""
+        CREATE TRIGGER trg_enrollments_limit BEFORE INSERT ON enrollments
+        WHEN (SELECT enrollment_count FROM users WHERE u_uuid = NEW.user_uuid) >= {MAX_STUDENT_COURSES}
+        BEGIN
+            SELECT RAISE(ABORT, 'enrollment limit reached');
+        END
+        """,
+        """
+        CREATE TRIGGER trg_enrollments_count_insert AFTER INSERT ON enrollments
+        BEGIN
+            UPDATE users SET enrollment_count = enrollment_count + 1 WHERE u_uuid = NEW.user_uuid;
+            UPDATE courses SET enrollment_count = enrollment_count + 1 WHERE code = NEW.course_code;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_enrollments_count_delete AFTER DELETE ON enrollments
+        BEGIN
+            UPDATE users SET enrollment_count = enrollment_count - 1 WHERE u_uuid = OLD.user_uuid;
+            UPDATE courses SET enrollment_count = enrollment_count - 1 WHERE code = OLD.course_code;
+        END
+        """,
+    )),
+    # NULL capacity means unlimited. The seat check runs inside the insert, so
+    # concurrent writers can never push a course past its capacity.
+    Migration(4, "Course capacities with in-statement seat allocation", (
+        "ALTER TABLE courses ADD COLUMN capacity INTEGER CHECK (capacity IS NULL OR capacity >= 0)",
+        """
+        CREATE TRIGGER trg_enrollments_capacity BEFORE INSERT ON enrollments
+        WHEN (SELECT enrollment_count >= capacity FROM courses WHERE code = NEW.course_code)
+        BEGIN
+            SELECT RAISE(ABORT, 'course full');
+        END
+        """,
+    )),
+    # External-content FTS5 indexes keyed on the tables' implicit rowids. VACUUM
+    # may renumber those rowids, so run search_index_rebuild() after one.
+    Migration(5, "FTS5 search over users and courses", (
+        """
+        CREATE VIRTUAL TABLE users_fts USING fts5(
+            name, custom_id,
+            content = 'users', content_rowid = 'rowid',
+            tokenize = "unicode61 tokenchars '_-'", prefix = '1 2 3'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE courses_fts USING fts5(
+            code, name,
+            content = 'courses', content_rowid = 'rowid',
+            tokenize = "unicode61 tokenchars '_-'", prefix = '1 2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER trg_users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, name, custom_id) VALUES (NEW.rowid, NEW.name, NEW.custom_id);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, custom_id)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.custom_id);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_fts_update AFTER UPDATE OF name, custom_id ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, custom_id)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.custom_id);
+            INSERT INTO users_fts (rowid, name, custom_id) VALUES (NEW.rowid, NEW.name, NEW.custom_id);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_courses_fts_insert AFTER INSERT ON courses BEGIN
+            INSERT INTO courses_fts (rowid, code, name) VALUES (NEW.rowid, NEW.code, NEW.name);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_courses_fts_delete AFTER DELETE ON courses BEGIN
+            INSERT INTO courses_fts (courses_fts, rowid, code, name)
+            VALUES ('delete', OLD.rowid, OLD.code, OLD.name);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_courses_fts_update AFTER UPDATE OF code, name ON courses BEGIN
+            INSERT INTO courses_fts (courses_fts, rowid, code, name)
+            VALUES ('delete', OLD.rowid, OLD.code, OLD.name);
+            INSERT INTO courses_fts (rowid, code, name) VALUES (NEW.rowid, NEW.code, NEW.name);
+        END
+        """,
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+        "INSERT INTO courses_fts (courses_fts) VALUES ('rebuild')",
+    )),
+    # Optional compact layout: each student's courses as one bitmask over course
+    # slots. Every course gets the lowest free slot when it is created; masks stay
+    # 0 until a database is switched over (see bitmask_enrollments).
+    Migration(6, "Course slots, per-student course bitmasks and database settings", (
+        "CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID",
+        "ALTER TABLE users ADD COLUMN course_mask INTEGER NOT NULL DEFAULT 0",
+        f"""
+        CREATE TABLE course_slots (
+            slot INTEGER PRIMARY KEY CHECK (slot >= 0 AND slot < {MAX_COURSE_SLOTS}),
+            code TEXT NOT NULL UNIQUE REFERENCES courses(code) ON DELETE CASCADE
+        )
+        """,
+        f"""
+        INSERT INTO course_slots (slot, code)
+        SELECT ROW_NUMBER() OVER (ORDER BY rowid) - 1, code FROM courses ORDER BY rowid LIMIT {MAX_COURSE_SLOTS}
+        """,
+        f"""
+        CREATE TRIGGER trg_courses_slot AFTER INSERT ON courses
+        WHEN (SELECT COUNT(*) FROM course_slots) < {MAX_COURSE_SLOTS}
+        BEGIN
+            INSERT INTO course_slots (slot, code)
+            SELECT MIN(s.slot + 1), NEW.code
+            FROM (SELECT -1 AS slot UNION ALL SELECT slot FROM course_slots) s
+            WHERE s.slot + 1 NOT IN (SELECT slot FROM course_slots);
+        END
+        """,
+        # A freed slot may be reused, so a deleted course's bit is cleared first.
+        """
+        CREATE TRIGGER trg_course_slots_delete AFTER DELETE ON course_slots
+        BEGIN
+            UPDATE users SET course_mask = course_mask & ~(1 << OLD.slot), enrollment_count = enrollment_count - 1
+            WHERE course_mask & (1 << OLD.slot);
+        END
+        """,
+    )),
+    # Every change that can alter a student's roster row appends that student
+    # to change_log; the repositories fold entries past the watermark kept in
+    # settings into the materialized roster (see EnrollmentRepository.refresh_roster).
+    # Seeding the log with every enrolled student makes the first refresh build it.
+    Migration(7, "Roster change log and materialized roster", (
+        "CREATE TABLE change_log (seq INTEGER PRIMARY KEY, user_uuid BLOB NOT NULL)",
+        """
+        CREATE TABLE roster (
+            custom_id TEXT PRIMARY KEY,
+            user_uuid BLOB NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            courses TEXT NOT NULL
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TRIGGER trg_enrollments_log_insert AFTER INSERT ON enrollments BEGIN
+            INSERT INTO change_log (user_uuid) VALUES (NEW.user_uuid);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_enrollments_log_delete AFTER DELETE ON enrollments BEGIN
+            INSERT INTO change_log (user_uuid) VALUES (OLD.user_uuid);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_log_update AFTER UPDATE OF custom_id, name, role, course_mask ON users
+        WHEN OLD.role = 'student' OR NEW.role = 'student'
+        BEGIN
+            INSERT INTO change_log (user_uuid) VALUES (NEW.u_uuid);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_log_delete AFTER DELETE ON users WHEN OLD.role = 'student' BEGIN
+            INSERT INTO change_log (user_uuid) VALUES (OLD.u_uuid);
+        END
+        """,
+        # Foreign keys normally cascade a course's removal to its enrollments, which
+        # log themselves; these also cover connections that run without them.
+        """
+        CREATE TRIGGER trg_courses_log_delete BEFORE DELETE ON courses BEGIN
+            INSERT INTO change_log (user_uuid) SELECT user_uuid FROM enrollments WHERE course_code = OLD.code;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_courses_log_update AFTER UPDATE OF code ON courses BEGIN
+            INSERT INTO change_log (user_uuid) SELECT user_uuid FROM enrollments WHERE course_code = OLD.code;
+        END
+        """,
+        "INSERT INTO change_log (user_uuid) SELECT u_uuid FROM users WHERE role = 'student' AND enrollment_count > 0",
+    )),
+    # An admin's custom_id is the admin password, so prefix search must never see it.
+    Migration(8, "Student-only user search index", (
+        "DROP TRIGGER trg_users_fts_insert",
+        "DROP TRIGGER trg_users_fts_delete",
+        "DROP TRIGGER trg_users_fts_update",
+        """
+        CREATE TRIGGER trg_users_fts_insert AFTER INSERT ON users WHEN NEW.role = 'student' BEGIN
+            INSERT INTO users_fts (rowid, name, custom_id) VALUES (NEW.rowid, NEW.name, NEW.custom_id);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_fts_delete AFTER DELETE ON users WHEN OLD.role = 'student' BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, custom_id)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.custom_id);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_users_fts_update AFTER UPDATE OF name, custom_id, role ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, custom_id)
+            SELECT 'delete', OLD.rowid, OLD.name, OLD.custom_id WHERE OLD.role = 'student';
+            INSERT INTO users_fts (rowid, name, custom_id)
+            SELECT NEW.rowid, NEW.name, NEW.custom_id WHERE NEW.role = 'student';
+        END
+        """,
+        *USERS_FTS_REINDEX,
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int = SCHEMA_VERSION) -> list[int]:
+    """Apply every pending migration up to `target`, returning the versions applied.
+
+    Each step commits on its own, so an interrupted upgrade resumes from the
+    last completed version on the next start. A step takes the write lock
+    before re-reading `user_version`, so processes that start together apply
+    it once; the others wait and skip it.
+    """
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            current = schema_version(conn)
+            if current > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema v{current} is newer than this application supports (v{SCHEMA_VERSION})."
+                )
+            if migration.version <= current:
+                conn.rollback()
+                continue
+            for statement in migration.statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.commit()
+        except (sqlite3.Error, RuntimeError):
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
+
+
+def search_index_rebuild(conn: sqlite3.Connection):
+    """Rebuild the FTS indexes from their content tables (needed after VACUUM)."""
+    for statement in USERS_FTS_REINDEX:
+        conn.execute(statement)
+    conn.execute("INSERT INTO courses_fts (courses_fts) VALUES ('rebuild')")
+    conn.commit()
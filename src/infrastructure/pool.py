@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 4
+
+
+class _ThreadReader:
+    """One thread's reader connection and how deeply that thread has it checked out."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.depth = 0
+
+
+class ReaderPool:
+    """Per-thread read-only SQLite connections with bounded concurrent checkouts."""
+
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.db_path = db_path
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._checkouts = 0
+        self._returns = 0
+        self._waits = 0
+        self._closed = False
+
+    def _connect(self) -> _ThreadReader:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA cache_size = -2000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        with self._lock:
+            self._connections.append(conn)
+        thread_reader = _ThreadReader(conn)
+        # The thread-local entry is dropped when its thread exits; close the connection with it.
+        weakref.finalize(thread_reader, self._discard, conn)
+        return thread_reader
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn not in self._connections:
+                return
+            self._connections.remove(conn)
+        conn.close()
+
+    @contextmanager
+    def reader(self):
+        """Check out this thread's reader connection, waiting if the pool is exhausted.
+
+        A nested checkout on the same thread reuses the outer one without taking
+        another slot, so reads inside reads cannot deadlock a small pool.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot use a closed reader pool.")
+        thread_reader = getattr(self._local, "reader", None)
+        if thread_reader is not None and thread_reader.depth:
+            thread_reader.depth += 1
+            try:
+                yield thread_reader.conn
+            finally:
+                thread_reader.depth -= 1
+            return
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._waits += 1
+            self._slots.acquire()
+        with self._lock:
+            self._checkouts += 1
+        try:
+            if thread_reader is None:
+                thread_reader = self._local.reader = self._connect()
+            thread_reader.depth = 1
+            try:
+                yield thread_reader.conn
+            finally:
+                thread_reader.depth = 0
+        finally:
+            with self._lock:
+                self._returns += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Checkout/return accounting for the pool."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "connections": len(self._connections),
+                "checkouts": self._checkouts,
+                "returns": self._returns,
+                "in_use": self._checkouts - self._returns,
+                "waits": self._waits,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,122 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from .database import UniversityDB
+
+SUGGESTION_LIMIT = 5
+
+
+class UserDirectory:
+    """In-process prefix index over student custom IDs and names.
+
+    Each string is stored once; two ``array('I')`` permutations keep the rows
+    sorted by casefolded ID and by casefolded name, and lookups bisect them
+    (~20 comparisons at 1M students). The index is loaded lazily from `users`
+    on the first lookup and kept current through add(), which UserRepository
+    calls after each successful student registration. Admins are never indexed
+    because their custom ID is their admin string.
+    """
+
+    def __init__(self, db: UniversityDB):
+        self.db = db
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._names: list[str] = []
+        self._by_id = array("I")
+        self._by_name = array("I")
+        self._loaded = False
+        self._loading = False
+        self._pending: list[tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _id_key(self, row: int) -> str:
+        return self._ids[row].casefold()
+
+    def _name_key(self, row: int) -> str:
+        return self._names[row].casefold()
+
+    def load(self):
+        """Build the index from the database if it has not been built yet."""
+        with self._lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+        ids, names = [], []
+        for custom_id, name in self.db.iter_query("SELECT custom_id, name FROM users WHERE role = 'student'"):
+            ids.append(custom_id)
+            names.append(name)
+        by_id = array("I", sorted(range(len(ids)), key=lambda i: ids[i].casefold()))
+        by_name = array("I", sorted(range(len(names)), key=lambda i: names[i].casefold()))
+        with self._lock:
+            self._ids, self._names = ids, names
+            self._by_id, self._by_name = by_id, by_name
+            self._loaded, self._loading = True, False
+            # Registrations that raced the initial scan.
+            pending, self._pending = self._pending, []
+            for custom_id, name in pending:
+                if not self._contains_id(custom_id):
+                    self._insert(custom_id, name)
+
+    def _contains_id(self, custom_id: str) -> bool:
+        key = custom_id.casefold()
+        pos = bisect_left(self._by_id, key, key=self._id_key)
+        while pos < len(self._by_id) and self._id_key(self._by_id[pos]) == key:
+            if self._ids[self._by_id[pos]] == custom_id:
+                return True
+            pos += 1
+        return False
+
+    def _insert(self, custom_id: str, name: str):
+        row = len(self._ids)
+        self._ids.append(custom_id)
+        self._names.append(name)
+        self._by_id.insert(bisect_left(self._by_id, custom_id.casefold(), key=self._id_key), row)
+        self._by_name.insert(bisect_left(self._by_name, name.casefold(), key=self._name_key), row)
+
+    def add(self, custom_id: str, name: str):
+        """Index a newly registered student; before the first load this is a no-op."""
+        with self._lock:
+            if self._loading:
+                self._pending.append((custom_id, name))
+            elif self._loaded:
+                self._insert(custom_id, name)
+
+    def _scan(self, order: array, key, prefix: str, limit: int) -> list[int]:
+        rows = []
+        pos = bisect_left(order, prefix, key=key)
+        while pos < len(order) and len(rows) < limit:
+            row = order[pos]
+            if not key(row).startswith(prefix):
+                break
+            rows.append(row)
+            pos += 1
+        return rows
+
+    def complete_id(self, prefix: str) -> str | None:
+        """The first custom ID starting with `prefix` (case-insensitive), if any."""
+        if not prefix:
+            return None
+        self.load()
+        with self._lock:
+            rows = self._scan(self._by_id, self._id_key, prefix.casefold(), 1)
+            return self._ids[rows[0]] if rows else None
+
+    def suggest(self, prefix: str, limit: int = SUGGESTION_LIMIT) -> list[tuple[str, str]]:
+        """(custom_id, name) pairs whose ID or name starts with `prefix`, ID matches first."""
+        if not prefix:
+            return []
+        self.load()
+        folded = prefix.casefold()
+        with self._lock:
+            rows = self._scan(self._by_id, self._id_key, folded, limit)
+            if len(rows) < limit:
+                seen = set(rows)
+                rows += [r for r in self._scan(self._by_name, self._name_key, folded, limit) if r not in seen]
+            return [(self._ids[r], self._names[r]) for r in rows[:limit]]
@@ -1,19 +1,51 @@
+import re
 import sqlite3
 import uuid
-from .database import UniversityDB
+from typing import Iterable
+from .database import FETCH_BATCH_SIZE, UniversityDB, is_lock_error, is_read_only_error
+from .migrations import MAX_STUDENT_COURSES
+
+ROSTER_PAGE_SIZE = 100
+# settings key holding the last change_log seq folded into the materialized roster.
+ROSTER_WATERMARK = "roster_watermark"
+# Past this many log entries per user, re-deriving every student beats seeking each changed one.
+ROSTER_REBUILD_FRACTION = 0.5
+
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already_enrolled"
+LIMIT_REACHED = "limit_reached"
+COURSE_FULL = "course_full"
+UNKNOWN_COURSE = "unknown_course"
+FAILED = "failed"
+
+SEARCH_LIMIT = 20
+# How many courses the admin screens let the catalog hold.
+MAX_COURSES = 10
+
+
+def fts_prefix_query(text: str) -> str | None:
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    terms = re.findall(r"[\w-]+", text)
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+USER_COLUMNS = "u_uuid, custom_id, name, role"
+COURSE_COLUMNS = "code, name"
 
 class UserRepository:
-    def __init__(self, db: UniversityDB):
+    def __init__(self, db: UniversityDB, directory=None):
         self.db = db
+        # Optional UserDirectory kept in step with successful student registrations.
+        self.directory = directory
 
     def get_user_by_custom_id(self, custom_id: str):
         return self.db.execute_single(
-            "SELECT * FROM users WHERE custom_id = ?", (custom_id,)
+            f"SELECT {USER_COLUMNS} FROM users WHERE custom_id = ?", (custom_id,)
         )
 
     def get_user_by_uuid(self, u_uuid: bytes):
         return self.db.execute_single(
-            "SELECT * FROM users WHERE u_uuid = ?", (u_uuid,)
+            f"SELECT {USER_COLUMNS} FROM users WHERE u_uuid = ?", (u_uuid,)
         )
 
     def register_user(self, name: str, role: str, custom_id: str):
@@ -22,44 +54,157 @@ class UserRepository:
             "INSERT INTO users (u_uuid, custom_id, name, role) VALUES (?, ?, ?, ?)",
             (u_uuid, custom_id, name, role)
         )
+        if success and role == 'student' and self.directory is not None:
+            self.directory.add(custom_id, name)
         return u_uuid if success else None
 
+    def register_users_bulk(self, users: Iterable[tuple[str, str, str]]) -> list[bytes | None]:
+        """Register (name, role, custom_id) rows in one transaction; None marks a failed row."""
+        uuids = []
+        students = []
+
+        def rows():
+            for name, role, custom_id in users:
+                u_uuid = uuid.uuid4().bytes
+                uuids.append(u_uuid)
+                if self.directory is not None:
+                    students.append((custom_id, name) if role == 'student' else None)
+                yield (u_uuid, custom_id, name, role)
+
+        results = self.db.execute_many(
+            "INSERT INTO users (u_uuid, custom_id, name, role) VALUES (?, ?, ?, ?)", rows()
+        )
+        for student, ok in zip(students, results):
+            if ok and student is not None:
+                self.directory.add(*student)
+        return [u_uuid if ok else None for u_uuid, ok in zip(uuids, results)]
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT):
+        """Up to `limit` students whose name or custom_id words start with the words in `text`.
+
+        Admins are not in the index: their custom_id is the admin password.
+
+        Matches are not ranked: ordering by bm25 would score every hit of a
+        short prefix before LIMIT applies, which costs tens of ms at 100k users.
+        """
+        query = fts_prefix_query(text)
+        if query is None:
+            return []
+        return self.db.execute_query(f"""
+            SELECT {', '.join('u.' + c for c in USER_COLUMNS.split(', '))}
+            FROM (SELECT rowid FROM users_fts WHERE users_fts MATCH ? LIMIT ?) f
+            JOIN users u ON u.rowid = f.rowid
+            ORDER BY u.name
+        """, (query, limit))
+
     def get_all_users(self):
-        return self.db.execute_query("SELECT * FROM users")
+        return self.db.execute_query(f"SELECT {USER_COLUMNS} FROM users")
 
 
 class CourseRepository:
     def __init__(self, db: UniversityDB):
         self.db = db
 
-    def add_course(self, code: str, name: str) -> bool:
+    def add_course(self, code: str, name: str, capacity: int | None = None, max_courses: int | None = None) -> bool:
+        """Insert a course; with `max_courses`, only while the catalog holds fewer than that.
+
+        The limit is checked by the INSERT itself, under the write lock, so
+        admins in other processes cannot push the catalog past it.
+        """
+        if max_courses is None:
+            return self.db.execute_update(
+                "INSERT INTO courses (code, name, capacity) VALUES (?, ?, ?)", (code, name, capacity)
+            )
+        return self.db.execute_transaction(lambda cursor: cursor.execute(
+            "INSERT INTO courses (code, name, capacity) SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM courses) < ?",
+            (code, name, capacity, max_courses)
+        ).rowcount == 1)
+
+    def set_capacity(self, code: str, capacity: int | None) -> bool:
+        """Change a course's seat limit (None for unlimited); seats already taken are kept."""
         return self.db.execute_update(
-            "INSERT INTO courses (code, name) VALUES (?, ?)", (code, name)
+            "UPDATE courses SET capacity = ? WHERE code = ?", (capacity, code)
+        )
+
+    def add_courses_bulk(self, courses: Iterable[tuple]) -> list[bool]:
+        """Insert (code, name) or (code, name, capacity) rows in one transaction, returning per-row success."""
+        return self.db.execute_many(
+            "INSERT INTO courses (code, name, capacity) VALUES (?, ?, ?)",
+            ((code, name, rest[0] if rest else None) for code, name, *rest in courses),
         )
 
     def get_all_courses(self):
-        return self.db.execute_query("SELECT * FROM courses")
+        return self.db.execute_query(f"SELECT {COURSE_COLUMNS} FROM courses")
 
     def get_course_by_code(self, code: str):
         return self.db.execute_single(
-            "SELECT * FROM courses WHERE code = ?", (code,)
+            f"SELECT {COURSE_COLUMNS} FROM courses WHERE code = ?", (code,)
         )
 
+    def search(self, text: str, limit: int = SEARCH_LIMIT):
+        """Up to `limit` courses whose code or name words start with the words in `text`."""
+        query = fts_prefix_query(text)
+        if query is None:
+            return []
+        return self.db.execute_query("""
+            SELECT c.code, c.name
+            FROM (SELECT rowid FROM courses_fts WHERE courses_fts MATCH ? LIMIT ?) f
+            JOIN courses c ON c.rowid = f.rowid
+            ORDER BY c.code
+        """, (query, limit))
+
     def get_course_count(self) -> int:
         result = self.db.execute_single("SELECT COUNT(*) FROM courses")
         return result[0] if result else 0
 
+    def get_course_enrollment_counts(self):
+        """(code, name, enrolled, capacity) for every course, read from the trigger-maintained counters."""
+        return self.db.execute_query("SELECT code, name, enrollment_count, capacity FROM courses")
+
 
 class EnrollmentRepository:
     def __init__(self, db: UniversityDB):
         self.db = db
 
     def enroll_student(self, user_uuid: bytes, course_code: str) -> bool:
+        """Insert one enrollment; the course limit is enforced by a trigger on the same statement."""
         return self.db.execute_update(
             "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)",
             (user_uuid, course_code)
         )
 
+    def reserve_seat(self, user_uuid: bytes, course_code: str) -> str:
+        """Take a seat in `course_code`, returning ENROLLED or the reason it was refused.
+
+        The seat and course-limit checks run in triggers on the insert itself,
+        so there is no window between checking for a free seat and taking it.
+        The reason is only looked up after a refusal.
+        """
+        if self.enroll_student(user_uuid, course_code):
+            return ENROLLED
+        row = self.db.execute_single("""
+            SELECT c.enrollment_count, c.capacity, u.enrollment_count,
+                   EXISTS (SELECT 1 FROM enrollments WHERE user_uuid = ? AND course_code = ?)
+            FROM courses c, users u
+            WHERE c.code = ? AND u.u_uuid = ?
+        """, (user_uuid, course_code, course_code, user_uuid))
+        if row is None:
+            return UNKNOWN_COURSE
+        course_count, capacity, student_count, already = row
+        if already:
+            return ALREADY_ENROLLED
+        if student_count >= MAX_STUDENT_COURSES:
+            return LIMIT_REACHED
+        if capacity is not None and course_count >= capacity:
+            return COURSE_FULL
+        return FAILED
+
+    def enroll_many(self, enrollments: Iterable[tuple[bytes, str]]) -> list[bool]:
+        """Insert (user_uuid, course_code) rows in one transaction, returning per-row success."""
+        return self.db.execute_many(
+            "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)", enrollments
+        )
+
     def get_student_enrollments(self, user_uuid: bytes):
         return self.db.execute_query(
             "SELECT course_code FROM enrollments WHERE user_uuid = ?", (user_uuid,)
@@ -75,7 +220,7 @@ class EnrollmentRepository:
 
     def get_enrollment_count(self, user_uuid: bytes) -> int:
         result = self.db.execute_single(
-            "SELECT COUNT(*) FROM enrollments WHERE user_uuid = ?", (user_uuid,)
+            "SELECT enrollment_count FROM users WHERE u_uuid = ?", (user_uuid,)
         )
         return result[0] if result else 0
 
@@ -87,30 +232,131 @@ class EnrollmentRepository:
 
     def swap_enrollment(self, user_uuid: bytes, old_code: str, new_code: str) -> bool:
         """Atomically replace one enrollment with another."""
-        try:
-            self.db.cursor.execute(
-                "DELETE FROM enrollments WHERE user_uuid = ? AND course_code = ?",
-                (user_uuid, old_code)
+        def work(cursor):
+            cursor.execute(
+                "DELETE FROM enrollments WHERE user_uuid = ? AND course_code = ?", (user_uuid, old_code)
             )
-            self.db.cursor.execute(
-                "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)",
-                (user_uuid, new_code)
+            cursor.execute(
+                "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)", (user_uuid, new_code)
             )
-            self.db.conn.commit()
             return True
-        except sqlite3.Error:
-            self.db.conn.rollback()
-            return False
+
+        return self.db.execute_transaction(work)
+
+    # Roster rows (custom_id, user_uuid, name, courses) derived from the enrollment
+    # tables; {where} narrows them to the students in the change-log delta.
+    ROSTER_SOURCE = """
+        SELECT u.custom_id, u.u_uuid, u.name, GROUP_CONCAT(c.code, ', ')
+        FROM users u
+        JOIN enrollments e ON u.u_uuid = e.user_uuid
+        JOIN courses c ON e.course_code = c.code
+        WHERE u.role = 'student' AND u.enrollment_count > 0 {where}
+        GROUP BY u.u_uuid
+    """
+    ROSTER_DELTA = "AND u.u_uuid IN (SELECT user_uuid FROM change_log WHERE seq > ?)"
+
+    ROSTER_STALE_QUERY = """
+        SELECT EXISTS (
+            SELECT 1 FROM change_log
+            WHERE seq > COALESCE((SELECT CAST(value AS INTEGER) FROM settings WHERE key = ?), 0)
+        )
+    """
+
+    def refresh_roster(self) -> int:
+        """Fold the change log into the materialized roster, returning how many log entries were applied.
+
+        Only the students logged since the stored watermark are re-derived, so
+        the cost follows the number of changes rather than the number of
+        students; when nothing changed it is one index probe on the log. A
+        log longer than ROSTER_REBUILD_FRACTION of the users (the first
+        refresh, a bulk import) rebuilds the whole roster instead, which is
+        then the cheaper of the two.
+
+        The refresh only runs when the write lock is free. If another writer
+        holds it, or the database is read-only, the refresh is skipped and
+        readers get the roster as of the last refresh; a later read catches up
+        once the database can be written.
+        """
+        if not self.db.execute_single(self.ROSTER_STALE_QUERY, (ROSTER_WATERMARK,))[0]:
+            return 0
+        try:
+            return self._apply_change_log()
+        except sqlite3.OperationalError as e:
+            if not (is_lock_error(e) or is_read_only_error(e)):
+                raise
+            return 0
+
+    def _apply_change_log(self) -> int:
+        with self.db.transaction(nowait=True) as cursor:
+            row = cursor.execute("SELECT value FROM settings WHERE key = ?", (ROSTER_WATERMARK,)).fetchone()
+            watermark = int(row[0]) if row else 0
+            high = cursor.execute("SELECT MAX(seq) FROM change_log").fetchone()[0]
+            if high is None or high <= watermark:
+                return 0
+            users = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM users").fetchone()[0]
+            if high - watermark > users * ROSTER_REBUILD_FRACTION:
+                cursor.execute("DELETE FROM roster")
+                cursor.execute(
+                    "INSERT INTO roster (custom_id, user_uuid, name, courses) " + self.ROSTER_SOURCE.format(where="")
+                )
+            else:
+                cursor.execute(
+                    "DELETE FROM roster WHERE user_uuid IN (SELECT user_uuid FROM change_log WHERE seq > ?)",
+                    (watermark,)
+                )
+                cursor.execute(
+                    "INSERT INTO roster (custom_id, user_uuid, name, courses) "
+                    + self.ROSTER_SOURCE.format(where=self.ROSTER_DELTA), (watermark,)
+                )
+            cursor.execute("""
+                INSERT INTO settings (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            """, (ROSTER_WATERMARK, str(high)))
+            # The newest entry stays behind so its seq is never handed out again.
+            cursor.execute("DELETE FROM change_log WHERE seq < ?", (high,))
+        return high - watermark
+
+    ROSTER_QUERY = "SELECT name, custom_id, courses FROM roster"
 
     def get_global_roster(self):
+        self.refresh_roster()
+        return self.db.execute_query(self.ROSTER_QUERY)
+
+    def get_global_roster_page(self, after_id: str = "", limit: int = ROSTER_PAGE_SIZE, inclusive: bool = False):
+        """Keyset page of the roster ordered by custom_id.
+
+        Seeks past `after_id` (or to it when `inclusive`) on the roster's
+        primary key instead of using OFFSET, so every page costs the same.
+        """
+        self.refresh_roster()
+        op = ">=" if inclusive else ">"
+        return self.db.execute_query(f"""
+            SELECT name, custom_id, courses FROM roster
+            WHERE custom_id {op} ?
+            ORDER BY custom_id
+            LIMIT ?
+        """, (after_id, limit))
+
+    def search_roster(self, text: str, limit: int = ROSTER_PAGE_SIZE):
+        """Roster rows for the students matching `text` in the users search index."""
+        query = fts_prefix_query(text)
+        if query is None:
+            return []
+        self.refresh_roster()
         return self.db.execute_query("""
-            SELECT u.name, u.custom_id, GROUP_CONCAT(c.code, ', ') AS courses
-            FROM users u 
-            JOIN enrollments e ON u.u_uuid = e.user_uuid 
-            JOIN courses c ON e.course_code = c.code 
-            WHERE u.role = 'student'
-            GROUP BY u.u_uuid, u.name, u.custom_id
-        """)
+            SELECT r.name, r.custom_id, r.courses
+            FROM (
+                SELECT rowid FROM users_fts WHERE users_fts MATCH ? LIMIT ?
+            ) f
+            JOIN users u ON u.rowid = f.rowid
+            JOIN roster r ON r.user_uuid = u.u_uuid
+            ORDER BY r.custom_id
+        """, (query, limit))
+
+    def iter_global_roster(self, batch_size: int = FETCH_BATCH_SIZE):
+        """Stream the roster row by row instead of materializing it."""
+        self.refresh_roster()
+        return self.db.iter_query(self.ROSTER_QUERY, batch_size=batch_size)
 
     def rollback(self):
         self.db.rollback()
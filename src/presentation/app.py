@@ -2,9 +2,15 @@ from textual.app import App, ComposeResult
 from textual.containers import Vertical, Center, Horizontal, Middle
 from textual.widgets import Button, Label, Input, DataTable
 from textual.screen import Screen
+from textual.suggester import Suggester
 from src.infrastructure.database import UniversityDB
-from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+from src.infrastructure.migrations import MAX_STUDENT_COURSES
+from src.infrastructure.repositories import ROSTER_PAGE_SIZE, ENROLLED, LIMIT_REACHED, COURSE_FULL, MAX_COURSES
+from src.infrastructure.prefix_index import UserDirectory
+from src.infrastructure.cache import CachedUserRepository, CachedCourseRepository, cached_enrollment_repository, SHARED_CACHE_TTL
+from src.infrastructure.async_repositories import AsyncRepositories
 from src.infrastructure.utils import is_admin_string_hard
+import json
 import uuid
 import sys
 
@@ -73,18 +79,13 @@ class UpdateCourseScreen(BaseScreen):
                     row = table.get_row(row_key)
                     new_code = row[0]
                     
-                    en_repo = self.app.enrollment_repo
-                    if en_repo.remove_enrollment(self.user_data[0], self.old_code):
-                        if en_repo.enroll_student(self.user_data[0], new_code):
-                            self.notify(f"Updated: {self.old_code} -> {new_code}")
-                            self.callback()
-                            self.app.pop_screen()
-                        else:
-                            # Rollback if possible, though repo doesn't have a clean swap
-                            en_repo.enroll_student(self.user_data[0], self.old_code)
-                            self.notify("Error enrolling in new course.", severity="error")
+                    # Drop and enroll commit together or not at all.
+                    if self.app.enrollment_repo.swap_enrollment(self.user_data[0], self.old_code, new_code):
+                        self.notify(f"Updated: {self.old_code} -> {new_code}")
+                        self.callback()
+                        self.app.pop_screen()
                     else:
-                        self.notify("Error removing old course.", severity="error")
+                        self.notify(f"Could not swap into {new_code} (full or unavailable).", severity="error")
                 except Exception:
                     self.notify("Please select a course first.", severity="warning")
             else:
@@ -178,12 +179,14 @@ class EnrollmentScreen(BaseScreen):
     def __init__(self, user):
         super().__init__()
         self.user_data = user
+        self.search_text = ""
 
     def compose_content(self) -> ComposeResult:
         with Center():
             with Middle():
                 yield Label("Browse & Enroll", id="screen-title")
                 yield Label("Select a course and click Enroll (Max 8)", id="screen-subtitle")
+                yield Input(placeholder="Search courses by code or name...", id="course-search")
                 yield DataTable(id="enroll-table")
                 yield Button("Enroll Selected", id="enroll-btn", variant="success")
                 yield Button("Back", id="back", variant="error")
@@ -194,20 +197,29 @@ class EnrollmentScreen(BaseScreen):
         table.cursor_type = "row"
 
     def refresh_table(self) -> None:
+        table = self.query_one(DataTable)
+        table.loading = True
+        self.run_worker(self.load_courses(), exclusive=True)
+
+    async def load_courses(self) -> None:
+        repos = self.app.async_repos
+        enrolled = await repos.enrollments.get_student_enrollments(self.user_data[0])
+        enrolled_codes = {r[0] for r in enrolled}
+        if self.search_text:
+            all_courses = await repos.courses.search(self.search_text)
+        else:
+            all_courses = await repos.courses.get_all_courses()
+
         table = self.query_one(DataTable)
         table.clear(columns=True)
         table.add_columns("Code", "Course Name")
-        
-        enrollment_repo = self.app.enrollment_repo
-        course_repo = self.app.course_repo
-        
-        enrolled = enrollment_repo.get_student_enrollments(self.user_data[0])
-        enrolled_codes = {r[0] for r in enrolled}
-        
-        all_courses = course_repo.get_all_courses()
-        for row in all_courses:
-            if row[0] not in enrolled_codes:
-                table.add_row(*row)
+        table.add_rows(row for row in all_courses if row[0] not in enrolled_codes)
+        table.loading = False
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "course-search":
+            self.search_text = event.value.strip()
+            self.refresh_table()
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         super().on_button_pressed(event)
@@ -221,14 +233,14 @@ class EnrollmentScreen(BaseScreen):
                     row = table.get_row(row_key)
                     course_code = row[0]
                     
-                    enrollment_repo = self.app.enrollment_repo
-                    if enrollment_repo.get_enrollment_count(self.user_data[0]) >= 8:
-                        self.notify("Enrollment limit (8) reached!", severity="error")
-                        return
-
-                    if enrollment_repo.enroll_student(self.user_data[0], course_code):
+                    outcome = self.app.enrollment_repo.reserve_seat(self.user_data[0], course_code)
+                    if outcome == ENROLLED:
                         self.notify(f"Successfully enrolled in {course_code}!")
                         self.refresh_table()
+                    elif outcome == LIMIT_REACHED:
+                        self.notify(f"Enrollment limit ({MAX_STUDENT_COURSES}) reached!", severity="error")
+                    elif outcome == COURSE_FULL:
+                        self.notify(f"{course_code} is full.", severity="error")
                     else:
                         self.notify(f"Enrollment failed.", severity="error")
                 except Exception as e:
@@ -297,6 +309,18 @@ class RegistrationScreen(BaseScreen):
                     subtitle.add_class("error")
 
 
+class CustomIdSuggester(Suggester):
+    # Completes student IDs from the in-memory directory; silent until it has loaded.
+    def __init__(self, directory: UserDirectory):
+        super().__init__(use_cache=False, case_sensitive=False)
+        self.directory = directory
+
+    async def get_suggestion(self, value: str) -> str | None:
+        if not self.directory.loaded:
+            return None
+        return self.directory.complete_id(value)
+
+
 class LoginScreen(BaseScreen):
     # Screen for current user login.
     def compose_content(self) -> ComposeResult:
@@ -304,7 +328,9 @@ class LoginScreen(BaseScreen):
             with Middle():
                 yield Label("Login Screen", id="screen-title")
                 yield Label("Welcome Back !", id="screen-subtitle", classes="success")
-                yield Input(placeholder="Put your id ....." , id="input")
+                yield Input(placeholder="Put your id ....." , id="input",
+                            suggester=CustomIdSuggester(self.app.user_directory))
+                yield Label("", id="login-hint")
                 yield Button("Login", id="login", variant="primary")
                 yield Button("Back to Welcome", id="back", variant="error")
 
@@ -314,19 +340,32 @@ class LoginScreen(BaseScreen):
             self.app.pop_screen()
         elif event.button.id == "login":
             user_input = self.query_one("#input", Input).value
-            user_repo = self.app.user_repo
-            user = user_repo.get_user_by_custom_id(user_input)
-            
-            if user:
-                if user[3] == 'student':
-                    self.app.push_screen(Dashboard(user))
-                elif user[3] == 'admin':
-                    self.app.push_screen(AdminDashboard(user))
-            else:
-                subtitle = self.query_one("#screen-subtitle", Label)
-                subtitle.update("Error: Invalid ID or Access Denied!")
-                subtitle.remove_class("success")
-                subtitle.add_class("error")
+            self.query_one("#login", Button).disabled = True
+            self.query_one("#screen-subtitle", Label).update("Checking ID...")
+            self.run_worker(self.login(user_input), exclusive=True)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        directory = self.app.user_directory
+        matches = directory.suggest(event.value) if directory.loaded else []
+        self.query_one("#login-hint", Label).update(
+            "  ".join(f"{custom_id} ({name})" for custom_id, name in matches)
+        )
+
+    async def login(self, user_input: str) -> None:
+        user = await self.app.async_repos.users.get_user_by_custom_id(user_input)
+        self.query_one("#login", Button).disabled = False
+        subtitle = self.query_one("#screen-subtitle", Label)
+        subtitle.update("Welcome Back !")
+
+        if user:
+            if user[3] == 'student':
+                self.app.push_screen(Dashboard(user))
+            elif user[3] == 'admin':
+                self.app.push_screen(AdminDashboard(user))
+        else:
+            subtitle.update("Error: Invalid ID or Access Denied!")
+            subtitle.remove_class("success")
+            subtitle.add_class("error")
 
 
 class AddCourseScreen(BaseScreen):
@@ -337,6 +376,7 @@ class AddCourseScreen(BaseScreen):
                 yield Label("Add New Course", id="screen-title")
                 yield Input(placeholder="Course Code...", id="code-input")
                 yield Input(placeholder="Course Name...", id="name-input")
+                yield Input(placeholder="Capacity (blank = unlimited)...", id="capacity-input", type="integer")
                 yield Button("Add Course", id="add-btn", variant="primary")
                 yield Button("Back", id="back", variant="error")
 
@@ -347,40 +387,169 @@ class AddCourseScreen(BaseScreen):
         elif event.button.id == "add-btn":
             code = self.query_one("#code-input", Input).value
             name = self.query_one("#name-input", Input).value
+            capacity = self.query_one("#capacity-input", Input).value.strip()
+            # The integer Input lets through partial entries such as "-", "+" or "1_".
+            if capacity and not capacity.isdigit():
+                self.notify("Error: Capacity must be a whole number.", severity="error")
+                return
             if code and name:
                 repo = self.app.course_repo
-                if repo.get_course_count() >= 10:
-                    self.notify("Error: Limit reached (Max 10).", severity="error")
-                    return
-                if repo.add_course(code, name):
+                # The insert checks the limit itself, so two admins cannot both add the last course.
+                if repo.add_course(code, name, int(capacity) if capacity else None, max_courses=MAX_COURSES):
                     self.notify(f"Course {code} added!")
                     self.app.pop_screen()
                 else:
-                    self.notify("Error: Code already exists.", severity="error")
+                    self.notify(f"Error: Code already exists or limit reached (Max {MAX_COURSES}).", severity="error")
 
 
 class RosterScreen(BaseScreen):
-    # Screen for viewing global roster.
+    # Screen for viewing global roster, fetched one keyset page at a time.
+    PREFETCH_MARGIN = 10
+
+    def __init__(self):
+        super().__init__()
+        self.last_id = ""
+        self.exhausted = False
+        self.fetching = False
+
     def compose_content(self) -> ComposeResult:
         with Center():
             with Middle():
                 yield Label("Master Roster", id="screen-title")
+                yield Input(placeholder="Jump to student ID...", id="roster-jump")
+                yield Input(placeholder="Search students by name or ID...", id="roster-search")
                 yield DataTable(id="roster-table")
                 yield Button("Back", id="back", variant="error")
 
     def on_mount(self) -> None:
         table = self.query_one(DataTable)
+        table.cursor_type = "row"
         table.add_columns("Student", "ID", "Courses")
-        repo = self.app.enrollment_repo
-        roster = repo.get_global_roster()
-        if roster:
-            for r in roster:
-                table.add_row(*r)
+        self.load_page()
+
+    def load_page(self, start_id: str | None = None) -> None:
+        # A jump resets the table and seeks straight to the first ID >= start_id.
+        table = self.query_one(DataTable)
+        if start_id is not None:
+            table.clear()
+            self.last_id = start_id
+            self.exhausted = False
+        elif self.exhausted or self.fetching:
+            return
+        self.fetching = True
+        table.loading = table.row_count == 0
+        self.run_worker(self.fetch_page(inclusive=start_id is not None), exclusive=True)
+
+    async def fetch_page(self, inclusive: bool) -> None:
+        try:
+            rows = await self.app.async_repos.enrollments.get_global_roster_page(
+                self.last_id, ROSTER_PAGE_SIZE, inclusive
+            )
+        finally:
+            self.fetching = False
+        table = self.query_one(DataTable)
+        table.add_rows(rows)
+        table.loading = False
+        if rows:
+            self.last_id = rows[-1][1]
+        self.exhausted = len(rows) < ROSTER_PAGE_SIZE
+
+    def search(self, text: str) -> None:
+        # Search results replace the paged view; paging stops until the search is cleared.
+        table = self.query_one(DataTable)
+        table.clear()
+        table.loading = True
+        self.exhausted = True
+        self.run_worker(self.fetch_search(text), exclusive=True)
+
+    async def fetch_search(self, text: str) -> None:
+        rows = await self.app.async_repos.enrollments.search_roster(text)
+        table = self.query_one(DataTable)
+        table.add_rows(rows)
+        table.loading = False
+        if not rows:
+            self.notify("No matching students.", severity="warning")
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        if event.cursor_row >= event.data_table.row_count - self.PREFETCH_MARGIN:
+            self.load_page()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "roster-jump":
+            self.load_page(start_id=event.value.strip())
+            self.query_one(DataTable).focus()
+        elif event.input.id == "roster-search":
+            text = event.value.strip()
+            if text:
+                self.search(text)
+            else:
+                self.load_page(start_id="")
+            self.query_one(DataTable).focus()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        super().on_button_pressed(event)
+        if event.button.id == "back":
+            self.app.pop_screen()
+
+
+class AnalyticsScreen(BaseScreen):
+    # Screen for course demand and co-enrollment, computed in batch off the UI thread.
+    def compose_content(self) -> ComposeResult:
+        with Center():
+            with Middle():
+                yield Label("Course Analytics", id="screen-title")
+                yield Label("", id="analytics-summary")
+                yield DataTable(id="demand-table")
+                yield DataTable(id="coenrollment-table")
+                yield Button("Refresh", id="refresh", variant="primary")
+                yield Button("Back", id="back", variant="error")
+
+    def on_mount(self) -> None:
+        demand = self.query_one("#demand-table", DataTable)
+        demand.cursor_type = "row"
+        demand.add_columns("Code", "Course", "Enrolled", "Capacity", "Fill", "Conflicts", "Shared", "Top Pair")
+        self.refresh_report()
+
+    def refresh_report(self) -> None:
+        for table in self.query(DataTable):
+            table.clear(columns=table.id == "coenrollment-table")
+            table.loading = True
+        self.run_worker(self.compute_report, thread=True, exclusive=True)
+
+    def compute_report(self) -> None:
+        from src.infrastructure.coenrollment import CoEnrollmentEngine
+        report = CoEnrollmentEngine(self.app.db).compute()
+        self.app.call_from_thread(self.show_report, report)
+
+    def show_report(self, report) -> None:
+        self.query_one("#analytics-summary", Label).update(
+            f"{report.students} students with enrollments, {len(report.codes)} courses "
+            f"({report.backend} engine, {report.elapsed * 1000:.0f}ms)"
+        )
+        demand = self.query_one("#demand-table", DataTable)
+        for i, code in enumerate(report.codes):
+            fill = report.fill_rate(i)
+            partner = report.top_partner(i)
+            demand.add_row(
+                code, report.names[i], report.popularity[i],
+                report.capacities[i] if report.capacities[i] is not None else "Unlimited",
+                f"{fill:.0%}" if fill is not None else "-",
+                report.conflicts[i], report.conflict_students[i],
+                f"{partner[0]} ({partner[1]})" if partner else "-",
+            )
+        demand.loading = False
+
+        matrix = self.query_one("#coenrollment-table", DataTable)
+        matrix.add_columns("", *report.codes)
+        matrix.add_rows([code, *row] for code, row in zip(report.codes, report.co_enrollment))
+        matrix.loading = False
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         super().on_button_pressed(event)
         if event.button.id == "back":
             self.app.pop_screen()
+        elif event.button.id == "refresh":
+            self.refresh_report()
 
 
 class RegisterAdminScreen(BaseScreen):
@@ -423,6 +592,7 @@ class AdminDashboard(BaseScreen):
                 yield Label(f"Admin: {self.user[2]}", id="screen-title")
                 yield Button("Add Course", id="add_course", variant="primary")
                 yield Button("View Roster", id="view_roster")
+                yield Button("Analytics", id="analytics")
                 yield Button("New Admin", id="new_admin")
                 yield Button("Logout", id="logout", variant="error")
 
@@ -432,6 +602,8 @@ class AdminDashboard(BaseScreen):
             self.app.push_screen(AddCourseScreen())
         elif event.button.id == "view_roster":
             self.app.push_screen(RosterScreen())
+        elif event.button.id == "analytics":
+            self.app.push_screen(AnalyticsScreen())
         elif event.button.id == "new_admin":
             self.app.push_screen(RegisterAdminScreen())
         elif event.button.id == "logout":
@@ -462,13 +634,25 @@ class WelcomePage(BaseScreen):
 class StudentManagerApp(App):
 
     TITLE = "Student Manager Tool"
-    
+    BINDINGS = [("f2", "dump_query_stats", "Dump query stats")]
+
+    def __init__(self, db_options: dict | None = None, query_stats_path: str | None = None):
+        super().__init__()
+        # Extra UniversityDB arguments (e.g. instrument=True) and where F2 writes the query stats.
+        self.db_options = db_options or {}
+        self.query_stats_path = query_stats_path
+
     def on_mount(self) -> None:
-        self.db = UniversityDB()
-        self.user_repo = UserRepository(self.db)
-        self.course_repo = CourseRepository(self.db)
-        self.enrollment_repo = EnrollmentRepository(self.db)
+        self.db = UniversityDB(pooled=True, **self.db_options)
+        self.user_directory = UserDirectory(self.db)
+        self.user_repo = CachedUserRepository(self.db, ttl=SHARED_CACHE_TTL, directory=self.user_directory)
+        self.course_repo = CachedCourseRepository(self.db, ttl=SHARED_CACHE_TTL)
+        self.enrollment_repo = cached_enrollment_repository(self.db, ttl=SHARED_CACHE_TTL)
+        self.async_repos = AsyncRepositories(self.user_repo, self.course_repo, self.enrollment_repo)
         
+        # Build the autocomplete index off the UI thread so login never waits on it.
+        self.run_worker(self.user_directory.load, thread=True)
+
         # Always push WelcomePage as the base screen
         self.push_screen(WelcomePage())
         
@@ -477,14 +661,31 @@ class StudentManagerApp(App):
         if args:
             admin_str = args[0]
             if is_admin_string_hard(admin_str):
-                user = self.user_repo.get_user_by_custom_id(admin_str)
-                if not user:
-                    self.user_repo.register_user(admin_str, 'admin', admin_str)
+                with self.db.transaction():
                     user = self.user_repo.get_user_by_custom_id(admin_str)
+                    if not user:
+                        self.user_repo.register_user(admin_str, 'admin', admin_str)
+                        user = self.user_repo.get_user_by_custom_id(admin_str)
                 
                 # Directly push Admin Dashboard on top of WelcomePage
                 self.push_screen(AdminDashboard(user))
 
+    def action_dump_query_stats(self) -> None:
+        stats = self.db.query_stats()
+        if stats is None:
+            self.notify("Query stats are off (start with --query-stats PATH).", severity="warning")
+            return
+        path = self.query_stats_path or "query_stats.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        self.notify(f"{stats['statements']} statements, {stats['slow_queries']} slow -> {path}")
+
+    def on_unmount(self) -> None:
+        if self.query_stats_path and self.db.query_stats() is not None:
+            self.action_dump_query_stats()
+        self.async_repos.close()
+        self.db.close()
+
     CSS = """
     Screen {
         align: center middle;
@@ -560,6 +761,16 @@ class StudentManagerApp(App):
         margin-bottom: 2;
     }
 
+    #login-hint {
+        color: $text-muted;
+        margin-bottom: 1;
+    }
+
+    #analytics-summary {
+        color: $text-muted;
+        margin-bottom: 1;
+    }
+
     .success {
         color: $success;
     }
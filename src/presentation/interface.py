@@ -1,8 +1,34 @@
 from ..infrastructure.database import UniversityDB
-from ..infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+from ..infrastructure.migrations import MAX_STUDENT_COURSES
+from ..infrastructure.repositories import ENROLLED, LIMIT_REACHED, COURSE_FULL, MAX_COURSES
 from ..infrastructure.utils import is_admin_string_hard, clear_screen
 import uuid
 
+try:
+    import readline
+except ImportError:  # Windows without pyreadline: fall back to plain input()
+    readline = None
+
+
+def input_custom_id(prompt, directory):
+    """input() with Tab completion of student IDs (or names) from the in-memory directory."""
+    if readline is None or directory is None:
+        return input(prompt)
+    matches = []
+
+    def complete(text, state):
+        if state == 0:
+            matches[:] = [custom_id for custom_id, _ in directory.suggest(text)]
+        return matches[state] if state < len(matches) else None
+
+    previous = readline.get_completer()
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
+    try:
+        return input(prompt)
+    finally:
+        readline.set_completer(previous)
+
 
 def student_portal(user_repo, course_repo, enrollment_repo):
     """Student login and course management portal."""
@@ -13,7 +39,7 @@ def student_portal(user_repo, course_repo, enrollment_repo):
         choice = input("\nAction: ")
         
         if choice == '1':
-            sid = input("Enter Custom ID: ").strip()
+            sid = input_custom_id("Enter Custom ID (Tab to complete): ", user_repo.directory).strip()
             user = user_repo.get_user_by_custom_id(sid)
             if user and user[3] == 'student':
                 student_session(user, user_repo, course_repo, enrollment_repo)
@@ -49,9 +75,11 @@ def student_session(user, user_repo, course_repo, enrollment_repo):
         act = input("\nChoice: ")
         
         if act == '1':
+            # Counter read so a full schedule is reported before asking for a code;
+            # the limit itself is enforced by the insert.
             enrollment_count = enrollment_repo.get_enrollment_count(u_uuid)
-            if enrollment_count >= 8:
-                input("Limit reached (Max 8 courses).")
+            if enrollment_count >= MAX_STUDENT_COURSES:
+                input(f"Limit reached (Max {MAX_STUDENT_COURSES} courses).")
                 continue
             
             all_courses = course_repo.get_all_courses()
@@ -64,9 +92,13 @@ def student_session(user, user_repo, course_repo, enrollment_repo):
                 print(f"[{c[0]}] {c[1]}")
             
             target = input("Enter Course Code: ").strip()
-            success = enrollment_repo.enroll_student(u_uuid, target)
-            if success:
+            outcome = enrollment_repo.reserve_seat(u_uuid, target)
+            if outcome == ENROLLED:
                 input("Enrolled successfully!")
+            elif outcome == COURSE_FULL:
+                input("Course is full.")
+            elif outcome == LIMIT_REACHED:
+                input(f"Limit reached (Max {MAX_STUDENT_COURSES} courses).")
             else:
                 input("Invalid code or already enrolled.")
         
@@ -100,7 +132,7 @@ def student_session(user, user_repo, course_repo, enrollment_repo):
                 update_count += 1
                 input(f"Success! Update {update_count}/3 completed.")
             else:
-                input("Error: Update failed. Check course codes (must exist and not duplicate).")
+                input("Error: Update failed. Check course codes (must exist, have free seats and not duplicate).")
         
         elif act == '4':
             break
@@ -111,40 +143,46 @@ def student_session(user, user_repo, course_repo, enrollment_repo):
 
 def admin_portal(user_repo, course_repo, enrollment_repo, admin_str):
     """Admin portal for managing courses and users."""
-    user = user_repo.get_user_by_custom_id(admin_str)
-    if not user:
-        user_repo.register_user(admin_str, 'admin', admin_str)
+    # Looking up and creating the admin in one transaction commits once and cannot race another login.
+    with user_repo.db.transaction():
         user = user_repo.get_user_by_custom_id(admin_str)
+        if not user:
+            user_repo.register_user(admin_str, 'admin', admin_str)
+            user = user_repo.get_user_by_custom_id(admin_str)
     
     while True:
         clear_screen()
         print(f"ADMIN PORTAL | ID: {user[1]}")
         print("-" * 50)
-        print("1. Add Course (Max 10)\n2. VIEW GLOBAL ROSTER\n3. REGISTER NEW ADMIN\n4. Exit")
+        print("1. Add Course (Max 10)\n2. VIEW GLOBAL ROSTER\n3. REGISTER NEW ADMIN\n4. ANALYTICS REPORT\n5. Exit")
         
         choice = input("\nAction: ")
         
         if choice == '1':
             course_count = course_repo.get_course_count()
-            if course_count >= 10:
-                input("Error: Limit reached. Admin can only register 10 courses max.")
+            if course_count >= MAX_COURSES:
+                input(f"Error: Limit reached. Admin can only register {MAX_COURSES} courses max.")
                 continue
             
             code = input("Course Code: ").strip()
             name = input("Course Name: ").strip()
-            success = course_repo.add_course(code, name)
-            if success:
+            capacity = input("Capacity (blank = unlimited): ").strip()
+            if capacity and not capacity.isdigit():
+                input("Error: Capacity must be a whole number.")
+                continue
+            # Checked again by the insert itself: another admin may have added courses meanwhile.
+            if course_repo.add_course(code, name, int(capacity) if capacity else None, max_courses=MAX_COURSES):
                 input("Course Added.")
             else:
-                input("Error: Code exists or invalid.")
+                input(f"Error: Code exists, invalid or the {MAX_COURSES}-course limit was reached.")
         
         elif choice == '2':
-            roster = enrollment_repo.get_global_roster()
             print("\n--- MASTER ROSTER ---")
-            if roster:
-                for r in roster:
-                    print(f"Student: {r[0]} | ID: {r[1]}\nCourses: {r[2]}\n")
-            else:
+            found = False
+            for r in enrollment_repo.iter_global_roster():
+                found = True
+                print(f"Student: {r[0]} | ID: {r[1]}\nCourses: {r[2]}\n")
+            if not found:
                 print("No enrollments found.")
             input("Back...")
         
@@ -160,6 +198,24 @@ def admin_portal(user_repo, course_repo, enrollment_repo, admin_str):
                 input("Error: Already exists.")
         
         elif choice == '4':
+            from ..infrastructure.analytics import EnrollmentAnalytics
+            print("\nCrunching enrollments...")
+            report = EnrollmentAnalytics(enrollment_repo.db).run()
+            print(f"\n--- ANALYTICS ({report.students} students, {report.enrollments} enrollments, "
+                  f"{report.elapsed:.2f}s on {report.workers} workers) ---")
+            print("\nCourse fill:")
+            for code, name, enrolled, capacity, fill in report.course_fill:
+                seats = f"{enrolled}/{capacity} ({fill:.0%})" if capacity is not None else f"{enrolled} (unlimited)"
+                print(f"  {code:<10} {name:<30} {seats}")
+            print("\nCourses per student:")
+            for courses, students in report.load_distribution.items():
+                print(f"  {courses}: {students} students")
+            print("\nMost common course pairs:")
+            for (a, b), students in report.co_enrollment[:10]:
+                print(f"  {a} + {b}: {students} students")
+            input("\nBack...")
+
+        elif choice == '5':
             break
         
         else:
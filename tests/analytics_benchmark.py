@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import time
+from src.infrastructure.analytics import EnrollmentAnalytics
+from src.infrastructure.database import Rollback, UniversityDB
+from src.infrastructure.migrations import MAX_STUDENT_COURSES
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+
+def run_analytics_benchmark(n_users=100000, n_courses=10):
+    print(f"--- Sharded Analytics Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, CPUs: {os.cpu_count()}\n")
+
+    test_db_path = "analytics_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    db = UniversityDB(test_db_path)
+    rng = random.Random(7)
+    CourseRepository(db).add_courses_bulk(
+        (f"C{i}", f"Course Name {i}", n_users if i % 3 else None) for i in range(n_courses)
+    )
+    user_uuids = UserRepository(db).register_users_bulk(
+        (f"Student {i}", "student", f"ID_{i}") for i in range(n_users)
+    )
+    start_time = time.perf_counter()
+    EnrollmentRepository(db).enroll_many(
+        (u_uuid, f"C{j}")
+        for u_uuid in user_uuids
+        for j in rng.sample(range(n_courses), rng.randint(0, min(MAX_STUDENT_COURSES, n_courses)))
+    )
+    print(f"[+] Seeded {db.execute_single('SELECT COUNT(*) FROM enrollments')[0]:,} enrollments "
+          f"in {time.perf_counter() - start_time:.2f}s\n")
+
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    reports = {}
+    for workers in worker_counts:
+        reports[workers] = EnrollmentAnalytics(db, max_workers=workers).run()
+        r = reports[workers]
+        print(f"[+] {workers} worker(s), {r.shards} shards: {r.elapsed:.4f}s "
+              f"(speedup x{reports[1].elapsed / r.elapsed:.2f})")
+
+    serial = reports[1]
+    mismatched = [w for w, r in reports.items()
+                  if (r.course_fill, r.load_distribution, r.co_enrollment) !=
+                     (serial.course_fill, serial.load_distribution, serial.co_enrollment)]
+    # The trigger-maintained counters give an independent check of the per-course totals.
+    counters = dict(db.execute_query("SELECT code, enrollment_count FROM courses"))
+    wrong_fill = [code for code, _, enrolled, _, _ in serial.course_fill if counters[code] != enrolled]
+
+    print(f"\nLoad distribution (courses -> students): {serial.load_distribution}")
+    print(f"Top co-enrollments: {serial.co_enrollment[:3]}")
+
+    # A report taken inside a caller's transaction must leave that transaction open.
+    try:
+        with db.transaction():
+            UserRepository(db).register_user("Uncommitted Student", "student", "TX_1")
+            EnrollmentAnalytics(db, max_workers=1).run()
+            raise Rollback
+        kept_transaction = UserRepository(db).get_user_by_custom_id("TX_1") is None
+    except Exception as e:
+        print(f"[!] Analytics inside a transaction failed: {e}")
+        kept_transaction = False
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    if mismatched or wrong_fill:
+        print(f"[!] Results differ for workers {mismatched}, course counts off for {wrong_fill}")
+        return False
+    if not kept_transaction:
+        print("[!] Analytics committed the caller's transaction")
+        return False
+    print("[+] Every worker count produced identical results.")
+    return True
+
+if __name__ == "__main__":
+    users = 100000
+    courses = 10
+    if len(sys.argv) > 1:
+        users = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    sys.exit(0 if run_analytics_benchmark(users, courses) else 1)
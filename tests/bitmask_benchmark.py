@@ -0,0 +1,104 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from performance_test import COURSES_PER_STUDENT, DEFAULT_REPEATS, DEFAULT_WARMUP, measure, seed
+from src.infrastructure.bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, set_enrollment_storage
+from src.infrastructure.repositories import EnrollmentRepository, ENROLLED
+
+
+def file_size(db, directory, name):
+    """Bytes the database needs once compacted, without touching the original file."""
+    path = os.path.join(directory, name)
+    db.execute_update(f"VACUUM INTO '{path}'")
+    return os.path.getsize(path)
+
+
+def run_layout(layout, n_users, n_courses, warmup, repeats, workdir):
+    db_path = os.path.join(workdir, f"{layout}.db")
+    db, user_uuids, fresh_uuids = seed(db_path, n_users, n_courses, warmup + repeats)
+    if layout == BITMASK:
+        start = time.perf_counter()
+        moved = set_enrollment_storage(db, BITMASK)
+        print(f"  converted {moved:,} enrollment rows to bitmasks in {time.perf_counter() - start:.2f}s")
+        repo = BitmaskEnrollmentRepository(db)
+    else:
+        repo = EnrollmentRepository(db)
+    rng = random.Random(42)
+    students = [user_uuids[rng.randrange(n_users)] for _ in range(warmup + repeats)]
+    page_starts = [f"ID_{rng.randrange(n_users)}" for _ in range(warmup + repeats)]
+
+    def enroll(i):
+        assert repo.reserve_seat(fresh_uuids[i], "C0") == ENROLLED
+
+    def drop(i):
+        assert repo.remove_enrollment(fresh_uuids[i], "C0")
+
+    held = {}
+    swap_out, swap_in = f"C{COURSES_PER_STUDENT - 1}", f"C{COURSES_PER_STUDENT}"
+
+    def swap(i):
+        u_uuid = user_uuids[i % n_users]
+        old = held.get(u_uuid, swap_out)
+        new = swap_in if old == swap_out else swap_out
+        assert repo.swap_enrollment(u_uuid, old, new)
+        held[u_uuid] = new
+
+    benchmarks = {
+        "enroll": enroll,
+        "drop": drop,
+        "swap": swap,
+        "count": lambda i: repo.get_enrollment_count(students[i]),
+        "student_courses": lambda i: repo.get_student_enrollments(students[i]),
+        "roster_page": lambda i: repo.get_global_roster_page(after_id=page_starts[i]),
+    }
+    results = {name: measure(op, warmup, repeats) for name, op in benchmarks.items()}
+    results["roster_full"] = measure(lambda i: repo.get_global_roster(), 1, max(3, repeats // 50))
+
+    state = (
+        sorted(repo.get_global_roster()),
+        db.execute_query("SELECT code, enrollment_count FROM courses ORDER BY code"),
+        db.execute_query("SELECT custom_id, enrollment_count FROM users ORDER BY custom_id"),
+    )
+    size = file_size(db, workdir, f"{layout}.compact.db")
+    db.close()
+    return results, size, state
+
+
+def run_bitmask_benchmark(n_users=100000, n_courses=10, warmup=DEFAULT_WARMUP, repeats=DEFAULT_REPEATS):
+    print(f"--- Row vs Bitmask Enrollment Layout ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, Enrollments each: {COURSES_PER_STUDENT}, Repeats: {repeats}\n")
+    workdir = tempfile.mkdtemp()
+    layouts = {}
+    for layout in ("rows", BITMASK):
+        print(f"[+] {layout}")
+        layouts[layout] = run_layout(layout, n_users, n_courses, warmup, repeats, workdir)
+
+    (rows, rows_size, rows_state), (masks, masks_size, masks_state) = layouts["rows"], layouts[BITMASK]
+    print(f"\n{'operation':<17}{'rows p50':>12}{'bitmask p50':>14}{'speedup':>10}")
+    for name in rows:
+        before, after = rows[name]["p50_us"], masks[name]["p50_us"]
+        print(f"{name:<17}{before:>10.1f}us{after:>12.1f}us{before / after:>9.2f}x")
+    print(f"{'database size':<17}{rows_size / 1e6:>10.2f}MB{masks_size / 1e6:>12.2f}MB{rows_size / masks_size:>9.2f}x")
+
+    for suffix in ("", "-wal", "-shm"):
+        for name in ("rows.db", "bitmask.db"):
+            if os.path.exists(os.path.join(workdir, name + suffix)):
+                os.remove(os.path.join(workdir, name + suffix))
+    if rows_state != masks_state:
+        print("\n[!] The layouts disagree on the roster or the enrollment counters after the same operations.")
+        return False
+    print("\n[+] Both layouts ended with the same roster and counters.")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the row-per-enrollment and bitmask layouts.")
+    parser.add_argument("users", type=int, nargs="?", default=100000)
+    parser.add_argument("courses", type=int, nargs="?", default=10)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    args = parser.parse_args()
+    sys.exit(0 if run_bitmask_benchmark(args.users, args.courses, args.warmup, args.repeats) else 1)
@@ -0,0 +1,104 @@
+import os
+import random
+import sys
+import time
+from src.infrastructure import coenrollment
+from src.infrastructure.analytics import EnrollmentAnalytics
+from src.infrastructure.coenrollment import CoEnrollmentEngine
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.migrations import MAX_STUDENT_COURSES
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+
+# The per-student loop is slow enough that it is only timed on a sample and extrapolated.
+LOOP_SAMPLE = 20000
+
+
+def per_student_loop(db, student_uuids, codes):
+    """The approach the engine replaces: one get_student_enrollments call per student."""
+    enrollments = EnrollmentRepository(db)
+    index = {code: i for i, code in enumerate(codes)}
+    matrix = [[0] * len(codes) for _ in codes]
+    for user_uuid in student_uuids:
+        taken = [index[code] for code, in enrollments.get_student_enrollments(user_uuid)]
+        for i in taken:
+            for j in taken:
+                matrix[i][j] += 1
+    return matrix
+
+
+def run_coenrollment_benchmark(n_users=100000, n_courses=10):
+    print(f"--- Co-enrollment Engine Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, NumPy: {'yes' if coenrollment.np is not None else 'no'}\n")
+
+    test_db_path = "coenrollment_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    db = UniversityDB(test_db_path)
+    rng = random.Random(11)
+    CourseRepository(db).add_courses_bulk(
+        (f"C{i}", f"Course Name {i}", n_users if i % 3 else None) for i in range(n_courses)
+    )
+    user_uuids = UserRepository(db).register_users_bulk(
+        (f"Student {i}", "student", f"ID_{i}") for i in range(n_users)
+    )
+    EnrollmentRepository(db).enroll_many(
+        (u_uuid, f"C{j}")
+        for u_uuid in user_uuids
+        for j in rng.sample(range(n_courses), rng.randint(0, min(MAX_STUDENT_COURSES, n_courses)))
+    )
+    print(f"[+] Seeded {db.execute_single('SELECT COUNT(*) FROM enrollments')[0]:,} enrollments\n")
+
+    backends = [False] + ([True] if coenrollment.np is not None else [])
+    reports = {}
+    for use_numpy in backends:
+        report = CoEnrollmentEngine(db, use_numpy=use_numpy).compute()
+        reports[report.backend] = report
+        print(f"[+] {report.backend:<6} engine: {report.elapsed:.4f}s")
+
+    sample = user_uuids[:min(LOOP_SAMPLE, n_users)]
+    start_time = time.perf_counter()
+    per_student_loop(db, sample, reports["python"].codes)
+    loop_time = (time.perf_counter() - start_time) * n_users / max(len(sample), 1)
+    print(f"[+] per-student loop: {loop_time:.4f}s (extrapolated from {len(sample):,} students)")
+    for backend, report in reports.items():
+        print(f"    {backend} engine speedup: x{loop_time / report.elapsed:.1f}")
+
+    # Cross-check: the engines agree with each other, with the sharded pair counts and
+    # with the trigger-maintained counters.
+    problems = []
+    python = reports["python"]
+    for backend, report in reports.items():
+        if (report.students, report.co_enrollment, report.conflicts, report.conflict_students) != \
+           (python.students, python.co_enrollment, python.conflicts, python.conflict_students):
+            problems.append(f"{backend} engine disagrees with the python engine")
+    pairs = dict(EnrollmentAnalytics(db, max_workers=1).run().co_enrollment)
+    index = {code: i for i, code in enumerate(python.codes)}
+    for (a, b), count in pairs.items():
+        if python.co_enrollment[index[a]][index[b]] != count or python.co_enrollment[index[b]][index[a]] != count:
+            problems.append(f"pair {a}/{b} differs from the sharded analytics")
+    counters = dict(db.execute_query("SELECT code, enrollment_count FROM courses"))
+    problems += [f"{code} popularity off" for code, n in zip(python.codes, python.popularity) if counters[code] != n]
+
+    print(f"\nPopularity: {dict(zip(python.codes, python.popularity))}")
+    print(f"Conflicts per course: {dict(zip(python.codes, python.conflicts))}")
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    for problem in problems:
+        print(f"[!] {problem}")
+    if not problems:
+        print("[+] All engines match the sharded analytics and the course counters.")
+    return not problems
+
+if __name__ == "__main__":
+    users = 100000
+    courses = 10
+    if len(sys.argv) > 1:
+        users = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    sys.exit(0 if run_coenrollment_benchmark(users, courses) else 1)
@@ -0,0 +1,59 @@
+import time
+import os
+import sys
+import resource
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+from src.infrastructure.bulk_export import BulkExporter
+
+def run_export_benchmark(n_users=100000, n_courses=10):
+    print(f"--- Bulk Export Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, Enrollments: {n_users * 5}\n")
+
+    test_db_path = "export_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    db = UniversityDB(test_db_path)
+    CourseRepository(db).add_courses_bulk((f"C{i}", f"Course Name {i}") for i in range(n_courses))
+    user_uuids = UserRepository(db).register_users_bulk(
+        (f"Student {i}", "student", f"ID_{i}") for i in range(n_users)
+    )
+    EnrollmentRepository(db).enroll_many(
+        (u_uuid, f"C{(i + j) % n_courses}") for i, u_uuid in enumerate(user_uuids) for j in range(5)
+    )
+    del user_uuids
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    exporter = BulkExporter(db)
+    outputs = [
+        ("users", "export_users.csv"),
+        ("enrollments", "export_enrollments.jsonl"),
+        ("roster", "export_roster.csv"),
+        ("roster", "export_roster.jsonl.gz"),
+    ]
+    for kind, path in outputs:
+        start_time = time.perf_counter()
+        count = exporter.export(kind, path)
+        elapsed = time.perf_counter() - start_time
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"[+] Exported {count} {kind} rows to {path} ({size_mb:.1f} MB) in: {elapsed:.4f}s")
+        os.remove(path)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nPeak RSS before exports: {rss_before:.1f} MB, after: {rss_after:.1f} MB")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+if __name__ == "__main__":
+    users = 100000
+    courses = 10
+    if len(sys.argv) > 1:
+        users = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    run_export_benchmark(users, courses)
@@ -0,0 +1,91 @@
+import time
+import os
+import sys
+import threading
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.repositories import UserRepository
+
+def run_writers(db_path, group_commit, n_threads, n_per_thread, synchronous):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    db = UniversityDB(db_path, group_commit=group_commit)
+    db.conn.execute(f"PRAGMA synchronous = {synchronous}")
+    user_repo = UserRepository(db)
+    failures = []
+
+    def writer(t):
+        for i in range(n_per_thread):
+            if user_repo.register_user(f"Student {t}-{i}", "student", f"ID_{t}_{i}") is None:
+                failures.append((t, i))
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(n_threads)]
+    start_time = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    db.flush()
+    elapsed = time.perf_counter() - start_time
+
+    stats = db.group_stats()
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return elapsed, failures, stats
+
+def check_flush_barrier(db_path):
+    """flush() reports a timeout as False, and a failed grouped statement sets last_error."""
+    problems = []
+    db = UniversityDB(db_path, group_commit=True)
+    UserRepository(db).register_user("Student", "student", "ID_DUP")
+    # Holding the writer lock stalls the flusher, so the barrier cannot be reached in time.
+    with db.lock:
+        pending = db.submit_update(
+            "INSERT INTO users (u_uuid, custom_id, name, role) VALUES (randomblob(16), 'ID_DUP', 'Dup', 'student')"
+        )
+        if db.flush(timeout=0.05) is not False:
+            problems.append("flush() did not report its timeout as False")
+    if db.flush(timeout=5) is not True or pending.result() is not False:
+        problems.append("flush() did not complete once the writer lock was free")
+    if db.last_error is None:
+        problems.append("a failed grouped statement left last_error unset")
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return problems
+
+def run_group_commit_benchmark(n_threads=16, n_per_thread=500, synchronous="FULL"):
+    # Group commit pays off when each COMMIT costs a sync, so FULL is the default here.
+    print(f"--- Group Commit Benchmark ---")
+    print(f"Writer threads: {n_threads}, Inserts per thread: {n_per_thread}, synchronous={synchronous}\n")
+
+    total = n_threads * n_per_thread
+    for label, group_commit in (("per-statement commit", False), ("group commit", True)):
+        elapsed, failures, stats = run_writers(
+            "group_commit_test.db", group_commit, n_threads, n_per_thread, synchronous
+        )
+        print(f"[+] {label}: {total} inserts in {elapsed:.4f}s ({total / elapsed:,.0f} inserts/s, {len(failures)} failed)")
+        if stats:
+            print(f"    {stats['batches']} transactions, {stats['avg_batch']:.1f} statements per commit")
+
+    problems = check_flush_barrier("group_commit_test.db")
+    for problem in problems:
+        print(f"[!] {problem}")
+    if not problems:
+        print("\n[+] flush() timed out as False and completed once the writer was free.")
+    return not problems
+
+if __name__ == "__main__":
+    threads = 16
+    per_thread = 500
+    synchronous = "FULL"
+    if len(sys.argv) > 1:
+        threads = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        per_thread = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        synchronous = sys.argv[3].upper()
+    sys.exit(0 if run_group_commit_benchmark(threads, per_thread, synchronous) else 1)
@@ -0,0 +1,67 @@
+import time
+import os
+import sys
+import csv
+import json
+import resource
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.bulk_import import BulkImporter
+
+def write_fixtures(n_users, n_courses):
+    with open("import_courses.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["code", "name", "capacity"])
+        writer.writerows((f"C{i}", f"Course Name {i}", "") for i in range(n_courses))
+    # Written with a byte-order mark, as spreadsheet exports are.
+    with open("import_users.csv", "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "role", "custom_id"])
+        writer.writerows((f"Student {i}", "student", f"ID_{i}") for i in range(n_users))
+    with open("import_enrollments.jsonl", "w") as f:
+        for i in range(n_users):
+            for j in range(5):
+                f.write(json.dumps({"custom_id": f"ID_{i}", "course_code": f"C{(i + j) % n_courses}"}) + "\n")
+
+def run_import_benchmark(n_users=100000, n_courses=10):
+    print(f"--- Bulk Import Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, Enrollments: {n_users * 5}\n")
+
+    test_db_path = "import_test.db"
+    fixtures = ["import_courses.csv", "import_users.csv", "import_enrollments.jsonl"]
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+    write_fixtures(n_users, n_courses)
+
+    db = UniversityDB(test_db_path)
+    importer = BulkImporter(db)
+    total_time = 0.0
+    rejected = 0
+    for path in fixtures:
+        start_time = time.perf_counter()
+        report = importer.import_file(path)
+        elapsed = time.perf_counter() - start_time
+        total_time += elapsed
+        rejected += report.rejected
+        print(f"[+] Imported {report.imported} {report.kind} ({report.rejected} rejected) in: {elapsed:.4f}s"
+              f" ({report.read / elapsed:,.0f} rows/s)")
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nTotal import time: {total_time:.4f}s, peak RSS: {peak_mb:.1f} MB")
+
+    db.close()
+    for path in fixtures + [test_db_path, test_db_path + "-wal", test_db_path + "-shm"]:
+        if os.path.exists(path):
+            os.remove(path)
+    if rejected:
+        print(f"[!] {rejected} valid rows were rejected")
+    return not rejected
+
+if __name__ == "__main__":
+    users = 100000
+    courses = 10
+    if len(sys.argv) > 1:
+        users = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    sys.exit(0 if run_import_benchmark(users, courses) else 1)
@@ -0,0 +1,273 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from src.infrastructure.database import UniversityDB, is_lock_error
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository, ENROLLED
+
+# Latency histogram bucket upper bounds, in milliseconds.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+OPERATIONS = ("login", "list_courses", "view_schedule", "enroll", "swap")
+
+OK = "ok"
+REFUSED = "refused"  # the application said no (course full, limit reached, ...)
+LOCKED = "locked"    # gave up on `database is locked` after every retry
+ERROR = "error"
+
+
+class SimulatedStudent:
+    """One client connection replaying student_session-style flows.
+
+    Writes that fail with a lock error are retried with jittered backoff;
+    every operation is recorded as (t, op, latency_ns, status, retries).
+    """
+
+    def __init__(self, db_path, busy_timeout, max_retries, seed):
+        self.db = UniversityDB(db_path, busy_timeout=busy_timeout)
+        self.users = UserRepository(self.db)
+        self.courses = CourseRepository(self.db)
+        self.enrollments = EnrollmentRepository(self.db)
+        self.max_retries = max_retries
+        self.rng = random.Random(seed)
+        self.events = []
+
+    def timed(self, start_at, op, call):
+        """Run `call` (returning (status, value)) with lock retries, and record it."""
+        retries = 0
+        begin = time.perf_counter_ns()
+        while True:
+            self.db.last_error = None
+            try:
+                status, value = call()
+            except sqlite3.OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                status, value = LOCKED, None
+            else:
+                if status != OK and self.db.last_error is not None and is_lock_error(self.db.last_error):
+                    status = LOCKED
+            if status != LOCKED or retries >= self.max_retries:
+                break
+            retries += 1
+            time.sleep(self.rng.uniform(0, 0.002 * 2 ** retries))
+        self.events.append((time.time() - start_at, op, time.perf_counter_ns() - begin, status, retries))
+        return value if status == OK else None
+
+    def session(self, start_at, custom_id, codes):
+        user = self.timed(start_at, "login", lambda: self._found(self.users.get_user_by_custom_id(custom_id)))
+        if user is None:
+            return
+        u_uuid = user[0]
+        self.timed(start_at, "list_courses", lambda: (OK, self.courses.get_course_enrollment_counts()))
+        held = [c for (c,) in self.timed(start_at, "view_schedule",
+                                         lambda: (OK, self.enrollments.get_student_enrollments(u_uuid))) or []]
+        free = [c for c in codes if c not in held]
+        if free:
+            code = self.rng.choice(free)
+            if self.timed(start_at, "enroll", lambda: self._enrolled(self.enrollments.reserve_seat(u_uuid, code))):
+                held.append(code)
+                free.remove(code)
+        if held and free:
+            old, new = self.rng.choice(held), self.rng.choice(free)
+            self.timed(start_at, "swap", lambda: self._ok(self.enrollments.swap_enrollment(u_uuid, old, new)))
+        self.timed(start_at, "view_schedule", lambda: (OK, self.enrollments.get_student_courses_detailed(u_uuid)))
+
+    @staticmethod
+    def _found(row):
+        return (OK, row) if row is not None else (ERROR, None)
+
+    @staticmethod
+    def _enrolled(outcome):
+        return (OK, True) if outcome == ENROLLED else (REFUSED, None)
+
+    @staticmethod
+    def _ok(success):
+        return (OK, True) if success else (REFUSED, None)
+
+    def close(self):
+        self.db.close()
+
+
+def run_client(client_id, db_path, start_at, duration, rate, n_students, codes, busy_timeout, max_retries):
+    """Open-loop client: sessions arrive as a Poisson process at `rate`/s for `duration` seconds.
+
+    Returns the recorded events and how late sessions started behind schedule.
+    """
+    student = SimulatedStudent(db_path, busy_timeout, max_retries, seed=client_id)
+    rng = random.Random(10_000 + client_id)
+    lags = []
+    time.sleep(max(0.0, start_at - time.time()))
+    scheduled = 0.0
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled >= duration:
+            break
+        now = time.time() - start_at
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        else:
+            lags.append(now - scheduled)
+        student.session(start_at, f"ID_{rng.randrange(n_students)}", codes)
+    student.close()
+    return student.events, lags
+
+
+def _client_entry(args):
+    return run_client(*args)
+
+
+def seed_database(db_path, n_students, n_courses, capacity):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    db = UniversityDB(db_path)
+    codes = [f"C{i}" for i in range(n_courses)]
+    CourseRepository(db).add_courses_bulk((code, f"Course Name {i}", capacity) for i, code in enumerate(codes))
+    UserRepository(db).register_users_bulk((f"Student {i}", "student", f"ID_{i}") for i in range(n_students))
+    db.close()
+    return codes
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def histogram(latencies_ms):
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for ms in latencies_ms:
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if ms <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def summarize(events, lags, duration, interval):
+    report = {"operations": {}, "timeline": [], "sessions_late": len(lags),
+              "max_start_lag_ms": max(lags, default=0.0) * 1000}
+    total = len(events)
+    report["throughput_ops"] = total / duration
+    report["lock_errors"] = sum(1 for e in events if e[3] == LOCKED)
+    report["retries"] = sum(e[4] for e in events)
+
+    for op in OPERATIONS:
+        ms = sorted(e[2] / 1e6 for e in events if e[1] == op)
+        statuses = [e[3] for e in events if e[1] == op]
+        report["operations"][op] = {
+            "count": len(ms),
+            "p50_ms": percentile(ms, 0.50),
+            "p95_ms": percentile(ms, 0.95),
+            "p99_ms": percentile(ms, 0.99),
+            "max_ms": ms[-1] if ms else 0.0,
+            "refused": statuses.count(REFUSED),
+            "locked": statuses.count(LOCKED),
+            "errors": statuses.count(ERROR),
+            "histogram": histogram(ms),
+        }
+
+    windows = max(1, int(duration / interval + 0.999))
+    for w in range(windows):
+        lo, hi = w * interval, (w + 1) * interval
+        window = [e for e in events if lo <= e[0] < hi]
+        ms = sorted(e[2] / 1e6 for e in window)
+        report["timeline"].append({
+            "t": hi,
+            "ops_per_s": len(window) / interval,
+            "p50_ms": percentile(ms, 0.50),
+            "p99_ms": percentile(ms, 0.99),
+            "locked": sum(1 for e in window if e[3] == LOCKED),
+            "retries": sum(e[4] for e in window),
+        })
+    return report
+
+
+def run_load_generator(clients=16, rate=20.0, duration=10.0, mode="thread", students=10000, courses=10,
+                       capacity=None, busy_timeout=5.0, retries=3, interval=1.0):
+    print(f"--- Registration-Day Load Generator ---")
+    print(f"Clients: {clients} ({mode}s), Arrival rate: {rate:g} sessions/s, Duration: {duration:g}s")
+    print(f"Students: {students}, Courses: {courses} x {capacity or 'unlimited'} seats, "
+          f"busy_timeout: {busy_timeout:g}s, Retries: {retries}\n")
+
+    db_path = "load_test.db"
+    codes = seed_database(db_path, students, courses, capacity)
+    start_at = time.time() + 0.5
+    jobs = [(c, db_path, start_at, duration, rate / clients, students, codes, busy_timeout, retries)
+            for c in range(clients)]
+
+    if mode == "process":
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client_entry, jobs)
+    else:
+        results = [None] * clients
+
+        def target(i):
+            results[i] = run_client(*jobs[i])
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    events = [e for client_events, _ in results for e in client_events]
+    lags = [lag for _, client_lags in results for lag in client_lags]
+    elapsed = max((e[0] for e in events), default=duration)
+    report = summarize(events, lags, max(duration, elapsed), interval)
+    report["config"] = {"clients": clients, "mode": mode, "rate": rate, "duration": duration,
+                        "students": students, "courses": courses, "capacity": capacity,
+                        "busy_timeout": busy_timeout, "retries": retries}
+
+    print(f"{'t(s)':>6} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'locked':>7} {'retries':>8}")
+    for row in report["timeline"]:
+        print(f"{row['t']:>6.1f} {row['ops_per_s']:>8.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+              f"{row['locked']:>7} {row['retries']:>8}")
+    print(f"\n{'operation':<14} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'refused':>8} {'locked':>7}")
+    for op, stats in report["operations"].items():
+        print(f"{op:<14} {stats['count']:>7} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f} {stats['refused']:>8} {stats['locked']:>7}")
+
+    print(f"\n[+] Throughput: {report['throughput_ops']:,.0f} ops/s")
+    print(f"[+] Lock errors after retries: {report['lock_errors']}, retries: {report['retries']}")
+    if report["sessions_late"]:
+        print(f"[!] {report['sessions_late']} sessions started late (max {report['max_start_lag_ms']:.0f}ms): "
+              f"clients cannot keep up with the arrival rate")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent students against one database.")
+    parser.add_argument("--clients", type=int, default=16, help="simulated students (one connection each)")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--rate", type=float, default=20.0, help="total session arrivals per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of arrivals")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=None, help="seats per course (default unlimited)")
+    parser.add_argument("--busy-timeout", type=float, default=5.0, help="seconds to wait on a locked database")
+    parser.add_argument("--retries", type=int, default=3, help="retries for an operation that hit a lock")
+    parser.add_argument("--interval", type=float, default=1.0, help="timeline window in seconds")
+    parser.add_argument("--output", help="write the full report (histograms, timeline) as JSON")
+    args = parser.parse_args()
+
+    report = run_load_generator(args.clients, args.rate, args.duration, args.mode, args.students, args.courses,
+                                args.capacity, args.busy_timeout, args.retries, args.interval)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Report written to {args.output}")
+    sys.exit(1 if report["lock_errors"] else 0)
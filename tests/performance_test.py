@@ -1,74 +1,214 @@
-import time
+import argparse
+import gc
+import json
 import os
+import platform
+import random
+import sqlite3
+import statistics
 import sys
-import uuid as uuid_pkg
+import time
 from src.infrastructure.database import UniversityDB
-from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository, ENROLLED
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_COURSES = 10
+DEFAULT_WARMUP = 20
+DEFAULT_REPEATS = 200
+DEFAULT_THRESHOLD = 0.20
+# Differences below this are timer/scheduler noise, whatever the ratio says.
+DEFAULT_MIN_DELTA_US = 5.0
+COURSES_PER_STUDENT = 5
+
+
+def summarize(samples_ns):
+    """min/mean/stdev and p50/p95/p99 of one benchmark, in microseconds."""
+    us = sorted(s / 1000 for s in samples_ns)
+    cuts = statistics.quantiles(us, n=100, method="inclusive")
+    return {
+        "n": len(us),
+        "min_us": us[0],
+        "mean_us": statistics.fmean(us),
+        "stdev_us": statistics.stdev(us) if len(us) > 1 else 0.0,
+        "p50_us": cuts[49],
+        "p95_us": cuts[94],
+        "p99_us": cuts[98],
+        "max_us": us[-1],
+    }
+
+
+def measure(op, warmup, repeats):
+    """Call op(i) `warmup` times untimed, then `repeats` times under perf_counter_ns."""
+    for i in range(warmup):
+        op(i)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(warmup, warmup + repeats):
+            start = time.perf_counter_ns()
+            op(i)
+            samples.append(time.perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(samples)
 
-def run_performance_test(n_users=100, n_courses=10):
-    print(f"--- Optimized Performance Benchmark ---")
-    print(f"Users: {n_users}, Courses: {n_courses}\n")
-    
+
+def seed(db_path, n_users, n_courses, n_fresh):
+    """Build a dataset of `n_users` enrolled students plus `n_fresh` unenrolled ones."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    db = UniversityDB(db_path)
+    CourseRepository(db).add_courses_bulk((f"C{i}", f"Course Name {i}") for i in range(n_courses))
+    user_uuids = UserRepository(db).register_users_bulk(
+        (f"Student {i}", "student", f"ID_{i}") for i in range(n_users)
+    )
+    fresh_uuids = UserRepository(db).register_users_bulk(
+        (f"Fresh {i}", "student", f"FRESH_{i}") for i in range(n_fresh)
+    )
+    EnrollmentRepository(db).enroll_many(
+        (u_uuid, f"C{j}") for u_uuid in user_uuids for j in range(COURSES_PER_STUDENT)
+    )
+    return db, user_uuids, fresh_uuids
+
+
+def run_size(n_users, n_courses, warmup, repeats):
+    """Time each repository operation against one freshly seeded database."""
+    if n_courses <= COURSES_PER_STUDENT:
+        raise ValueError(f"Need more than {COURSES_PER_STUDENT} courses to benchmark swaps.")
     test_db_path = "performance_test.db"
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-    
-    db = UniversityDB(test_db_path)
-    
-    # 1. Benchmark Course Addition
-    start_time = time.time()
-    course_data = [(f"C{i}", f"Course Name {i}") for i in range(n_courses)]
-    db.cursor.executemany("INSERT INTO courses VALUES (?, ?)", course_data)
-    db.conn.commit()
-    course_time = time.time() - start_time
-    print(f"[+] Added {n_courses} courses in: {course_time:.4f}s")
-    
-    # 2. Benchmark User Registration
-    start_time = time.time()
-    user_data = [(str(uuid_pkg.uuid4()), f"ID_{i}", f"Student {i}", "student") for i in range(n_users)]
-    db.cursor.execute("BEGIN TRANSACTION")
-    db.cursor.executemany("INSERT INTO users VALUES (?, ?, ?, ?)", user_data)
-    db.conn.commit()
-    user_time = time.time() - start_time
-    print(f"[+] Registered {n_users} users in: {user_time:.4f}s")
-    
-    # 3. Benchmark Enrollment
-    start_time = time.time()
-    enrollment_data = []
-    for row in user_data:
-        u_uuid = row[0]
-        for j in range(5):
-            enrollment_data.append((u_uuid, f"C{j}"))
-    
-    db.cursor.execute("BEGIN TRANSACTION")
-    db.cursor.executemany("INSERT INTO enrollments VALUES (?, ?)", enrollment_data)
-    db.conn.commit()
-    enroll_time = time.time() - start_time
-    print(f"[+] Performed {n_users * 5} enrollments in: {enroll_time:.4f}s")
-    
-    # 4. Benchmark Global Roster Fetching
-    start_time = time.time()
-    db.cursor.execute("""SELECT u.name, u.custom_id, group_concat(c.code, ', ') 
-                       FROM users u 
-                       JOIN enrollments e ON u.u_uuid = e.user_uuid 
-                       JOIN courses c ON e.course_code = c.code 
-                       WHERE u.role='student' 
-                       GROUP BY u.u_uuid""")
-    roster = db.cursor.fetchall()
-    roster_time = time.time() - start_time
-    print(f"[+] Fetched global roster ({len(roster)} entries) in: {roster_time:.4f}s")
-    
-    print(f"\nTotal operations time: {course_time + user_time + enroll_time + roster_time:.4f}s")
-    
+    start = time.perf_counter()
+    db, user_uuids, fresh_uuids = seed(test_db_path, n_users, n_courses, warmup + repeats)
+    print(f"  seeded {n_users} students x {COURSES_PER_STUDENT} enrollments in {time.perf_counter() - start:.2f}s")
+
+    # The plain repositories, so every call reaches SQLite instead of a cache.
+    user_repo = UserRepository(db)
+    course_repo = CourseRepository(db)
+    enrollment_repo = EnrollmentRepository(db)
+    rng = random.Random(42)
+    login_ids = [f"ID_{rng.randrange(n_users)}" for _ in range(warmup + repeats)]
+
+    def login(i):
+        assert user_repo.get_user_by_custom_id(login_ids[i]) is not None
+
+    def enroll(i):
+        assert enrollment_repo.reserve_seat(fresh_uuids[i], "C0") == ENROLLED
+
+    # Each student's last course toggles between its seeded code and an unused one.
+    held = {}
+    swap_out, swap_in = f"C{COURSES_PER_STUDENT - 1}", f"C{COURSES_PER_STUDENT}"
+
+    def swap(i):
+        u_uuid = user_uuids[i % n_users]
+        old = held.get(u_uuid, swap_out)
+        new = swap_in if old == swap_out else swap_out
+        assert enrollment_repo.swap_enrollment(u_uuid, old, new)
+        held[u_uuid] = new
+
+    def roster_page(i):
+        enrollment_repo.get_global_roster_page(after_id=login_ids[i])
+
+    def course_listing(i):
+        course_repo.get_all_courses()
+        course_repo.get_course_enrollment_counts()
+
+    benchmarks = {
+        "login_lookup": (login, repeats),
+        "enroll": (enroll, repeats),
+        "swap": (swap, repeats),
+        "roster_page": (roster_page, repeats),
+        "course_listing": (course_listing, repeats),
+    }
+    results = {}
+    for name, (op, n) in benchmarks.items():
+        results[name] = measure(op, warmup, n)
+        r = results[name]
+        print(f"  {name:<15} p50 {r['p50_us']:>10.1f}us  p95 {r['p95_us']:>10.1f}us  p99 {r['p99_us']:>10.1f}us")
+
+    # The full roster is far slower than the rest, so it gets a handful of runs.
+    full_repeats = max(3, repeats // 50)
+    results["roster_full"] = measure(lambda i: enrollment_repo.get_global_roster(), 1, full_repeats)
+    r = results["roster_full"]
+    print(f"  {'roster_full':<15} p50 {r['p50_us']:>10.1f}us  p95 {r['p95_us']:>10.1f}us  ({full_repeats} runs)")
+
     db.close()
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+    return results
+
+
+def compare(current, baseline, threshold, min_delta_us, metric="p50_us"):
+    """Print a current-vs-baseline table and return the benchmarks that regressed."""
+    regressions = []
+    print(f"\n--- Comparison against baseline ({metric}, threshold +{threshold:.0%}) ---")
+    for size, benches in current["results"].items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                print(f"  {size:>8} {name:<15} (no baseline)")
+                continue
+            now, then = stats[metric], base[metric]
+            ratio = now / then if then else float("inf")
+            regressed = ratio > 1 + threshold and now - then > min_delta_us
+            flag = "REGRESSION" if regressed else "ok"
+            print(f"  {size:>8} {name:<15} {then:>10.1f}us -> {now:>10.1f}us  ({ratio:5.2f}x) {flag}")
+            if regressed:
+                regressions.append((size, name, then, now))
+    return regressions
+
+
+def run_performance_test(sizes=DEFAULT_SIZES, n_courses=DEFAULT_COURSES, warmup=DEFAULT_WARMUP,
+                         repeats=DEFAULT_REPEATS):
+    print(f"--- Repository Benchmark Suite ---")
+    print(f"Sizes: {', '.join(map(str, sizes))}, Courses: {n_courses}, Warmup: {warmup}, Repeats: {repeats}\n")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "courses": n_courses,
+            "warmup": warmup,
+            "repeats": repeats,
+        },
+        "results": {},
+    }
+    for n_users in sizes:
+        print(f"[+] {n_users} students")
+        report["results"][str(n_users)] = run_size(n_users, n_courses, warmup, repeats)
+    return report
+
 
 if __name__ == "__main__":
-    users = 100000
-    courses = 10
-    if len(sys.argv) > 1:
-        users = int(sys.argv[1])
-    if len(sys.argv) > 2:
-        courses = int(sys.argv[2])
-    run_performance_test(users, courses)
+    parser = argparse.ArgumentParser(description="Benchmark the repository layer across dataset sizes.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated student counts")
+    parser.add_argument("--courses", type=int, default=DEFAULT_COURSES)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results to compare against; exits 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed p50 slowdown as a fraction (default 0.20)")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help="ignore slowdowns smaller than this many microseconds")
+    args = parser.parse_args()
+
+    report = run_performance_test(
+        tuple(int(s) for s in args.sizes.split(",")), args.courses, args.warmup, args.repeats
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[+] Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_us)
+        if regressions:
+            print(f"\n[!] {len(regressions)} benchmark(s) regressed past +{args.threshold:.0%}.")
+            sys.exit(1)
+        print("\n[+] No regressions.")
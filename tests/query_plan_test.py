@@ -0,0 +1,228 @@
+import inspect
+import os
+import re
+import sys
+import tempfile
+from src.infrastructure.bitmask_enrollments import BitmaskEnrollmentRepository
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.instrumentation import normalize_sql
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+
+# Findings a query may have on purpose, keyed by repository method, each with the reason.
+# Anything else the planner reports fails the audit.
+ACCEPTED = {
+    "UserRepository.get_all_users": {"full scan users": "returns every user"},
+    "CourseRepository.get_all_courses": {"full scan courses": "returns every course (at most 10)"},
+    "CourseRepository.get_course_enrollment_counts": {"full scan courses": "returns every course (at most 10)"},
+    "UserRepository.search": {"temp b-tree users": "sorts at most SEARCH_LIMIT matches by name"},
+    "CourseRepository.search": {"temp b-tree courses": "sorts at most SEARCH_LIMIT matches by code"},
+    "EnrollmentRepository.search_roster": {"temp b-tree users": "sorts at most one page of matches"},
+    "EnrollmentRepository.get_global_roster": {"full scan roster": "the roster lists every student"},
+    "EnrollmentRepository.iter_global_roster": {"full scan roster": "the roster lists every student"},
+    "BitmaskEnrollmentRepository.get_global_roster": {"full scan roster": "the roster lists every student"},
+    "BitmaskEnrollmentRepository.iter_global_roster": {"full scan roster": "the roster lists every student"},
+    "BitmaskEnrollmentRepository.get_student_courses_detailed": {
+        "full scan course_slots": "tests each of at most 63 slots against one mask",
+    },
+    "BitmaskEnrollmentRepository.search_roster": {"temp b-tree users": "sorts at most one page of matches"},
+}
+
+# Methods that run no SQL of their own.
+NO_SQL = {"rollback", "commit"}
+
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b|ORDER\b|LIMIT\b|USING\b|VALUES\b|SET\b|\()(\w+))?", re.IGNORECASE)
+_INDEX_SEARCH = re.compile(r"USING INDEX (\w+) \((.*)\)")
+_STATEMENT = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+def seed(db_path, n_students=20000, n_courses=10):
+    db = UniversityDB(db_path)
+    users, courses, enrollments = UserRepository(db), CourseRepository(db), EnrollmentRepository(db)
+    courses.add_courses_bulk((f"C{i}", f"Course Name {i}", 500 if i % 2 else None) for i in range(n_courses))
+    uuids = users.register_users_bulk(
+        (f"Student {i}", "admin" if i % 1000 == 0 else "student", f"ID_{i}") for i in range(n_students)
+    )
+    enrollments.enroll_many((u, f"C{(i + j) % n_courses}") for i, u in enumerate(uuids) for j in range(4))
+    return db, users, courses, enrollments, uuids
+
+
+def enrollment_calls(enrollments, student, fresh):
+    return [
+        (enrollments, "enroll_student", (fresh, "C1")),
+        # Enrolling twice exercises the refusal diagnosis as well.
+        (enrollments, "reserve_seat", (fresh, "C2")),
+        (enrollments, "reserve_seat", (fresh, "C2")),
+        (enrollments, "enroll_many", ([(fresh, "C3")],)),
+        (enrollments, "get_student_enrollments", (student,)),
+        (enrollments, "get_student_courses_detailed", (student,)),
+        (enrollments, "get_enrollment_count", (student,)),
+        (enrollments, "remove_enrollment", (fresh, "C3")),
+        (enrollments, "swap_enrollment", (fresh, "C2", "C4")),
+        # The writes above leave a small delta in the change log.
+        (enrollments, "refresh_roster", ()),
+        (enrollments, "get_global_roster", ()),
+        (enrollments, "get_global_roster_page", ("ID_500",)),
+        (enrollments, "search_roster", ("stud 12",)),
+        (enrollments, "iter_global_roster", ()),
+    ]
+
+
+def repository_calls(users, courses, enrollments, uuids):
+    """One representative call per repository method, in an order that keeps each write valid."""
+    student = uuids[1]
+    fresh = users.register_user("Fresh Student", "student", "FRESH_1")
+    # The bitmask layout's SQL is audited on the same data; its plans do not depend on the stored mode.
+    bitmask = BitmaskEnrollmentRepository(enrollments.db)
+    bitmask_fresh = users.register_user("Fresh Bitmask", "student", "FRESH_2")
+    # The seeded log covers every student and takes the full-rebuild path; the audit covers the delta path.
+    enrollments.refresh_roster()
+    return [
+        (users, "get_user_by_custom_id", ("ID_5",)),
+        (users, "get_user_by_uuid", (student,)),
+        (users, "register_user", ("Audit Student", "student", "AUDIT_1")),
+        (users, "register_users_bulk", ([("Audit Bulk", "student", "AUDIT_2")],)),
+        (users, "search", ("stud 12",)),
+        (users, "get_all_users", ()),
+        (courses, "add_course", ("AUD1", "Audit Course", 20)),
+        (courses, "set_capacity", ("AUD1", 30)),
+        (courses, "add_courses_bulk", ([("AUD2", "Audit Course 2")],)),
+        (courses, "get_all_courses", ()),
+        (courses, "get_course_by_code", ("C3",)),
+        (courses, "search", ("cour",)),
+        (courses, "get_course_count", ()),
+        (courses, "get_course_enrollment_counts", ()),
+        *enrollment_calls(enrollments, student, fresh),
+        *enrollment_calls(bitmask, student, bitmask_fresh),
+    ]
+
+
+def capture_statements(db, calls):
+    """Run each call with a trace callback and collect the distinct SQL it sent, per method."""
+    captured = {}
+    current = []
+    db.conn.set_trace_callback(current.append)
+    try:
+        for repo, method, args in calls:
+            current.clear()
+            result = getattr(repo, method)(*args)
+            if inspect.isgenerator(result):
+                for _ in result:
+                    pass
+            name = f"{type(repo).__name__}.{method}"
+            statements = captured.setdefault(name, {})
+            for sql in current:
+                if _STATEMENT.match(sql):
+                    statements.setdefault(normalize_sql(sql), sql)
+    finally:
+        db.conn.set_trace_callback(None)
+    return captured
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def is_point_lookup(conn, detail):
+    """True for `USING INDEX ix (a=? AND b=?)` on every column of a unique index.
+
+    Such a search returns at most one row, so fetching the rest of it from the
+    table costs one extra seek and a covering index would not pay for itself.
+    """
+    match = _INDEX_SEARCH.search(detail)
+    if match is None:
+        return False
+    index, constraint = match.groups()
+    terms = [term.strip() for term in constraint.split(" AND ")]
+    if not all(term.endswith("=?") for term in terms):
+        return False
+    unique = any(row[1] == index and row[2] for row in conn.execute(
+        "SELECT * FROM pragma_index_list((SELECT tbl_name FROM sqlite_master WHERE name = ?))", (index,)
+    ))
+    columns = {row[2] for row in conn.execute("SELECT * FROM pragma_index_info(?)", (index,))}
+    return unique and columns == {term[:-2] for term in terms}
+
+
+def audit_plan(conn, sql):
+    """Findings for one statement: full scans, temp B-trees and non-covering index searches."""
+    aliases = table_aliases(sql)
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    findings = set()
+    for detail in plan:
+        words = detail.split()
+        if words[0] in ("SCAN", "SEARCH") and len(words) > 1:
+            table = aliases.get(words[1].lower())
+            if table is None or table.endswith("_fts"):
+                continue  # subquery, CTE or FTS virtual table
+            if words[0] == "SCAN" and "COVERING INDEX" not in detail:
+                findings.add(f"full scan {table}")
+            elif "USING INDEX" in detail and "COVERING" not in detail and not is_point_lookup(conn, detail):
+                findings.add(f"non-covering {table}")
+        elif "TEMP B-TREE" in detail:
+            findings.add(f"temp b-tree {temp_btree_table(plan, aliases)}")
+    return plan, findings
+
+
+def temp_btree_table(plan, aliases):
+    # The temp B-tree belongs to the outermost table of the query it sorts.
+    for other in plan:
+        words = other.split()
+        if words[0] in ("SCAN", "SEARCH") and len(words) > 1 and words[1].lower() in aliases:
+            table = aliases[words[1].lower()]
+            if not table.endswith("_fts"):
+                return table
+    return "query"
+
+
+def test_query_plans(verbose=False):
+    db_path = os.path.join(tempfile.mkdtemp(), "query_plan_test.db")
+    db, users, courses, enrollments, uuids = seed(db_path)
+    calls = repository_calls(users, courses, enrollments, uuids)
+    captured = capture_statements(db, calls)
+
+    problems = []
+    exercised = {method for _, method, _ in calls}
+    for repo_class in (UserRepository, CourseRepository, EnrollmentRepository, BitmaskEnrollmentRepository):
+        for method, _ in inspect.getmembers(repo_class, inspect.isfunction):
+            if method.startswith("_") or method in NO_SQL:
+                continue
+            if method not in exercised:
+                problems.append(f"{repo_class.__name__}.{method}: not audited (add it to repository_calls)")
+
+    for name, statements in sorted(captured.items()):
+        if not statements:
+            problems.append(f"{name}: ran no SQL")
+        accepted = ACCEPTED.get(name, {})
+        seen = set()
+        for sql in statements.values():
+            plan, findings = audit_plan(db.conn, sql)
+            seen |= findings
+            unexpected = sorted(findings - accepted.keys())
+            if verbose or unexpected:
+                print(f"\n{name}: {' '.join(sql.split())[:160]}")
+                for detail in plan:
+                    print(f"    {detail}")
+            for finding in unexpected:
+                problems.append(f"{name}: {finding}")
+        for finding in accepted.keys() - seen:
+            print(f"[i] {name}: accepted '{finding}' no longer occurs; the entry can go")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    assert not problems, "Query plan regressions:\n  " + "\n  ".join(problems)
+
+
+if __name__ == "__main__":
+    print("--- Query Plan Audit ---")
+    try:
+        test_query_plans(verbose="-v" in sys.argv)
+    except AssertionError as e:
+        print(f"\n[!] {e}")
+        sys.exit(1)
+    print("\n[+] Every repository query uses its indexes (or is on the accepted list).")
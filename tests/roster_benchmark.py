@@ -0,0 +1,153 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from performance_test import COURSES_PER_STUDENT, DEFAULT_REPEATS, DEFAULT_WARMUP, measure, seed
+from src.infrastructure.bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, set_enrollment_storage
+from src.infrastructure.repositories import EnrollmentRepository
+
+DEFAULT_DELTAS = (0, 10, 100, 1000, 10000)
+LOG_TRIGGERS = ("trg_enrollments_log_insert", "trg_enrollments_log_delete")
+
+
+def derived_roster(db, repo):
+    """The roster computed from scratch, as every open did before it was materialized."""
+    rows = db.execute_query(repo.ROSTER_SOURCE.format(where=""))
+    return [(name, custom_id, courses) for custom_id, _, name, courses in rows]
+
+
+def normalized(rows):
+    return sorted((name, custom_id, ", ".join(sorted(courses.split(", ")))) for name, custom_id, courses in rows)
+
+
+def change_students(repo, students, count, rng, held):
+    """Swap one course for `count` random students, alternating C0 and the first spare course."""
+    spare = f"C{COURSES_PER_STUDENT}"
+    for _ in range(count):
+        u_uuid = students[rng.randrange(len(students))]
+        old = held.get(u_uuid, "C0")
+        new = spare if old == "C0" else "C0"
+        assert repo.swap_enrollment(u_uuid, old, new)
+        held[u_uuid] = new
+
+
+def timed(op, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        op()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_roster_benchmark(n_users=100000, n_courses=10, deltas=DEFAULT_DELTAS,
+                         warmup=DEFAULT_WARMUP, repeats=DEFAULT_REPEATS):
+    print(f"--- Incremental Roster Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}, Enrollments each: {COURSES_PER_STUDENT}\n")
+    test_db_path = "roster_test.db"
+    db, user_uuids, fresh_uuids = seed(test_db_path, n_users, n_courses, warmup + repeats)
+    repo = EnrollmentRepository(db)
+    rng = random.Random(3)
+    held = {}
+    problems = []
+
+    start_time = time.perf_counter()
+    applied = repo.refresh_roster()
+    print(f"[+] Initial build from {applied:,} log entries: {time.perf_counter() - start_time:.3f}s")
+    recompute = timed(lambda: derived_roster(db, repo))
+    print(f"[+] Recomputing the roster from scratch: {recompute * 1000:.1f}ms\n")
+
+    print(f"{'changed':>8}{'refresh':>12}{'open (page)':>14}{'full read':>12}{'vs recompute':>15}")
+    for delta in deltas:
+        change_students(repo, user_uuids, delta, rng, held)
+        # Checkpoint first so the WAL pages written by the changes are not charged to the refresh.
+        db.execute_query("PRAGMA wal_checkpoint(TRUNCATE)")
+        start_time = time.perf_counter()
+        repo.refresh_roster()
+        refresh = time.perf_counter() - start_time
+        change_students(repo, user_uuids, delta, rng, held)
+        db.execute_query("PRAGMA wal_checkpoint(TRUNCATE)")
+        start_time = time.perf_counter()
+        repo.get_global_roster_page()
+        opened = time.perf_counter() - start_time
+        full = timed(repo.get_global_roster)
+        print(f"{delta:>8,}{refresh * 1000:>10.2f}ms{opened * 1000:>12.2f}ms{full * 1000:>10.1f}ms"
+              f"{recompute / opened:>14.1f}x")
+
+    if normalized(repo.get_global_roster()) != normalized(derived_roster(db, repo)):
+        problems.append("the materialized roster differs from the derived one (rows)")
+
+    # While another connection holds the write lock, opening serves the last refresh instead of failing.
+    before = repo.get_global_roster_page()
+    change_students(repo, user_uuids, 10, rng, held)
+    other = sqlite3.connect(test_db_path)
+    other.execute("BEGIN IMMEDIATE")
+    start_time = time.perf_counter()
+    try:
+        if repo.get_global_roster_page() != before:
+            problems.append("a roster open under another writer's lock did not serve the last refresh")
+    except sqlite3.OperationalError as e:
+        problems.append(f"a roster open under another writer's lock failed: {e}")
+    blocked = time.perf_counter() - start_time
+    other.rollback()
+    other.close()
+    print(f"\n[+] Open while another connection holds the write lock: {blocked * 1000:.2f}ms")
+
+    # A read-only database cannot be refreshed either; opening it serves the last refresh as well.
+    before = repo.get_global_roster_page()
+    change_students(repo, user_uuids, 10, rng, held)
+    db.conn.execute("PRAGMA query_only = ON")
+    try:
+        if repo.get_global_roster_page() != before:
+            problems.append("a roster open on a read-only database did not serve the last refresh")
+    except sqlite3.OperationalError as e:
+        problems.append(f"a roster open on a read-only database failed: {e}")
+    finally:
+        db.conn.execute("PRAGMA query_only = OFF")
+
+    # The same after switching layouts and changing more students through the bitmask repository.
+    set_enrollment_storage(db, BITMASK)
+    bitmask = BitmaskEnrollmentRepository(db)
+    change_students(bitmask, user_uuids, 1000, rng, held)
+    db.execute_update("UPDATE users SET name = 'Renamed' WHERE custom_id = 'ID_1'")
+    if normalized(bitmask.get_global_roster()) != normalized(derived_roster(db, bitmask)):
+        problems.append("the materialized roster differs from the derived one (bitmask)")
+    set_enrollment_storage(db, "rows")
+
+    # What the log costs every enrollment write: the same drop and re-enroll with and without its triggers.
+    def drop_and_enroll(i):
+        u_uuid = fresh_uuids[i]
+        repo.enroll_student(u_uuid, "C0")
+        repo.remove_enrollment(u_uuid, "C0")
+
+    logged = measure(drop_and_enroll, warmup, repeats)
+    for trigger in LOG_TRIGGERS:
+        db.execute_update(f"DROP TRIGGER {trigger}")
+    unlogged = measure(drop_and_enroll, warmup, repeats)
+    print(f"\n[+] Enroll + drop p50: {unlogged['p50_us']:.1f}us without the change log, "
+          f"{logged['p50_us']:.1f}us with it")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    for problem in problems:
+        print(f"[!] {problem}")
+    if not problems:
+        print("[+] The materialized roster matches the derived one in both layouts.")
+    return not problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time opening the roster as the number of changed students grows.")
+    parser.add_argument("users", type=int, nargs="?", default=100000)
+    parser.add_argument("courses", type=int, nargs="?", default=10)
+    parser.add_argument("--deltas", default=",".join(map(str, DEFAULT_DELTAS)),
+                        help="comma-separated numbers of students changed between opens")
+    args = parser.parse_args()
+    deltas = tuple(int(d) for d in args.deltas.split(","))
+    sys.exit(0 if run_roster_benchmark(args.users, args.courses, deltas) else 1)
@@ -0,0 +1,79 @@
+import time
+import os
+import sys
+import sqlite3
+import uuid
+from src.infrastructure.migrations import SCHEMA_VERSION, migrate, schema_version
+
+QUERIES = {
+    "login lookup": ("SELECT * FROM users WHERE custom_id = ?", lambda n: (f"ID_{n // 2}",)),
+    "student enrollments": ("SELECT course_code FROM enrollments WHERE user_uuid = ?", None),
+    "per-course students": ("SELECT user_uuid FROM enrollments WHERE course_code = ?", lambda n: ("C3",)),
+    "per-course count": ("SELECT COUNT(*) FROM enrollments WHERE course_code = ?", lambda n: ("C3",)),
+    "roster page": ("""SELECT u_uuid, name, custom_id FROM users
+                       WHERE role = 'student' AND custom_id > ?
+                       ORDER BY custom_id LIMIT 100""", lambda n: (f"ID_{n // 2}",)),
+    "global roster": ("""SELECT u.name, u.custom_id, GROUP_CONCAT(c.code, ', ')
+                         FROM users u
+                         JOIN enrollments e ON u.u_uuid = e.user_uuid
+                         JOIN courses c ON e.course_code = c.code
+                         WHERE u.role = 'student'
+                         GROUP BY u.u_uuid, u.name, u.custom_id""", lambda n: ()),
+}
+
+def time_queries(conn, n_users, sample_uuid, repeats):
+    timings = {}
+    for label, (sql, params) in QUERIES.items():
+        args = (sample_uuid,) if params is None else params(n_users)
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            conn.execute(sql, args).fetchall()
+        timings[label] = (time.perf_counter() - start_time) / repeats
+    return timings
+
+def run_schema_benchmark(n_users=100000, n_courses=10, repeats=50):
+    print(f"--- Schema Migration Benchmark ---")
+    print(f"Users: {n_users}, Courses: {n_courses}\n")
+
+    test_db_path = "schema_test.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+    conn = sqlite3.connect(test_db_path)
+    migrate(conn, target=1)
+    uuids = [uuid.uuid4().bytes for _ in range(n_users)]
+    conn.executemany("INSERT INTO courses VALUES (?, ?)", [(f"C{i}", f"Course Name {i}") for i in range(n_courses)])
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?)",
+        ((u, f"ID_{i}", f"Student {i}", "admin" if i % 50 == 0 else "student") for i, u in enumerate(uuids)),
+    )
+    conn.executemany(
+        "INSERT INTO enrollments VALUES (?, ?)",
+        ((u, f"C{(i + j) % n_courses}") for i, u in enumerate(uuids) for j in range(5)),
+    )
+    conn.commit()
+    sample_uuid = uuids[n_users // 2]
+
+    before = time_queries(conn, n_users, sample_uuid, repeats)
+    start_time = time.perf_counter()
+    migrate(conn)
+    migrate_time = time.perf_counter() - start_time
+    print(f"[+] Migrated v1 -> v{schema_version(conn)} in: {migrate_time:.4f}s")
+    after = time_queries(conn, n_users, sample_uuid, repeats)
+
+    print(f"\n{'query':<22}{'v1 (ms)':>12}{f'v{SCHEMA_VERSION} (ms)':>12}{'speedup':>10}")
+    for label in QUERIES:
+        print(f"{label:<22}{before[label] * 1000:>12.3f}{after[label] * 1000:>12.3f}{before[label] / after[label]:>9.1f}x")
+
+    conn.close()
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+if __name__ == "__main__":
+    users = 100000
+    courses = 10
+    if len(sys.argv) > 1:
+        users = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    run_schema_benchmark(users, courses)
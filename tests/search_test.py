@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.migrations import migrate, search_index_rebuild
+from src.infrastructure.repositories import UserRepository
+
+ADMIN_ID = "Sup3r$ecretPW!"
+
+
+def found(users, text):
+    return {custom_id for _, custom_id, _, _ in users.search(text)}
+
+
+def test_search_hides_admins():
+    test_db_path = os.path.join(tempfile.mkdtemp(), "search_test.db")
+
+    # A database created before admins were kept out of the index, holding one of each.
+    conn = sqlite3.connect(test_db_path)
+    migrate(conn, target=7)
+    conn.executemany(
+        "INSERT INTO users (u_uuid, custom_id, name, role) VALUES (?, ?, ?, ?)",
+        [(uuid.uuid4().bytes, ADMIN_ID, "Boss", "admin"), (uuid.uuid4().bytes, "STU_1", "Sup Student", "student")],
+    )
+    conn.commit()
+    conn.close()
+
+    db = UniversityDB(test_db_path)
+    users = UserRepository(db)
+    problems = []
+    if found(users, "Sup3r") or found(users, "Boss"):
+        problems.append("an upgraded database still finds the admin")
+    if found(users, "Sup") != {"STU_1"}:
+        problems.append("an upgraded database lost the student")
+
+    # New admins are never indexed, and a student promoted to admin leaves the index.
+    users.register_user("Chief", "admin", "Adm1n#Passw0rd")
+    users.register_user("Ann Student", "student", "STU_2")
+    db.execute_update("UPDATE users SET role = 'admin', custom_id = 'Pr0moted#Secret' WHERE custom_id = 'STU_2'")
+    for text in ("Adm1n", "Chief", "Pr0m", "Ann", "STU_2"):
+        if found(users, text):
+            problems.append(f"searching '{text}' found an admin")
+
+    # A rebuild (as after VACUUM) keeps them out too.
+    search_index_rebuild(db.conn)
+    if found(users, "Sup3r") or found(users, "Adm1n") or found(users, "Sup") != {"STU_1"}:
+        problems.append("the rebuilt index differs")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+    assert not problems, "User search problems:\n  " + "\n  ".join(problems)
+
+
+if __name__ == "__main__":
+    print("--- User Search Test ---")
+    try:
+        test_search_hides_admins()
+    except AssertionError as e:
+        print(f"\n[!] {e}")
+        sys.exit(1)
+    print("\n[+] Search finds students and never an admin, after upgrade, writes and rebuild.")
@@ -0,0 +1,93 @@
+import time
+import os
+import sys
+import random
+import threading
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository, ENROLLED
+
+def run_seat_allocation_stress_test(n_students=2000, n_courses=10, capacity=150, n_threads=16):
+    print(f"--- Seat Allocation Stress Test ---")
+    print(f"Students: {n_students}, Courses: {n_courses} x {capacity} seats, Threads: {n_threads}\n")
+
+    test_db_path = "seat_allocation_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    setup_db = UniversityDB(test_db_path)
+    CourseRepository(setup_db).add_courses_bulk((f"C{i}", f"Course Name {i}") for i in range(n_courses))
+    for i in range(n_courses):
+        CourseRepository(setup_db).set_capacity(f"C{i}", capacity)
+    user_uuids = UserRepository(setup_db).register_users_bulk(
+        (f"Student {i}", "student", f"ID_{i}") for i in range(n_students)
+    )
+
+    # Everyone asks for the same few popular courses first, then a random spread.
+    popular = [f"C{i}" for i in range(min(3, n_courses))]
+    requests = [
+        (u_uuid, code)
+        for u_uuid in user_uuids
+        for code in popular + random.sample([f"C{i}" for i in range(n_courses)], min(5, n_courses))
+    ]
+    random.shuffle(requests)
+    shards = [requests[t::n_threads] for t in range(n_threads)]
+    outcomes = {}
+    outcomes_lock = threading.Lock()
+
+    def worker(shard):
+        # One connection per thread, so seats are contended at the SQLite level.
+        db = UniversityDB(test_db_path)
+        enrollment_repo = EnrollmentRepository(db)
+        local = {}
+        for u_uuid, code in shard:
+            outcome = enrollment_repo.reserve_seat(u_uuid, code)
+            local[outcome] = local.get(outcome, 0) + 1
+        db.close()
+        with outcomes_lock:
+            for outcome, count in local.items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    start_time = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start_time
+
+    print(f"[+] {len(requests)} seat requests in {elapsed:.4f}s ({len(requests) / elapsed:,.0f} requests/s)")
+    print(f"[+] Outcomes: {dict(sorted(outcomes.items()))}")
+
+    oversubscribed = setup_db.execute_query("""
+        SELECT c.code, c.capacity, COUNT(e.user_uuid) AS taken, c.enrollment_count
+        FROM courses c LEFT JOIN enrollments e ON e.course_code = c.code
+        GROUP BY c.code
+        HAVING taken > c.capacity OR taken != c.enrollment_count
+    """)
+    total_taken = setup_db.execute_single("SELECT COUNT(*) FROM enrollments")[0]
+    setup_db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    if oversubscribed:
+        print(f"[!] Oversubscribed or miscounted courses: {oversubscribed}")
+        return False
+    if total_taken != outcomes.get(ENROLLED, 0):
+        print(f"[!] {outcomes.get(ENROLLED, 0)} seats granted but {total_taken} enrollments stored.")
+        return False
+    print("[+] No course exceeded its capacity and every counter matches.")
+    return True
+
+if __name__ == "__main__":
+    students = 2000
+    courses = 10
+    capacity = 150
+    if len(sys.argv) > 1:
+        students = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        capacity = int(sys.argv[3])
+    sys.exit(0 if run_seat_allocation_stress_test(students, courses, capacity) else 1)
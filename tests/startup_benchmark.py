@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from src.infrastructure.database import UniversityDB
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUNS = 10
+# Budgets we hold the line on; a run over either one exits 1.
+DEFAULT_MAX_IMPORT_MS = 60.0
+DEFAULT_MAX_PROMPT_MS = 150.0
+PROMPT = b"Action: "
+
+
+def child_env():
+    return dict(os.environ, PYTHONPATH=REPO_ROOT, TERM=os.environ.get("TERM", "dumb"))
+
+
+def time_process(code, cwd):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=child_env(),
+                            capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000, result.stdout.strip()
+
+
+def time_to_prompt(cwd, timeout=30.0):
+    """Launch the CLI, wait for the first menu prompt, then quit it; returns ms until the prompt."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "main.py")], cwd=cwd, env=child_env(),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    deadline = start + timeout
+    try:
+        while PROMPT not in output:
+            if time.perf_counter() > deadline or proc.poll() is not None:
+                raise RuntimeError(f"CLI never showed its prompt; output was {output[-200:]!r}")
+            ready, _, _ = select.select([proc.stdout], [], [], 0.05)
+            if ready:
+                output += os.read(proc.stdout.fileno(), 4096)
+        elapsed = (time.perf_counter() - start) * 1000
+        proc.communicate(b"3\n", timeout=timeout)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    return elapsed
+
+
+def median(samples):
+    return statistics.median(samples) if samples else 0.0
+
+
+def run_startup_benchmark(runs=DEFAULT_RUNS):
+    print(f"--- Startup Benchmark ---")
+    print(f"Runs: {runs}, Python: {sys.executable}\n")
+    workdir = tempfile.mkdtemp()
+
+    # Interpreter start-up alone, so the numbers below are what the app adds.
+    interpreter = median([time_process("pass", workdir)[0] for _ in range(runs)])
+
+    import_samples = []
+    heavy = ""
+    for _ in range(runs):
+        elapsed, heavy = time_process(
+            "import sys, main; print(','.join(m for m in ('textual', 'rich') if m in sys.modules))",
+            REPO_ROOT,
+        )
+        import_samples.append(elapsed - interpreter)
+
+    # First launch creates and migrates the database; later launches find it current.
+    first_prompt = time_to_prompt(workdir)
+    prompt_samples = [time_to_prompt(workdir) for _ in range(runs)]
+
+    db_path = os.path.join(workdir, "student_manager.db")
+    open_samples = []
+    for _ in range(runs * 10):
+        start = time.perf_counter()
+        UniversityDB(db_path).close()
+        open_samples.append((time.perf_counter() - start) * 1000)
+
+    report = {
+        "python": sys.version.split()[0],
+        "interpreter_ms": interpreter,
+        "import_main_ms": median(import_samples),
+        "tui_modules_loaded": [m for m in heavy.split(",") if m],
+        "first_prompt_new_db_ms": first_prompt,
+        "first_prompt_ms": median(prompt_samples),
+        "db_open_current_ms": median(open_samples),
+    }
+    print(f"[+] Interpreter start-up:           {interpreter:8.1f}ms")
+    print(f"[+] import main (beyond start-up):  {report['import_main_ms']:8.1f}ms")
+    print(f"[+] First prompt, new database:     {first_prompt:8.1f}ms")
+    print(f"[+] First prompt, current database: {report['first_prompt_ms']:8.1f}ms")
+    print(f"[+] UniversityDB open (current):    {report['db_open_current_ms']:8.2f}ms")
+    if report["tui_modules_loaded"]:
+        print(f"[!] CLI import pulled in: {', '.join(report['tui_modules_loaded'])}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure CLI cold import time and time to first prompt.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--max-import-ms", type=float, default=DEFAULT_MAX_IMPORT_MS)
+    parser.add_argument("--max-prompt-ms", type=float, default=DEFAULT_MAX_PROMPT_MS)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    report = run_startup_benchmark(args.runs)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    failures = []
+    if report["tui_modules_loaded"]:
+        failures.append("the CLI imports the TUI stack")
+    if report["import_main_ms"] > args.max_import_ms:
+        failures.append(f"import main took {report['import_main_ms']:.1f}ms (budget {args.max_import_ms:g}ms)")
+    if report["first_prompt_ms"] > args.max_prompt_ms:
+        failures.append(f"first prompt took {report['first_prompt_ms']:.1f}ms (budget {args.max_prompt_ms:g}ms)")
+    for failure in failures:
+        print(f"[!] {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import sys
+import time
+from src.infrastructure.database import Rollback, UniversityDB
+from src.infrastructure.repositories import UserRepository, CourseRepository, EnrollmentRepository
+
+# Courses each student starts in; every flow drops two of them and takes two others.
+START_COURSES = ("C0", "C1", "C2")
+
+
+def reschedule(enrollments, u_uuid, drop, take):
+    """A four-write schedule change; True only if every step succeeded."""
+    ok = all([enrollments.remove_enrollment(u_uuid, code) for code in drop])
+    return all([enrollments.enroll_student(u_uuid, code) for code in take]) and ok
+
+
+def timed_flows(db, flow, students):
+    """Run `flow` for every student, returning (seconds, commits) on the writer connection."""
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        start_time = time.perf_counter()
+        for u_uuid in students:
+            flow(u_uuid)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        db.conn.set_trace_callback(None)
+    return elapsed, sum(sql.lstrip().upper().startswith("COMMIT") for sql in statements)
+
+
+def run_transaction_benchmark(n_students=2000, n_courses=10, synchronous="FULL"):
+    print(f"--- Transaction / Savepoint Benchmark ---")
+    print(f"Students per approach: {n_students}, Courses: {n_courses}, synchronous={synchronous}\n")
+
+    test_db_path = "transaction_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    db = UniversityDB(test_db_path, pooled=True)
+    db.conn.execute(f"PRAGMA synchronous = {synchronous}")
+    CourseRepository(db).add_courses_bulk((f"C{i}", f"Course Name {i}") for i in range(n_courses))
+    users = UserRepository(db)
+    enrollments = EnrollmentRepository(db)
+    groups = {}
+    for approach in ("autocommit", "transaction"):
+        groups[approach] = users.register_users_bulk(
+            (f"Student {i}", "student", f"{approach}_{i}") for i in range(n_students)
+        )
+        enrollments.enroll_many((u_uuid, code) for u_uuid in groups[approach] for code in START_COURSES)
+
+    drop, take = ("C0", "C1"), ("C3", "C4")
+
+    def in_transaction(u_uuid):
+        with db.transaction():
+            if not reschedule(enrollments, u_uuid, drop, take):
+                raise Rollback
+
+    results = {
+        "autocommit": timed_flows(db, lambda u_uuid: reschedule(enrollments, u_uuid, drop, take), groups["autocommit"]),
+        "transaction": timed_flows(db, in_transaction, groups["transaction"]),
+    }
+    for approach, (elapsed, commits) in results.items():
+        print(f"[+] {approach:<12} {elapsed:.4f}s  {elapsed / n_students * 1e6:8.1f}us/flow  "
+              f"{commits / n_students:4.2f} commits per flow  (x{results['autocommit'][0] / elapsed:.1f})")
+
+    problems = []
+    expected = {"C2", "C3", "C4"}
+    for approach, students in groups.items():
+        for u_uuid in students:
+            stored = {code for code, in enrollments.get_student_enrollments(u_uuid)}
+            if stored != expected or enrollments.get_enrollment_count(u_uuid) != len(expected):
+                problems.append(f"{approach}: student has {sorted(stored)}")
+                break
+
+    probe = groups["transaction"][0]
+
+    # A failing step undoes the whole flow: the two drops and the first enroll are rolled back.
+    with db.transaction():
+        if reschedule(enrollments, probe, ("C2", "C3"), ("C5", "NO_SUCH_COURSE")):
+            problems.append("a flow with an unknown course succeeded")
+        raise Rollback
+    if {code for code, in enrollments.get_student_enrollments(probe)} != expected:
+        problems.append("a rolled-back flow left some of its writes behind")
+
+    # Reads inside the block see its writes, even in pooled mode; a savepoint undoes only its own.
+    with db.transaction():
+        enrollments.remove_enrollment(probe, "C2")
+        if enrollments.get_enrollment_count(probe) != 2:
+            problems.append("a read inside the transaction missed its own write")
+        with db.transaction():
+            enrollments.enroll_student(probe, "C6")
+            raise Rollback
+        enrollments.enroll_student(probe, "C7")
+    stored = {code for code, in enrollments.get_student_enrollments(probe)}
+    if stored != {"C3", "C4", "C7"}:
+        problems.append(f"nested savepoint left {sorted(stored)}")
+
+    # Any other exception rolls back and propagates.
+    try:
+        with db.transaction():
+            enrollments.remove_enrollment(probe, "C7")
+            raise KeyError("boom")
+    except KeyError:
+        pass
+    if db.in_transaction or "C7" not in {code for code, in enrollments.get_student_enrollments(probe)}:
+        problems.append("an exception did not roll the transaction back")
+
+    # A batch error that aborts the whole transaction propagates out of execute_many too.
+    db.execute_update("CREATE TEMP TABLE aborts (v INTEGER)")
+    db.execute_update("CREATE TEMP TRIGGER trg_aborts BEFORE INSERT ON aborts WHEN NEW.v < 0 "
+                      "BEGIN SELECT RAISE(ROLLBACK, 'aborted'); END")
+    try:
+        with db.transaction():
+            enrollments.remove_enrollment(probe, "C7")
+            db.execute_many("INSERT INTO aborts (v) VALUES (?)", [(1,), (-1,), (2,)])
+            problems.append("execute_many carried on after its error aborted the transaction")
+    except sqlite3.Error:
+        pass
+    if db.in_transaction or "C7" not in {code for code, in enrollments.get_student_enrollments(probe)}:
+        problems.append("an aborted execute_many did not roll the transaction back")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    for problem in problems:
+        print(f"[!] {problem}")
+    if not problems:
+        print("\n[+] Both approaches stored the same schedules; failed and nested blocks were rolled back.")
+    return not problems
+
+if __name__ == "__main__":
+    students = 2000
+    courses = 10
+    synchronous = "FULL"
+    if len(sys.argv) > 1:
+        students = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        synchronous = sys.argv[3].upper()
+    sys.exit(0 if run_transaction_benchmark(students, courses, synchronous) else 1)
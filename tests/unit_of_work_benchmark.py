@@ -0,0 +1,173 @@
+import os
+import random
+import sqlite3
+import sys
+import time
+from src.domain.interfaces import IUserRepository
+from src.domain.models import Role, Student, Subject
+from src.infrastructure.bitmask_enrollments import BITMASK, BitmaskEnrollmentRepository, set_enrollment_storage
+from src.infrastructure.database import UniversityDB
+from src.infrastructure.domain_repository import SqliteUserRepository, UnitOfWork
+from src.infrastructure.repositories import UserRepository, CourseRepository
+from src.use_cases.enrollment_manager import EnrollmentManager
+
+
+class FullSaveRepository(IUserRepository):
+    """The baseline: every lookup reloads the student and every save rewrites all of its enrollments."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def get_by_username(self, username):
+        rows = self.db.execute_query("""
+            SELECT u.u_uuid, e.course_code
+            FROM users u LEFT JOIN enrollments e ON e.user_uuid = u.u_uuid
+            WHERE u.custom_id = ?
+        """, (username,))
+        if not rows:
+            return None
+        return Student(username=username, role=Role.STUDENT,
+                       subjects=[Subject(code) for _, code in rows if code is not None])
+
+    def exists(self, username):
+        return self.get_by_username(username) is not None
+
+    def save(self, user):
+        u_uuid = self.db.execute_single("SELECT u_uuid FROM users WHERE custom_id = ?", (user.username,))[0]
+        with self.db.lock:
+            self.db.cursor.execute("BEGIN")
+            self.db.cursor.execute("DELETE FROM enrollments WHERE user_uuid = ?", (u_uuid,))
+            self.db.cursor.executemany(
+                "INSERT INTO enrollments (user_uuid, course_code) VALUES (?, ?)",
+                [(u_uuid, s.name) for s in user.subjects],
+            )
+            self.db.conn.commit()
+
+
+def count_statements(db, work):
+    """Time `work` and count the reads and transactions it sent to the writer connection.
+
+    SQLite reports a statement again for every trigger it fires, so writes are
+    counted by transaction rather than by traced line.
+    """
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        start_time = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        db.conn.set_trace_callback(None)
+    verbs = [sql.lstrip().split()[0].upper() for sql in statements]
+    return elapsed, verbs.count("SELECT"), verbs.count("BEGIN")
+
+
+def run_unit_of_work_benchmark(n_students=2000, n_courses=10, per_student=6):
+    print(f"--- Identity Map / Unit of Work Benchmark ---")
+    print(f"Students per approach: {n_students}, Courses: {n_courses}, Enrollments each: {per_student}\n")
+
+    test_db_path = "unit_of_work_test.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    db = UniversityDB(test_db_path)
+    rng = random.Random(5)
+    CourseRepository(db).add_courses_bulk((f"C{i}", f"Course Name {i}") for i in range(n_courses))
+    approaches = ("full_save", "identity_map", "unit_of_work")
+    plans = {}
+    for approach in approaches:
+        ids = [f"{approach}_{i}" for i in range(n_students)]
+        UserRepository(db).register_users_bulk((f"Student {i}", "student", custom_id) for i, custom_id in enumerate(ids))
+        plans[approach] = {custom_id: rng.sample([f"C{j}" for j in range(n_courses)], per_student) for custom_id in ids}
+
+    def enroll_all(manager, plan):
+        for custom_id, codes in plan.items():
+            for code in codes:
+                manager.enroll_in_subject(custom_id, code)
+
+    def with_unit_of_work():
+        # One unit of work per student: a load, then a single flush of all its new subjects.
+        for custom_id, codes in plans["unit_of_work"].items():
+            with UnitOfWork(db) as uow:
+                enroll_all(EnrollmentManager(uow.users), {custom_id: codes})
+
+    results = {
+        "full_save": count_statements(db, lambda: enroll_all(EnrollmentManager(FullSaveRepository(db)), plans["full_save"])),
+        "identity_map": count_statements(db, lambda: enroll_all(EnrollmentManager(SqliteUserRepository(db)), plans["identity_map"])),
+        "unit_of_work": count_statements(db, with_unit_of_work),
+    }
+    enrollments = n_students * per_student
+    for approach, (elapsed, reads, transactions) in results.items():
+        print(f"[+] {approach:<13} {elapsed:.4f}s  {elapsed / enrollments * 1e6:7.1f}us/enrollment  "
+              f"reads {reads / enrollments:4.2f}  transactions {transactions / enrollments:4.2f} per enrollment  "
+              f"(x{results['full_save'][0] / elapsed:.1f})")
+
+    # Every approach must leave exactly the planned enrollments and matching trigger counters.
+    problems = []
+    for approach in approaches:
+        for custom_id, codes in plans[approach].items():
+            stored = {code for code, in db.execute_query(
+                "SELECT e.course_code FROM enrollments e JOIN users u ON u.u_uuid = e.user_uuid WHERE u.custom_id = ?",
+                (custom_id,))}
+            counter = db.execute_single("SELECT enrollment_count FROM users WHERE custom_id = ?", (custom_id,))[0]
+            if stored != set(codes) or counter != len(codes):
+                problems.append(f"{approach}: {custom_id} has {sorted(stored)} (counter {counter})")
+
+    # Identity map: repeated lookups return the same object without another query.
+    repo = SqliteUserRepository(db)
+    first = repo.get_by_username("identity_map_0")
+    _, lookups, _ = count_statements(db, lambda: [repo.get_by_username("identity_map_0") for _ in range(10)])
+    if lookups or repo.get_by_username("identity_map_0") is not first:
+        problems.append("identity map did not serve repeated lookups")
+
+    # A failing flush writes nothing and forgets the entity it could not save.
+    try:
+        with UnitOfWork(db) as uow:
+            manager = EnrollmentManager(uow.users)
+            manager.register_student("uow_new")
+            manager.enroll_in_subject("uow_new", "C0")
+            manager.enroll_in_subject("uow_new", "NO_SUCH_COURSE")
+        problems.append("unit of work committed an enrollment in an unknown course")
+    except sqlite3.IntegrityError:
+        if db.execute_single("SELECT 1 FROM users WHERE custom_id = 'uow_new'") is not None:
+            problems.append("failed unit of work left its new student behind")
+        if uow.users.get_by_username("uow_new") is not None:
+            problems.append("failed unit of work still serves the unsaved student")
+
+    # On a bitmask database the same flows read and write course masks, not enrollment rows.
+    set_enrollment_storage(db, BITMASK)
+    probe = "unit_of_work_0"
+    with UnitOfWork(db) as uow:
+        student = uow.users.get_by_username(probe)
+        held = sorted(subject.name for subject in student.subjects)
+        student.subjects = [subject for subject in student.subjects if subject.name != held[0]]
+        uow.users.save(student)
+    with UnitOfWork(db) as uow:
+        EnrollmentManager(uow.users).enroll_in_subject(probe, held[0])
+    u_uuid, counter = db.execute_single("SELECT u_uuid, enrollment_count FROM users WHERE custom_id = ?", (probe,))
+    stored = sorted(code for code, in BitmaskEnrollmentRepository(db).get_student_enrollments(u_uuid))
+    rows = db.execute_single("SELECT COUNT(*) FROM enrollments")[0]
+    if stored != held or counter != len(held) or rows:
+        problems.append(f"bitmask unit of work left {stored} (counter {counter}) and {rows} enrollment rows")
+    set_enrollment_storage(db, "rows")
+
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db_path + suffix):
+            os.remove(test_db_path + suffix)
+
+    for problem in problems[:10]:
+        print(f"[!] {problem}")
+    if not problems:
+        print("\n[+] All approaches stored the same enrollments; failed flushes were rolled back.")
+    return not problems
+
+if __name__ == "__main__":
+    students = 2000
+    courses = 10
+    if len(sys.argv) > 1:
+        students = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        courses = int(sys.argv[2])
+    sys.exit(0 if run_unit_of_work_benchmark(students, courses) else 1)